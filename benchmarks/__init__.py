@@ -0,0 +1,2 @@
+# partyapp/benchmarks
+# 性能計測用スクリプト（python -m partyapp.benchmarks.<name> で実行）
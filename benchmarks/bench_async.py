@@ -0,0 +1,115 @@
+# partyapp/benchmarks/bench_async.py
+# 同期（pymysql + スレッド）と非同期（aiomysql + asyncio）の読み取りスループット比較。
+# 同じ同時実行数・同じプールサイズで Law 詳細（categories + party_roles.party）を
+# ランダムに引き続け、requests/sec とレイテンシを出す。接続先は config.py と同じ環境変数。
+#
+#   python -m partyapp.benchmarks.bench_async -n 5000 -c 32
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from partyapp.config import ASYNC_DATABASE_URL, DATABASE_URL
+from partyapp.db.models import Law
+from partyapp.services.async_reads import law_detail_stmt
+
+def _summary(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    lat = sorted(latencies)
+    q = statistics.quantiles(lat, n=100) if len(lat) >= 2 else lat * 99
+    return {
+        "requests": len(lat),
+        "seconds": elapsed,
+        "req_per_sec": len(lat) / elapsed if elapsed > 0 else float("inf"),
+        "p50_ms": q[49] * 1000,
+        "p95_ms": q[94] * 1000,
+        "p99_ms": q[98] * 1000,
+    }
+
+def _timed(fn: Callable[[], None]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+def sample_law_ids(n: int) -> List[str]:
+    engine = create_engine(DATABASE_URL)
+    try:
+        with engine.connect() as conn:
+            ids = list(conn.execute(select(Law.id).limit(10_000)).scalars())
+    finally:
+        engine.dispose()
+    if not ids:
+        raise SystemExit("T_LAW が空です。先に pa seed-master を実行してください。")
+    return [random.choice(ids) for _ in range(n)]
+
+def run_sync(law_ids: List[str], concurrency: int) -> Dict[str, float]:
+    engine = create_engine(DATABASE_URL, pool_size=concurrency, max_overflow=0, pool_pre_ping=True)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    def one(law_id: str) -> float:
+        def _q():
+            with Session() as db:
+                law = db.execute(law_detail_stmt(law_id)).scalar_one()
+                [(r.party.name, r.role) for r in law.party_roles]
+        return _timed(_q)
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            list(ex.map(one, law_ids[:concurrency]))  # ウォームアップ（プールを埋める）
+            t0 = time.perf_counter()
+            latencies = list(ex.map(one, law_ids))
+            elapsed = time.perf_counter() - t0
+    finally:
+        engine.dispose()
+    return _summary(latencies, elapsed)
+
+async def _run_async(law_ids: List[str], concurrency: int) -> Dict[str, float]:
+    engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=concurrency, max_overflow=0, pool_pre_ping=True)
+    Session = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(law_id: str) -> float:
+        async with sem:
+            t0 = time.perf_counter()
+            async with Session() as db:
+                law = (await db.execute(law_detail_stmt(law_id))).scalar_one()
+                [(r.party.name, r.role) for r in law.party_roles]
+            return time.perf_counter() - t0
+
+    try:
+        await asyncio.gather(*(one(i) for i in law_ids[:concurrency]))  # ウォームアップ
+        t0 = time.perf_counter()
+        latencies = await asyncio.gather(*(one(i) for i in law_ids))
+        elapsed = time.perf_counter() - t0
+    finally:
+        await engine.dispose()
+    return _summary(list(latencies), elapsed)
+
+def run_async(law_ids: List[str], concurrency: int) -> Dict[str, float]:
+    return asyncio.run(_run_async(law_ids, concurrency))
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="同期 vs 非同期セッションの読み取りスループット比較")
+    ap.add_argument("-n", type=int, default=2000, help="リクエスト数")
+    ap.add_argument("-c", "--concurrency", type=int, default=16, help="同時実行数（= プールサイズ）")
+    args = ap.parse_args()
+
+    law_ids = sample_law_ids(args.n)
+    results = {
+        "sync (pymysql, threads)": run_sync(law_ids, args.concurrency),
+        "async (aiomysql)": run_async(law_ids, args.concurrency),
+    }
+    for name, r in results.items():
+        print(
+            f"{name:<24} {r['req_per_sec']:>10,.0f} req/sec  "
+            f"p50 {r['p50_ms']:7.2f} ms  p95 {r['p95_ms']:7.2f} ms  p99 {r['p99_ms']:7.2f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# partyapp/benchmarks/bench_ids.py
+# CHAR(18) id 生成のマイクロベンチマーク。
+# 旧実装（cli.make_char18_id: datetime.now + 残りの桁の random.choice）と partyapp.utils.ids を比較する。
+#
+#   python -m partyapp.benchmarks.bench_ids -n 200000
+import argparse
+import random
+import timeit
+from datetime import datetime, timezone
+
+from partyapp.utils.ids import make_id, make_ids
+
+_B32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+def _to_base32(n: int) -> str:
+    if n == 0:
+        return "0"
+    s = []
+    while n > 0:
+        n, r = divmod(n, 32)
+        s.append(_B32[r])
+    return "".join(reversed(s))
+
+def legacy_make_char18_id() -> str:
+    """比較用: 以前の cli.make_char18_id（partyapp/cli.py）と同じ実装"""
+    millis = int(datetime.now(timezone.utc).timestamp() * 1000)
+    head = _to_base32(millis)
+    if len(head) > 18:
+        head = head[:18]
+    pad = "".join(random.choice(_B32) for _ in range(18 - len(head)))
+    return (head + pad)[:18]
+
+def run(n: int, repeat: int) -> dict:
+    cases = {
+        "legacy make_char18_id": lambda: [legacy_make_char18_id() for _ in range(n)],
+        "utils.ids.make_id": lambda: [make_id() for _ in range(n)],
+        "utils.ids.make_ids(n)": lambda: make_ids(n),
+    }
+    results = {}
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=1, repeat=repeat))
+        results[name] = {"seconds": best, "ids_per_sec": n / best}
+    return results
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="CHAR(18) id 生成のマイクロベンチマーク")
+    ap.add_argument("-n", type=int, default=100_000, help="1回の計測で生成する id 数")
+    ap.add_argument("--repeat", type=int, default=5, help="繰り返し回数（最良値を採用）")
+    args = ap.parse_args()
+
+    results = run(args.n, args.repeat)
+    base = results["legacy make_char18_id"]["seconds"]
+    for name, r in results.items():
+        print(f"{name:<24} {r['seconds']*1000:9.1f} ms  {r['ids_per_sec']:>12,.0f} ids/sec  x{base / r['seconds']:.1f}")
+
+    # 単調性・一意性の確認
+    ids = make_ids(args.n)
+    assert ids == sorted(ids) and len(set(ids)) == len(ids) and all(len(i) == 18 for i in ids)
+
+if __name__ == "__main__":
+    main()
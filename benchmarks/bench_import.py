@@ -0,0 +1,98 @@
+# partyapp/benchmarks/bench_import.py
+# pa の起動時間（import 時間）の計測と回帰チェック。
+# python -X importtime で partyapp.cli の import を計測し、累積時間の大きいモジュールを表示する。
+# あわせて、DB を使わないコマンドの起動で読み込まれてはいけないモジュール
+# （エンジン・モデル・SQLAlchemy など）が import されていないことを検査する。
+# 予算超過・禁止モジュールの import があれば終了コード 1（CI 用）。
+#
+#   python -m partyapp.benchmarks.bench_import
+#   python -m partyapp.benchmarks.bench_import --budget-ms 150 --repeat 10
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# import partyapp.cli の時点で読み込まれてはいけないモジュール（前方一致）
+FORBIDDEN_PREFIXES = (
+    "sqlalchemy",
+    "pymysql",
+    "aiomysql",
+    "partyapp.db.base",
+    "partyapp.db.models",
+    "partyapp.services",
+)
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def importtime(module: str) -> List[Tuple[str, int, int, int]]:
+    """(モジュール名, self[us], cumulative[us], 深さ) のリスト"""
+    env = {k: v for k, v in os.environ.items() if not k.startswith("DB_")}  # DB 設定なしでも起動できること
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"❌ import {module} に失敗しました:\n{proc.stderr}")
+    out = []
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            out.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return out
+
+def cli_wall_ms(args: List[str], repeat: int) -> float:
+    """python -m partyapp.cli <args> の実行時間（中央値, ms）"""
+    import time
+    env = {k: v for k, v in os.environ.items() if not k.startswith("DB_")}
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "partyapp.cli", *args], capture_output=True, env=env, check=True)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="pa の import 時間の計測と回帰チェック")
+    ap.add_argument("--module", default="partyapp.cli", help="計測するモジュール")
+    ap.add_argument("--budget-ms", type=float, default=200.0, help="import の累積時間の上限（ms）")
+    ap.add_argument("--repeat", type=int, default=5, help="計測回数（中央値を採用）")
+    ap.add_argument("--top", type=int, default=15, help="表示する上位モジュール数")
+    args = ap.parse_args()
+
+    runs = [importtime(args.module) for _ in range(args.repeat)]
+    totals = [next(cum for name, _, cum, _ in r if name == args.module) for r in runs]
+    total_ms = statistics.median(totals) / 1000
+
+    last = runs[-1]
+    # -X importtime は子モジュールを親より先に出力する。対象モジュールの直前にある
+    # 1 段深い行が、対象が直接 import したモジュール
+    idx = next(i for i, (name, *_) in enumerate(last) if name == args.module)
+    base_depth = last[idx][3]
+    top_level: Dict[str, int] = {}
+    for name, _, cum, depth in reversed(last[:idx]):
+        if depth <= base_depth:
+            break
+        if depth == base_depth + 1:
+            top_level[name] = cum
+    print(f"📦 import {args.module}: {total_ms:.1f} ms（中央値, {args.repeat} 回）")
+    for name, cum in sorted(top_level.items(), key=lambda x: -x[1])[: args.top]:
+        print(f"  {cum / 1000:8.1f} ms  {name}")
+    print(f"⏱ pa --help: {cli_wall_ms(['--help'], args.repeat):.1f} ms（プロセス起動込み）")
+
+    failed = False
+    forbidden = sorted({name for name, *_ in last if name.startswith(FORBIDDEN_PREFIXES)})
+    if forbidden:
+        failed = True
+        print(f"❌ 起動時に読み込まれてはいけないモジュールが import されています: {', '.join(forbidden)}")
+    if total_ms > args.budget_ms:
+        failed = True
+        print(f"❌ import 時間が予算を超えています: {total_ms:.1f} ms > {args.budget_ms:.1f} ms")
+    if failed:
+        sys.exit(1)
+    print("✅ OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# partyapp/benchmarks/bench_suite.py
+# 規模を変えて seed / show / id 生成を計測するベンチマークスイート。
+# gen-fixtures 形式の CSV を SQLite（インメモリ）と MariaDB に投入し、結果を JSON に保存する。
+# --compare で以前の結果 JSON との比（今回 / 前回）を表示できる。
+#
+#   pa gen-fixtures /tmp/fx --laws 100000
+#   python -m partyapp.benchmarks.bench_suite --fixtures /tmp/fx --targets sqlite,mariadb -o bench.json
+#   python -m partyapp.benchmarks.bench_suite --fixtures /tmp/fx --compare bench.json
+#
+# MariaDB は config.py と同じ環境変数の DB を使う（--fresh でテーブルを作り直す。開発用 DB 専用）。
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+import sqlalchemy
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from partyapp.benchmarks import bench_ids
+from partyapp.db.base import Base
+from partyapp.db.models import Category, Law, Party
+from partyapp.services.fixtures import generate_fixtures
+from partyapp.services.query import build_select, parse_predicate, stream_rows
+from partyapp.services.seed import (
+    iter_csv,
+    make_party_law_resolvers,
+    seed_law_categories,
+    seed_party_law_roles,
+    upsert_simple_table,
+)
+
+# show の計測ケース: (名前, モデル, where 式, order_by)
+SHOW_CASES = [
+    ("law_pk", Law, [], None),
+    ("law_type", Law, ["type=statute"], None),
+    ("law_type_date", Law, ["type=ordinance", "promulgated_on>=2000-01-01"], "promulgated_on"),
+    ("law_in", Law, ["type in cabinet_order,ministerial_order", "jurisdiction=national"], None),
+    ("law_prefix", Law, ["law_number like 令和%"], None),
+    ("party_pk", Party, [], None),
+]
+
+def make_engine(target: str):
+    if target == "sqlite":
+        # インメモリ DB を 1 本の接続で共有する
+        return create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    if target == "mariadb":
+        from partyapp.config import DATABASE_URL
+        return create_engine(DATABASE_URL, pool_pre_ping=True)
+    raise ValueError(f"未知のターゲットです: {target}")
+
+def _quiet(fn: Callable[[], Any], verbose: bool) -> Any:
+    """seed 系の進捗ログ（typer.echo）を抑止して実行する"""
+    if verbose:
+        return fn()
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn()
+
+def bench_seed(engine, fixtures: Path, batch_size: int, verbose: bool) -> Dict[str, Any]:
+    """seed-master の逐次投入と同じ順序で投入し、テーブルごとの rows/sec を測る"""
+    out: Dict[str, Any] = {}
+    party_resolver, law_resolver = make_party_law_resolvers("law_number")
+    steps = [
+        ("Party", lambda db: upsert_simple_table(db, Party, iter_csv(fixtures / "Party.csv"), ["name"],
+                                                 batch_size=batch_size, resolver=party_resolver)),
+        ("Category", lambda db: upsert_simple_table(db, Category, iter_csv(fixtures / "Category.csv"), ["name"],
+                                                    batch_size=batch_size)),
+        ("Law", lambda db: upsert_simple_table(db, Law, iter_csv(fixtures / "Law.csv"), ["law_number"],
+                                               batch_size=batch_size, resolver=law_resolver)),
+        ("PartyLawRole", lambda db: seed_party_law_roles(db, fixtures / "party_law_roles.csv", batch_size=batch_size,
+                                                         party_resolver=party_resolver, law_resolver=law_resolver)),
+        ("LawCategoryMap", lambda db: seed_law_categories(db, fixtures / "law_categories.csv", batch_size=batch_size,
+                                                          law_resolver=law_resolver)["rows"]),
+    ]
+    for name, step in steps:
+        with Session(engine) as db:
+            t0 = time.perf_counter()
+            n = _quiet(lambda: step(db), verbose)
+            db.commit()
+            sec = time.perf_counter() - t0
+        out[name] = {"rows": n, "seconds": sec, "rows_per_sec": n / sec if sec > 0 else None}
+    return out
+
+def bench_show(engine, limits: Sequence[int], repeat: int) -> Dict[str, Any]:
+    """show と同じ SELECT（build_select + stream_rows）を limit ごとに repeat 回流し、中央値を取る"""
+    out: Dict[str, Any] = {}
+    with Session(engine) as db:
+        for name, Model, where, order_by in SHOW_CASES:
+            clauses = [parse_predicate(Model, w).clause for w in where]
+            cols = list(Model.__table__.columns.keys())
+            case: Dict[str, Any] = {}
+            for limit in limits:
+                stmt, _ = build_select(Model, cols, clauses, order_by=order_by, limit=limit or None)
+                times: List[float] = []
+                rows = 0
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    rows = sum(1 for _ in stream_rows(db, stmt))
+                    times.append(time.perf_counter() - t0)
+                case[str(limit)] = {"rows": rows, "median_ms": statistics.median(times) * 1000, "min_ms": min(times) * 1000}
+            out[name] = case
+    return out
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).resolve().parent, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def run_suite(
+    fixtures: Path,
+    targets: Sequence[str],
+    limits: Sequence[int],
+    repeat: int,
+    batch_size: int,
+    id_count: int,
+    fresh: bool,
+    verbose: bool,
+) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "fixtures": {p.name: sum(1 for _ in p.open(encoding="utf-8")) - 1 for p in sorted(fixtures.glob("*.csv"))},
+            "batch_size": batch_size,
+        },
+        "ids": bench_ids.run(id_count, repeat),
+        "targets": {},
+    }
+    for target in targets:
+        engine = make_engine(target)
+        try:
+            if fresh or target == "sqlite":
+                Base.metadata.drop_all(engine)
+            Base.metadata.create_all(engine)
+            print(f"⏱ {target}: seed ...", file=sys.stderr)
+            seed = bench_seed(engine, fixtures, batch_size, verbose)
+            print(f"⏱ {target}: show ...", file=sys.stderr)
+            show = bench_show(engine, limits, repeat)
+            results["targets"][target] = {"seed": seed, "show": show}
+        finally:
+            engine.dispose()
+    return results
+
+def _flatten(d: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            out.update(_flatten(v, key))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> List[str]:
+    """時間系（*_ms, seconds）とスループット系（*_per_sec）の今回 / 前回の比を並べる"""
+    cur, prev = _flatten(current["targets"]), _flatten(previous["targets"])
+    cur.update(_flatten(current["ids"], "ids"))
+    prev.update(_flatten(previous["ids"], "ids"))
+    lines = []
+    for key in sorted(cur):
+        if key not in prev or not prev[key]:
+            continue
+        if not (key.endswith("_ms") or key.endswith("seconds") or key.endswith("_per_sec")):
+            continue
+        ratio = cur[key] / prev[key]
+        worse = ratio < 0.9 if key.endswith("_per_sec") else ratio > 1.1
+        lines.append(f"{'⚠' if worse else ' '} {key:<55} {prev[key]:>12.2f} → {cur[key]:>12.2f}  x{ratio:.2f}")
+    return lines
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="seed / show / id 生成のベンチマークスイート")
+    ap.add_argument("--fixtures", type=Path, required=True, help="gen-fixtures の出力ディレクトリ（無ければ生成）")
+    ap.add_argument("--laws", type=int, default=10_000, help="fixtures を生成する場合の Law 行数")
+    ap.add_argument("--targets", default="sqlite", help="カンマ区切り: sqlite, mariadb")
+    ap.add_argument("--limits", default="20,1000,0", help="show の件数（0 = 全件）")
+    ap.add_argument("--repeat", type=int, default=5, help="show / id 生成の繰り返し回数")
+    ap.add_argument("--batch-size", type=int, default=1000)
+    ap.add_argument("--ids", type=int, default=100_000, help="id 生成ベンチマークの件数")
+    ap.add_argument("--fresh", action="store_true", help="MariaDB のテーブルを作り直してから計測する")
+    ap.add_argument("-o", "--out", type=Path, help="結果 JSON の保存先")
+    ap.add_argument("--compare", type=Path, help="比較対象の結果 JSON")
+    ap.add_argument("-v", "--verbose", action="store_true", help="seed の進捗ログを表示する")
+    args = ap.parse_args()
+
+    if not (args.fixtures / "Law.csv").exists():
+        print(f"⏱ fixtures を生成します: {args.fixtures} (Law {args.laws} 行)", file=sys.stderr)
+        generate_fixtures(args.fixtures, laws=args.laws)
+
+    results = run_suite(
+        args.fixtures,
+        [t.strip() for t in args.targets.split(",") if t.strip()],
+        [int(x) for x in args.limits.split(",")],
+        args.repeat,
+        args.batch_size,
+        args.ids,
+        args.fresh,
+        args.verbose,
+    )
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+        print(f"💾 {args.out}", file=sys.stderr)
+    else:
+        print(text)
+    if args.compare:
+        for line in compare(results, json.loads(args.compare.read_text(encoding="utf-8"))):
+            print(line, file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,82 @@
 # partyapp/cli.py
+# pa コマンドの入口。
+# 起動を速く保つため、DB エンジン・モデル・SQLAlchemy・各サービスはモジュール先頭では import せず、
+# それを使うコマンドの中で import する（pa --help や DB を使わないコマンドでは読み込まれない）。
+# benchmarks/bench_import.py が import 時間とこの方針の回帰を検査する。
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
 import typer
-from partyapp.db.base import Base, engine
-from partyapp.db.models import *  # モデルを読み込む
-from sqlalchemy import text, inspect
 
 cli = typer.Typer()
 
+def _load_models():
+    """Base にモデルを登録して Base を返す"""
+    from partyapp.db.base import Base
+    import partyapp.db.models  # noqa: F401  モデルを読み込む
+    return Base
+
+@cli.callback()
+def main(
+    ctx: typer.Context,
+    profile: bool = typer.Option(False, "--profile", help="実行した SQL を計測し、終了時にレポートを表示する"),
+    profile_format: str = typer.Option("table", "--profile-format", help="--profile の出力形式: table | json", case_sensitive=False),
+    profile_out: str = typer.Option(None, "--profile-out", help="--profile のレポートを標準エラーではなくファイルに書き出す"),
+    primary: bool = typer.Option(False, "--primary", help="読み取りレプリカ（DATABASE_READ_URL）を使わず、プライマリで読む"),
+    local: bool = typer.Option(False, "--local", help="読み取り専用のコマンドを pa sync-local のローカルミラー（SQLite）で実行する"),
+):
+    """partyapp の管理コマンド（例: pa --profile show Law）"""
+    if primary:
+        from partyapp import config
+        config.DB_READ_PRIMARY = True
+    if local:
+        from partyapp import config
+        if ctx.invoked_subcommand == "sync-local":
+            typer.echo("❌ --local は sync-local と併用できません（sync-local は本番 DB から読みます）")
+            raise typer.Exit(code=1)
+        if not Path(config.DB_LOCAL_PATH).exists():
+            typer.echo(f"❌ ローカルミラーがありません: {config.DB_LOCAL_PATH}（先に pa sync-local を実行してください）")
+            raise typer.Exit(code=1)
+        config.DB_READ_LOCAL = True
+    if not profile:
+        return
+    from partyapp.services.profiler import SqlProfiler
+
+    profiler = SqlProfiler().start()
+
+    def _report():
+        profiler.stop()
+        text_ = profiler.report(fmt=profile_format.lower())
+        if profile_out:
+            with open(profile_out, "w", encoding="utf-8") as f:
+                f.write(text_ + "\n")
+        else:
+            typer.echo(text_, err=True)
+
+    ctx.call_on_close(_report)
+
 @cli.command()
 def init_db():
     """partyappdbにDBスキーマを作成（初回のみ使用）"""
+    from partyapp.db.base import engine
+    Base = _load_models()
     Base.metadata.create_all(bind=engine)
     print("✅ Database schema created")
 
 @cli.command()
 def drop_db():
     """partyappdbのDBスキーマを全削除（開発用）"""
+    from partyapp.db.base import engine
+    Base = _load_models()
     Base.metadata.drop_all(bind=engine)
     print("🗑️ Database schema dropped")
 
 @cli.command()
 def connect_db():
     """partyappdbへの接続可否テスト"""
+    from sqlalchemy import text
     try:
+        from partyapp.db.base import engine
         with engine.connect() as conn:
             version = conn.execute(text("SELECT VERSION()")).scalar_one()
             print("✅ 接続成功！MariaDBバージョン:", version)
@@ -31,6 +86,7 @@ def connect_db():
 @cli.command()
 def list_models():
     """partyappdbのモデル一覧を表示（テーブル名とモデル名）"""
+    Base = _load_models()
     if not Base.metadata.tables:
         print("⚠️ モデルが読み込まれていません。")
         return
@@ -45,7 +101,7 @@ def list_models():
 # show_model_schemaコマンドで利用するローカル関数
 def _iter_models():
     # Baseにぶら下がっている全モデルクラスを列挙
-    for mapper in Base.registry.mappers:
+    for mapper in _load_models().registry.mappers:
         yield mapper.class_
 
 def _get_model_class(model_name: str):
@@ -57,6 +113,7 @@ def _get_model_class(model_name: str):
 @cli.command()
 def show_model_schema(model_name: str):
     """モデル名で指定したモデルのスキーマを表示"""
+    from sqlalchemy import inspect
     cls = _get_model_class(model_name)
     if cls is None:
         print(f"⚠️ モデル '{model_name}' は見つかりません。")
@@ -77,135 +134,7 @@ def show_model_schema(model_name: str):
 #################################################################
 # 以下は、seedツール
 #################################################################
-#
-# imoprt objects for seed tool
-#
-import csv
-from pathlib import Path
-from typing import List, Dict, Any
-from datetime import datetime, date, timezone
-import random
-
-import typer
-from sqlalchemy import select
-from sqlalchemy.dialects.mysql import insert as mysql_insert
-from sqlalchemy.orm import Session
-
-from partyapp.db.base import SessionLocal
-from partyapp.db.models import Party, Category, Law, PartyLawRole
-from partyapp.db.models.enums import PartyRole
-
-# ==============================================================
-# ID 生成ユーティリティ（CHAR(18)）
-# ==============================================================
-
-# Crockford Base32（0-9 A-Z ただし I L O U を除く）
-_B32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
-
-def _to_base32(n: int) -> str:
-    if n == 0:
-        return "0"
-    s = []
-    while n > 0:
-        n, r = divmod(n, 32)
-        s.append(_B32[r])
-    return "".join(reversed(s))
-
-def make_char18_id() -> str:
-    """
-    時刻(ミリ秒)をBase32化した先頭に、残りをランダムBase32でパディングして18文字。
-    既存行に対しては ON DUPLICATE KEY UPDATE で id=id とし、id は変更しない。
-    """
-    millis = int(datetime.now(timezone.utc).timestamp() * 1000)
-    head = _to_base32(millis)
-    if len(head) > 18:
-        head = head[:18]
-    pad = "".join(random.choice(_B32) for _ in range(18 - len(head)))
-    return (head + pad)[:18]
-
-# ==============================================================
-# seed utility functions
-# ==============================================================
-
-def read_csv(path: Path) -> List[Dict[str, Any]]:
-    if not path.exists():
-        typer.echo(f"⚠ {path} が見つかりません。スキップ")
-        return []
-    with path.open("r", encoding="utf-8", newline="") as f:
-        return list(csv.DictReader(f))
-
-def parse_date_yyyy_mm_dd(s: str | None) -> date | None:
-    if not s:
-        return None
-    s = s.strip()
-    if not s:
-        return None
-    return datetime.strptime(s, "%Y-%m-%d").date()
-
-def normalize_payload(model_name: str, row: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    CSV 文字列をモデルに合わせて軽く整形（必要最低限）
-    - 空文字 → None
-    - 日付文字列 → date
-    """
-    r = {k: (v if v != "" else None) for k, v in row.items() if k != "id"}
-    if model_name == "Party":
-        r["founded_on"]   = parse_date_yyyy_mm_dd(r.get("founded_on"))
-        r["dissolved_on"] = parse_date_yyyy_mm_dd(r.get("dissolved_on"))
-    elif model_name == "Law":
-        # Law側も日付カラム等があればここで変換
-        pass
-    return r
-
-def upsert_simple_table(
-    db: Session,
-    model,
-    rows: List[Dict[str, Any]],
-    uniq_cols: List[str],
-    dry_run: bool = False,
-):
-    """
-    id は CSV からは受け取らず常に自動生成（CHAR(18)）。
-    業務キー（uniq_cols）にユニーク制約がある前提で、
-    INSERT ... ON DUPLICATE KEY UPDATE を使用した冪等UPSERT。
-    既存衝突時は id=id として PK を変更しない。
-    """
-    if not rows:
-        return
-
-    tbl = model.__table__
-    for raw in rows:
-        # 軽い整形（空文字→None、日付変換など）
-        r = normalize_payload(model.__name__, raw)
-
-        # 先に新規用 id を生成（既存に当たった場合はUPDATE側で id は変更しない）
-        new_id = make_char18_id()
-        values = {"id": new_id, **{k: v for k, v in r.items() if v is not None}}
-
-        # INSERT 文（この時点では実行されない）
-        ins = mysql_insert(tbl).values(**values)
-
-        # 競合時に更新する列（uniq_cols と id を除外）
-        update_cols = {
-            c.name: ins.inserted[c.name]
-            for c in tbl.c
-            if c.name not in uniq_cols and c.name != "id"
-        }
-        # id は変更しない（= 自身に代入）
-        update_cols["id"] = tbl.c.id  # id=id
-
-        typer.echo(
-            "→ UPSERT "
-            f"{model.__name__}: " +
-            "{" + ", ".join(f"{k}={r.get(k)}" for k in uniq_cols) + "}"
-        )
-        if not dry_run:
-            db.execute(ins.on_duplicate_key_update(**update_cols))
-
-def name_map(db: Session, model, key_col: str = "name") -> Dict[str, Any]:
-    """model の name -> id の辞書を返す。"""
-    stmt = select(getattr(model, key_col), model.id)
-    return {k: v for k, v in db.execute(stmt).all()}
+# 必要なモジュールは seed_master の中で import する
 
 # ==============================================================
 # seed utility main
@@ -217,152 +146,224 @@ def name_map(db: Session, model, key_col: str = "name") -> Dict[str, Any]:
 def seed_master(
     seeds_dir: str = typer.Option("seeds", help="シードCSVのディレクトリのパス"),
     dry_run: bool = typer.Option(False, help="実行せずログのみ"),
+    batch_size: int = typer.Option(1000, "--batch-size", help="1回の複数行INSERTにまとめる行数"),
+    workers: int = typer.Option(1, "--workers", help="並列投入のワーカー数（2以上でパーティション単位に並列UPSERT/コミット）"),
+    bulk: bool = typer.Option(False, "--bulk", help="LOAD DATA LOCAL INFILE + ステージングテーブル経由で親テーブルを一括投入"),
+    law_key: str = typer.Option("law_number", "--law-key", help="party_law_roles.csv / law_categories.csv で Law を特定するキー: law_number | title"),
+    fk_cache_size: int = typer.Option(100_000, "--fk-cache-size", help="外部キー解決(名前→id)のLRUキャッシュ件数"),
+    category_mode: str = typer.Option("add", "--category-mode", help="law_categories.csv の反映方法: add（未登録の組を追加）| sync（CSV に現れた法令の、CSV に無い組を削除）"),
+    stats_refresh: bool = typer.Option(True, "--stats-refresh/--no-stats-refresh", help="投入後に pa stats の集計済みテーブルを差分更新する（作成済みの場合のみ）"),
+    commit_every: int = typer.Option(0, "--commit-every", help="N 行ごとにコミットし、ファイルごとの進捗を T_SEED_PROGRESS に記録する（0: 全体で 1 トランザクション）"),
+    resume: bool = typer.Option(False, "--resume", help="中断した --commit-every の投入を、最後にコミットした位置から再開する"),
 ):
     """
     マスターデータを冪等投入（CHAR(18) id を自動生成）。
     親→子（中間）の順に投入します。
+    大きな CSV は --commit-every で途中コミットし、失敗したら --resume で続きから再開できます。
     """
+    from partyapp.db.base import SessionLocal
+    from partyapp.db.models import Party, Category, Law
+    from partyapp.services.key_resolver import LAW_JOIN_KEYS
+    from partyapp.services.seed import (
+        CATEGORY_SYNC_MODES,
+        iter_csv,
+        make_party_law_resolvers,
+        seed_law_categories,
+        seed_party_law_roles,
+        upsert_simple_table,
+    )
+
+    if law_key not in LAW_JOIN_KEYS:
+        typer.echo(f"❌ --law-key が不正です: {law_key} （候補: {', '.join(LAW_JOIN_KEYS)}）")
+        raise typer.Exit(code=1)
+    if category_mode not in CATEGORY_SYNC_MODES:
+        typer.echo(f"❌ --category-mode が不正です: {category_mode} （候補: {', '.join(CATEGORY_SYNC_MODES)}）")
+        raise typer.Exit(code=1)
+    if commit_every < 0:
+        typer.echo(f"❌ --commit-every は 0 以上を指定してください: {commit_every}")
+        raise typer.Exit(code=1)
+    if (commit_every or resume) and (bulk or workers > 1):
+        typer.echo("❌ --commit-every / --resume は逐次投入（--bulk なし, --workers 1）でのみ使えます")
+        raise typer.Exit(code=1)
     base = Path(seeds_dir)
-    with SessionLocal() as db:
-        # 1) 親テーブル
-        parties    = read_csv(base / "Party.csv")       # 想定: name,short_name,founded_on,dissolved_on
-        categories = read_csv(base / "Category.csv")    # 想定: name,description,...
-        laws       = read_csv(base / "Law.csv")         # 想定: name,law_number,title,law_type,...
+    plr_path = base / "party_law_roles.csv"  # 想定: party_name,law_number|law_title,role,note
+    lcm_path = base / "law_categories.csv"  # 想定: law_number|law_title,category
+    if commit_every or resume:
+        from partyapp.services.seed_checkpoint import seed_master_checkpointed
+        try:
+            seed_master_checkpointed(
+                base, batch_size, dry_run, commit_every=commit_every, resume=resume,
+                law_key=law_key, fk_cache_size=fk_cache_size, category_mode=category_mode,
+            )
+        except RuntimeError as e:
+            typer.echo(f"❌ {e}")
+            raise typer.Exit(code=1)
+        typer.echo("✅ シード投入（CHAR(18) id 自動生成）完了")
+        if stats_refresh and not dry_run:
+            _refresh_stats_summary()
+        return
+
+    if bulk:
+        from partyapp.services.bulk_load import bulk_load_masters
+        bulk_load_masters(base, dry_run=dry_run)
+        # 中間テーブルは親の id 解決が必要なので通常のバッチUPSERTで投入
+        party_resolver, law_resolver = make_party_law_resolvers(law_key, cache_size=fk_cache_size)
+        with SessionLocal() as db:
+            seed_party_law_roles(
+                db, plr_path, batch_size=batch_size, dry_run=dry_run,
+                party_resolver=party_resolver, law_resolver=law_resolver, law_key=law_key,
+            )
+            seed_law_categories(
+                db, lcm_path, batch_size=batch_size, dry_run=dry_run,
+                law_resolver=law_resolver, law_key=law_key, mode=category_mode,
+            )
+            if not dry_run:
+                db.commit()
+        typer.echo("✅ シード投入（CHAR(18) id 自動生成）完了")
+        if stats_refresh and not dry_run:
+            _refresh_stats_summary()
+        return
+
+    if workers > 1:
+        from partyapp.services.seed_parallel import seed_master_parallel
+        seed_master_parallel(
+            base, workers, batch_size, dry_run,
+            law_key=law_key, fk_cache_size=fk_cache_size, category_mode=category_mode,
+        )
+        typer.echo("✅ シード投入（CHAR(18) id 自動生成）完了")
+        if stats_refresh and not dry_run:
+            _refresh_stats_summary()
+        return
 
-        # 一意キーを "name" に変更（DB側に UNIQUE(name) を推奨）
-        upsert_simple_table(db, Party,    parties,    uniq_cols=["name"], dry_run=dry_run)
-        upsert_simple_table(db, Category, categories, uniq_cols=["name"], dry_run=dry_run)
-        upsert_simple_table(db, Law,      laws,      uniq_cols=["name"], dry_run=dry_run)
+    # 中間テーブルを投入する場合は、親の投入時に確定した id をリゾルバに覚えさせて再利用する
+    party_resolver = law_resolver = None
+    if plr_path.exists() or lcm_path.exists():
+        party_resolver, law_resolver = make_party_law_resolvers(law_key, cache_size=fk_cache_size)
+
+    with SessionLocal() as db:
+        # 1) 親テーブル（CSV はジェネレータで 1 行ずつ流し、batch_size 件ずつ書き込む）
+        # 想定: name,short_name,founded_on,dissolved_on
+        upsert_simple_table(db, Party,    iter_csv(base / "Party.csv"),    uniq_cols=["name"], dry_run=dry_run, batch_size=batch_size, resolver=party_resolver)
+        # 想定: name,description,...
+        upsert_simple_table(db, Category, iter_csv(base / "Category.csv"), uniq_cols=["name"], dry_run=dry_run, batch_size=batch_size)
+        # 想定: law_number,title,type,jurisdiction,...
+        upsert_simple_table(db, Law,      iter_csv(base / "Law.csv"),      uniq_cols=["law_number"], dry_run=dry_run, batch_size=batch_size, resolver=law_resolver)
 
         # 2) 子・中間テーブル： PartyLawRole (party_id, law_id, role, note)
-        plr_rows = read_csv(base / "party_law_roles.csv")  # 想定: party_name,law_name,role,note
-        if plr_rows:
-            party_name_to_id = name_map(db, Party, key_col="name")
-            law_name_to_id   = name_map(db, Law,   key_col="name")
-
-            for r in plr_rows:
-                try:
-                    party_id = party_name_to_id[r["party_name"]]
-                    law_id   = law_name_to_id[r["law_name"]]
-                except KeyError as e:
-                    typer.echo(f"⚠ 参照先が見つかりません: {e}. 行をスキップ -> {r}")
-                    continue
-
-                role_val = r.get("role")
-                role_obj = None
-                if role_val:
-                    try:
-                        role_obj = PartyRole(role_val) if role_val in PartyRole._value2member_map_ else PartyRole[role_val]
-                    except Exception:
-                        typer.echo(f"⚠ role の値が不正です: {role_val}. 行をスキップ -> {r}")
-                        continue
-
-                payload = {
-                    "party_id": party_id,
-                    "law_id":   law_id,
-                    "role":     role_obj,
-                    "note":     r.get("note") or None,
-                }
-
-                tbl = PartyLawRole.__table__
-                ins = mysql_insert(tbl).values(**payload)
-                # 複合主キー (party_id, law_id, role) 前提：IDは存在しないので除外でOK
-                update_cols = {
-                    c.name: ins.inserted[c.name]
-                    for c in tbl.c
-                    if c.name not in ("party_id", "law_id", "role")
-                }
-
-                typer.echo(
-                    f"→ UPSERT PartyLawRole: party_id={payload['party_id']}, "
-                    f"law_id={payload['law_id']}, role={payload['role']}"
-                )
-                if not dry_run:
-                    db.execute(ins.on_duplicate_key_update(**update_cols))
+        seed_party_law_roles(
+            db, plr_path, batch_size=batch_size, dry_run=dry_run,
+            party_resolver=party_resolver, law_resolver=law_resolver, law_key=law_key,
+        )
+        # 法令 × 分類：T_LAW_CATEGORY_MAP (law_id, category_id) は差分だけを書き込む
+        seed_law_categories(
+            db, lcm_path, batch_size=batch_size, dry_run=dry_run,
+            law_resolver=law_resolver, law_key=law_key, mode=category_mode,
+        )
 
         if not dry_run:
             db.commit()
 
     typer.echo("✅ シード投入（CHAR(18) id 自動生成）完了")
+    if stats_refresh and not dry_run:
+        _refresh_stats_summary()
+
+def _refresh_stats_summary(full: bool = False) -> None:
+    """pa stats の集計済みテーブルを差分更新する（未作成なら full=True のときだけ作る）"""
+    import time
+    from partyapp.db.base import SessionLocal
+    from partyapp.services.stats import refresh_summary, summary_enabled
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        if not full and not summary_enabled(db):
+            return
+        res = refresh_summary(db, full=full)
+    scope = "全件" if res["full"] else f"{res['years']} 年分"
+    typer.echo(f"📊 集計済みテーブル更新: 変更 {res['laws']:,} 法令 / {scope} ({time.perf_counter() - started:.2f}s)")
 
 #################################################################
 # 以下は、モデル名を指定してレコードを表示するユーティリティ
 #################################################################
-from typing import Optional
-from sqlalchemy import desc as sa_desc
-import json
-#
-#
-#
 # モデル名 → クラス のレジストリ（明示的に）
-MODEL_REGISTRY: Dict[str, Any] = {
-    "Party": Party,
-    "Category": Category,
-    "Law": Law,
-    "PartyLawRole": PartyLawRole,
-}
-
-def _serialize_value(v: Any) -> Any:
-    """JSON/表出力向けの軽いシリアライザ"""
-    if isinstance(v, (datetime, date)):
-        return v.isoformat()
-    # SQLAlchemy Enum は Python Enum になる想定
-    try:
-        from enum import Enum
-        if isinstance(v, Enum):
-            return v.value
-    except Exception:
-        pass
-    return v
-
-def _row_to_dict(obj) -> Dict[str, Any]:
-    """モデルインスタンス -> 辞書（テーブル列のみ）"""
-    cols = obj.__table__.columns.keys()
-    return {c: _serialize_value(getattr(obj, c)) for c in cols}
-
-def _parse_value(s: str) -> Any:
-    """--where col=value の value を型推定（int/float/日付YYYY-MM-DD/その他）"""
-    s = s.strip()
-    # 日付簡易判定
-    if len(s) == 10 and s[4] == "-" and s[7] == "-":
-        try:
-            return date.fromisoformat(s)
-        except Exception:
-            pass
-    # 数値
-    if s.isdigit() or (s.startswith("-") and s[1:].isdigit()):
-        try:
-            return int(s)
-        except Exception:
-            pass
-    try:
-        return float(s)
-    except Exception:
-        return s  # 文字列
+MODEL_NAMES = ("Party", "Category", "Law", "PartyLawRole")
+
+def _model_registry() -> Dict[str, Any]:
+    from partyapp.db import models
+    return {name: getattr(models, name) for name in MODEL_NAMES}
+
+def _echo_table(dict_rows: List[Dict[str, Any]], cols: List[str]) -> None:
+    """辞書のリストを簡易表形式で出力する"""
+    widths = {c: max([len(c), *(len(str(d.get(c, ""))) for d in dict_rows)]) for c in cols}
+    header = " | ".join(c.ljust(widths[c]) for c in cols)
+    sep = "-+-".join("-" * widths[c] for c in cols)
+    typer.echo(header)
+    typer.echo(sep)
+    for d in dict_rows:
+        line = " | ".join(str(d.get(c, "")).ljust(widths[c]) for c in cols)
+        typer.echo(line)
+
+def _include_label(v: Any) -> str:
+    """table 出力での関連の表示（コレクションは件数、単一は name / title / id）"""
+    if v is None:
+        return ""
+    if isinstance(v, list):
+        return f"{len(v)}件"
+    for key in ("name", "title", "id"):
+        if key in v:
+            return str(v[key])
+    return "1件"
 
 @cli.command("show")
 def show_records(
     model: str = typer.Argument(..., help="モデル名（例: Party / Category / Law / PartyLawRole）"),
-    limit: int = typer.Option(20, "--limit", "-n", help="最大取得件数"),
+    limit: int = typer.Option(20, "--limit", "-n", help="最大取得件数（0 は全件）"),
     columns: Optional[str] = typer.Option(None, "--columns", "-c", help="表示する列をカンマ区切りで指定（未指定は全列）"),
-    order_by: str = typer.Option("id", "--order-by", "-o", help="並び替え列名（既定: id）"),
+    order_by: Optional[str] = typer.Option(None, "--order-by", "-o", help="並び替え列名（既定: 主キー）"),
     desc: bool = typer.Option(False, "--desc", help="降順にする"),
-    where: List[str] = typer.Option(None, "--where", "-w", help="等価条件（col=value）。複数指定可"),
-    output: str = typer.Option("table", "--output", "-f", help="出力形式: table | json", case_sensitive=False),
+    where: List[str] = typer.Option(None, "--where", "-w", help="条件（col=v, col>=v, 'col in a,b', 'col is null', 'col like 前方%'）。複数指定可"),
+    after: Optional[str] = typer.Option(None, "--after", help="キーセットページング: この値より後ろから表示（並び替え列,主キー... をカンマ区切り。NULL は空）"),
+    chunk_size: int = typer.Option(1000, "--chunk-size", help="サーバサイドカーソルで一度に受け取る行数"),
+    output: str = typer.Option("table", "--output", "-f", help="出力形式: table | json | ndjson", case_sensitive=False),
+    explain: bool = typer.Option(False, "--explain", help="レコードの代わりに実行計画(EXPLAIN)とインデックス診断を表示"),
+    analyze: bool = typer.Option(False, "--analyze", help="--explain で MariaDB の ANALYZE（実際に実行して計測）を使う"),
+    include: Optional[str] = typer.Option(None, "--include", "-i", help="関連もまとめて読み込む（例: party_roles.party,categories）。json / ndjson では入れ子で出力"),
 ):
     """
     指定モデルのレコードを表示する簡易ビューア。
     例:
       pa show Party -n 10
       pa show Category --columns name,description --order-by name
-      pa show Law -w name=日本国憲法 -f json
+      pa show Law -w title=日本国憲法 -f json
+      pa show Law -n 0 -f ndjson > laws.ndjson
+      pa show Law -w type=statute -w "promulgated_on>=2020-01-01" --explain
+      pa show Law -n 100 --include party_roles.party,categories -f json
     """
-    Model = MODEL_REGISTRY.get(model)
+    import json
+    from partyapp.db.base import ReadSessionLocal
+    from partyapp.services.query import (
+        build_select,
+        format_cursor,
+        keyset_columns,
+        parse_after,
+        parse_includes,
+        parse_predicate,
+        serialize_value,
+        stream_entity_rows,
+        stream_rows,
+    )
+    from partyapp.services.explain import diagnose, explain as explain_stmt, render_sql
+
+    Model = _model_registry().get(model)
     if Model is None:
-        valid = ", ".join(MODEL_REGISTRY.keys())
+        valid = ", ".join(MODEL_NAMES)
         typer.echo(f"❌ 未知のモデル名です: {model} （候補: {valid}）")
         raise typer.Exit(code=1)
 
+    output = output.lower()
+    if output not in ("table", "json", "ndjson"):
+        typer.echo(f"❌ 出力形式が不正です: {output} （候補: table, json, ndjson）")
+        raise typer.Exit(code=1)
+
     # 列バリデーション
     all_cols = list(Model.__table__.columns.keys())
     if columns:
@@ -374,59 +375,704 @@ def show_records(
     else:
         selected_cols = all_cols
 
-    # order_by の列チェック
-    if order_by not in all_cols:
+    # order_by の列チェック（id を持たないモデルでは id 指定を主キー順として扱う）
+    if order_by == "id" and "id" not in all_cols:
+        order_by = None
+    if order_by is not None and order_by not in all_cols:
         typer.echo(f"❌ order_by 列が不正です: {order_by} （利用可能: {all_cols}）")
         raise typer.Exit(code=1)
 
-    # where 条件（等価のみ対応）
-    where_clauses = []
-    if where:
-        for expr in where:
-            if "=" not in expr:
-                typer.echo(f"⚠ 条件を無視しました（col=value 形式ではありません）: {expr}")
-                continue
-            k, v = expr.split("=", 1)
-            k = k.strip()
-            if k not in all_cols:
-                typer.echo(f"⚠ 未知の列の条件を無視しました: {k}")
-                continue
-            col = getattr(Model, k)
-            where_clauses.append(col == _parse_value(v))
-
-    # クエリ組み立て
-    stmt = select(Model)
-    if where_clauses:
-        stmt = stmt.where(*where_clauses)
-    order_col = getattr(Model, order_by)
-    stmt = stmt.order_by(sa_desc(order_col) if desc else order_col)
-    if limit:
-        stmt = stmt.limit(limit)
-
-    # 実行
-    with SessionLocal() as db:
-        rows = db.execute(stmt).scalars().all()
+    # where 条件（値は列の型に合わせて変換）
+    predicates = []
+    for expr in where or []:
+        try:
+            predicates.append(parse_predicate(Model, expr))
+        except KeyError as e:
+            typer.echo(f"⚠ 未知の列の条件を無視しました: {e.args[0]}")
+        except ValueError as e:
+            typer.echo(f"❌ {e}")
+            raise typer.Exit(code=1)
+    where_clauses = [p.clause for p in predicates]
+
+    # 関連の読み込み（--include）
+    includes: Dict[str, Dict] = {}
+    if include:
+        try:
+            includes = parse_includes(Model, include)
+        except KeyError as e:
+            typer.echo(f"❌ 未知の関連です: {e.args[0]}")
+            raise typer.Exit(code=1)
+    out_cols = [*selected_cols, *includes]
+
+    # キーセットページングの開始位置
+    after_values = None
+    if after is not None:
+        try:
+            after_values = parse_after(Model, keyset_columns(Model, order_by), after)
+        except (ValueError, KeyError) as e:
+            typer.echo(f"❌ --after の値が不正です: {e}")
+            raise typer.Exit(code=1)
+
+    # クエリ組み立て（--columns を SELECT 句に反映）
+    stmt, key_cols = build_select(
+        Model, selected_cols, where_clauses,
+        order_by=order_by, desc=desc, after=after_values, limit=limit, includes=includes,
+    )
+
+    if explain or analyze:
+        for msg in diagnose(Model, predicates, order_by) or ["✅ 条件列・並び替え列はすべてインデックスの先頭列です"]:
+            typer.echo(msg)
+        with ReadSessionLocal() as db:
+            typer.echo(f"\n🔎 {render_sql(db, stmt)}\n")
+            plan = [{k: serialize_value(v) for k, v in r.items()} for r in explain_stmt(db, stmt, analyze=analyze)]
+        _echo_table(plan, list(plan[0].keys()) if plan else [])
+        return
+
+    # 実行（サーバサイドカーソルで少しずつ受け取る）
+    with ReadSessionLocal() as db:
+        if includes:
+            # 関連は yield_per のチャンクごとに selectinload / joinedload でまとめて読む
+            select_cols = list(dict.fromkeys([*selected_cols, *key_cols]))
+            rows = stream_entity_rows(db, stmt, select_cols, includes, chunk_size=chunk_size)
+        else:
+            rows = stream_rows(db, stmt, chunk_size=chunk_size)
+
+        if output == "ndjson":
+            # 受け取った行から順に書き出す（全件をメモリに載せない）
+            last, n = None, 0
+            for d in rows:
+                typer.echo(json.dumps(
+                    {c: serialize_value(d[c]) for c in out_cols}, ensure_ascii=False
+                ))
+                last, n = d, n + 1
+            if limit and n == limit and last is not None:
+                typer.echo(f"➡ 次のページ: --after '{format_cursor(last, key_cols)}'", err=True)
+            return
+
+        raw_rows = list(rows)
 
     # 整形
-    dict_rows = [{k: _serialize_value(v) for k, v in _row_to_dict(r).items()} for r in rows]
+    dict_rows = [{c: serialize_value(d[c]) for c in out_cols} for d in raw_rows]
 
-    if output.lower() == "json":
-        typer.echo(json.dumps(
-            [{k: v for k, v in d.items() if k in selected_cols} for d in dict_rows],
-            ensure_ascii=False, indent=2
-        ))
+    if output == "json":
+        typer.echo(json.dumps(dict_rows, ensure_ascii=False, indent=2))
         return
 
-    # table 出力（簡易）
-    widths = {c: max(len(c), *(len(str(d.get(c, ""))) for d in dict_rows)) for c in selected_cols}
-    header = " | ".join(c.ljust(widths[c]) for c in selected_cols)
-    sep = "-+-".join("-" * widths[c] for c in selected_cols)
-    typer.echo(header)
-    typer.echo(sep)
+    # table 出力（簡易）。関連は件数 / 名前だけを表示する
     for d in dict_rows:
-        line = " | ".join(str(d.get(c, "")).ljust(widths[c]) for c in selected_cols)
-        typer.echo(line)
+        for name in includes:
+            d[name] = _include_label(d[name])
+    _echo_table(dict_rows, out_cols)
+    if limit and len(raw_rows) == limit:
+        typer.echo(f"➡ 次のページ: --after '{format_cursor(raw_rows[-1], key_cols)}'")
 
 
+#################################################################
+# 以下は、テーブルのファイル出力（CSV / NDJSON / Parquet / Arrow）
+#################################################################
+@cli.command("export")
+def export(
+    model: str = typer.Argument(..., help="モデル名（Party / Category / Law / PartyLawRole）または all"),
+    fmt: str = typer.Option("csv", "--format", "-f", help="出力形式: csv | ndjson | parquet | arrow", case_sensitive=False),
+    out: Optional[Path] = typer.Option(None, "--out", "-o", help="出力先ファイル（all のときはディレクトリ）。未指定は標準出力"),
+    columns: Optional[str] = typer.Option(None, "--columns", "-c", help="出力する列をカンマ区切りで指定（未指定: csv は seed-master の列、それ以外は全列）"),
+    since: Optional[str] = typer.Option(None, "--since", help="Law.updated_at がこの日時以降の行だけを出力（例: 2025-01-01T00:00:00）"),
+    law_key: str = typer.Option("law_number", "--law-key", help="PartyLawRole で Law を表す列: law_number | title"),
+    chunk_size: int = typer.Option(10_000, "--chunk-size", help="サーバサイドカーソルで一度に受け取る行数"),
+):
+    """
+    テーブルをサーバサイドカーソルで少しずつ読み、ファイルへ書き出す（メモリは一定）。
+    csv は seed-master がそのまま読める形式（pa export all -o DIR → pa seed-master --seeds-dir DIR）。
+    parquet / arrow には pyarrow が必要。
+    例:
+      pa export all -o /tmp/dump
+      pa export Law -f ndjson --since 2025-04-01 > laws.ndjson
+      pa export PartyLawRole -f parquet -o roles.parquet
+    """
+    import time
+    from datetime import datetime
+    from partyapp.db.base import ReadSessionLocal
+    from partyapp.services.export import EXPORT_MODELS, FORMATS, export_model, export_path, require_pyarrow, since_applies
+    from partyapp.services.key_resolver import LAW_JOIN_KEYS
+
+    fmt = fmt.lower()
+    if fmt not in FORMATS:
+        typer.echo(f"❌ 出力形式が不正です: {fmt} （候補: {', '.join(FORMATS)}）")
+        raise typer.Exit(code=1)
+    if law_key not in LAW_JOIN_KEYS:
+        typer.echo(f"❌ --law-key が不正です: {law_key} （候補: {', '.join(LAW_JOIN_KEYS)}）")
+        raise typer.Exit(code=1)
+    if fmt in ("parquet", "arrow"):
+        try:
+            require_pyarrow()
+        except RuntimeError as e:
+            typer.echo(f"❌ {e}")
+            raise typer.Exit(code=1)
+    since_dt = None
+    if since:
+        try:
+            since_dt = datetime.fromisoformat(since)
+        except ValueError:
+            typer.echo(f"❌ --since の日時が不正です: {since} （例: 2025-01-01T00:00:00）")
+            raise typer.Exit(code=1)
+
+    if model == "all":
+        if out is None or columns:
+            typer.echo("❌ all のときは --out に出力先ディレクトリを指定してください（--columns は使えません）")
+            raise typer.Exit(code=1)
+        out.mkdir(parents=True, exist_ok=True)
+        targets = [(M, export_path(out, M, fmt)) for M in EXPORT_MODELS]
+    else:
+        Model = {M.__name__: M for M in EXPORT_MODELS}.get(model)
+        if Model is None:
+            typer.echo(f"❌ 未知のモデル名です: {model} （候補: {', '.join(M.__name__ for M in EXPORT_MODELS)}, all）")
+            raise typer.Exit(code=1)
+        if out is None and fmt in ("parquet", "arrow"):
+            typer.echo(f"❌ {fmt} 形式は --out でファイルを指定してください")
+            raise typer.Exit(code=1)
+        targets = [(Model, out)]
+    selected = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+
+    with ReadSessionLocal() as db:
+        for Model, path in targets:
+            if since_dt is not None and not since_applies(Model):
+                typer.echo(f"⚠ --since は Law とその中間テーブルにのみ適用されます（{Model.__name__} は全件）", err=True)
+            started = time.perf_counter()
+            try:
+                n = export_model(
+                    db, Model, fmt, path, columns=selected, since=since_dt,
+                    chunk_size=chunk_size, law_key=law_key,
+                )
+            except ValueError as e:
+                typer.echo(f"❌ {e}")
+                raise typer.Exit(code=1)
+            elapsed = time.perf_counter() - started
+            rate = n / elapsed if elapsed > 0 else float("inf")
+            typer.echo(f"💾 {path or '(stdout)'}: {Model.__name__} {n:,} 行 ({elapsed:.2f}s, {rate:,.0f} rows/sec)", err=True)
+
+
+#################################################################
+# 以下は、ローカルミラー（本番 DB → SQLite。pa --local の読み取り先）
+#################################################################
+@cli.command("sync-local")
+def sync_local(
+    full: bool = typer.Option(False, "--full", help="差分ではなく全テーブルを作り直して全件コピーする（検索インデックスも作り直す）"),
+    batch_size: int = typer.Option(5000, "--batch-size", help="本番から 1 回に読む行数"),
+    status: bool = typer.Option(False, "--status", help="同期せず、ローカルミラーの同期状態を表示する"),
+):
+    """
+    本番 DB のデータのテーブルをローカルの SQLite（DB_LOCAL_PATH）へ複製する。2 回目以降は差分だけを取り込む。
+    全文検索インデックスは複製せず、同期後にローカルで差分更新する（本番で作成済みの場合）。
+    複製後は pa --local show Law のように、読み取り専用のコマンドをネットワークを介さずに実行できる。
+    """
+    import os
+    import time
+    from partyapp import config
+    from partyapp.db.base import ReadSessionLocal, get_local_engine
+    from partyapp.services.local_mirror import load_state, sync_local as run_sync
+
+    if status:
+        if not os.path.exists(config.DB_LOCAL_PATH):
+            typer.echo(f"（ローカルミラーはまだありません: {config.DB_LOCAL_PATH}）")
+            return
+        with get_local_engine().connect() as conn:
+            state = load_state(conn)
+        _echo_table(
+            [{"table": name, "rows": st.row_count, "watermark": st.watermark, "synced_at": st.synced_at} for name, st in state.items()],
+            ["table", "rows", "watermark", "synced_at"],
+        )
+        return
+    if batch_size < 1:
+        typer.echo("❌ --batch-size は 1 以上を指定してください")
+        raise typer.Exit(code=1)
+
+    labels = {"full": "全件", "since": "差分", "keyset": "キーセット差分"}
+
+    def _echo(r: Dict[str, Any]) -> None:
+        typer.echo(
+            f"✅ {r['table']}: 追加 {r['inserted']:,} / 更新 {r['updated']:,} / 削除 {r['deleted']:,} "
+            f"→ {r['rows']:,} 行（{labels[r['mode']]}, {r['elapsed']:.2f}s）"
+        )
+
+    started = time.perf_counter()
+    with ReadSessionLocal() as db:
+        run_sync(db, get_local_engine(), full=full, batch_size=batch_size, on_table=_echo)
+    size_mb = os.path.getsize(config.DB_LOCAL_PATH) / 1e6
+    typer.echo(f"💾 {config.DB_LOCAL_PATH}（{size_mb:,.1f} MB）同期完了 ({time.perf_counter() - started:.2f}s)")
+
+
+#################################################################
+# 以下は、法令の全文検索（Law.title / Law.summary）
+#################################################################
+@cli.command("search")
+def search(
+    query: str = typer.Argument(..., help="検索語（空白区切りで AND 検索）"),
+    limit: int = typer.Option(20, "--limit", "-n", help="最大表示件数"),
+    law_type: Optional[str] = typer.Option(None, "--type", "-t", help="法令種別で絞り込み（例: statute）"),
+    jurisdiction: Optional[str] = typer.Option(None, "--jurisdiction", "-j", help="管轄で絞り込み（national | local）"),
+    category: Optional[str] = typer.Option(None, "--category", help="分類で絞り込み（例: economy）"),
+    refresh: bool = typer.Option(False, "--refresh", help="検索前にインデックスを差分更新する"),
+    output: str = typer.Option("table", "--output", "-f", help="出力形式: table | json", case_sensitive=False),
+):
+    """
+    法令名・概要を全文検索し、スコア順にスニペット付きで表示する。
+    事前に pa search-reindex でインデックスを作成しておくこと。
+    例:
+      pa search 消費税
+      pa search "個人情報 保護" --type statute -n 5
+    """
+    import json
+    from partyapp.db.base import ReadSessionLocal
+    from partyapp.db.models.enums import CategoryType, JurisdictionLevel, LawType
+    from partyapp.services.query import serialize_value
+    from partyapp.db.replica import use_primary
+    from partyapp.services.search import search_laws, refresh_index
+
+    for val, enum_cls, opt in ((law_type, LawType, "--type"), (jurisdiction, JurisdictionLevel, "--jurisdiction"), (category, CategoryType, "--category")):
+        if val is not None and val not in enum_cls.__members__:
+            typer.echo(f"❌ {opt} の値が不正です: {val} （候補: {', '.join(enum_cls.__members__)}）")
+            raise typer.Exit(code=1)
+
+    with ReadSessionLocal() as db:
+        if refresh:
+            # 索引の差分は更新後の結果も含めてプライマリで読む（レプリカの遅延で古い索引を見ない）
+            with use_primary(db):
+                refresh_index(db)
+        hits = search_laws(db, query, limit=limit, law_type=law_type, jurisdiction=jurisdiction, category=category)
+
+    rows = [{k: serialize_value(v) for k, v in h.items()} for h in hits]
+    if output.lower() == "json":
+        typer.echo(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+    if not rows:
+        typer.echo("（該当なし）")
+        return
+    for i, r in enumerate(rows, start=1):
+        typer.echo(f"{i:>3}. {r['title']}  [{r['type']}/{r['jurisdiction']}] score={r['score']}  id={r['id']}")
+        typer.echo(f"     {r['snippet']}")
+
+@cli.command("search-reindex")
+def search_reindex(
+    full: bool = typer.Option(False, "--full", help="差分ではなく全件を作り直す"),
+    batch_size: int = typer.Option(500, "--batch-size", help="1回に再インデックスする法令数"),
+):
+    """全文検索インデックスを Law.updated_at の差分で更新する（--full で全件再作成）"""
+    import time
+    from partyapp.db.base import SessionLocal
+    from partyapp.services.search import refresh_index
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        n = refresh_index(db, full=full, batch_size=batch_size)
+    typer.echo(f"✅ 検索インデックス更新: {n} 件 ({time.perf_counter() - started:.2f}s)")
+
+
+#################################################################
+# 以下は、コネクションプールの統計
+#################################################################
+def _probe_pool(n: int, concurrency: int, hold_ms: float) -> float:
+    """SELECT 1 を n 回、concurrency 並列で実行し、所要秒数を返す"""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy import text
+    from partyapp.db.base import engine
+
+    def one(_):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            if hold_ms > 0:
+                time.sleep(hold_ms / 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        list(ex.map(one, range(n)))
+    return time.perf_counter() - started
+
+@cli.command("pool-stats")
+def pool_stats(
+    probe: int = typer.Option(0, "--probe", help="計測用に SELECT 1 を N 回実行してから表示する"),
+    concurrency: int = typer.Option(1, "--concurrency", "-c", help="--probe の同時実行数"),
+    hold_ms: float = typer.Option(0.0, "--hold-ms", help="--probe で 1 回あたり接続を保持するミリ秒（想定処理時間）"),
+    output: str = typer.Option("table", "--output", "-f", help="出力形式: table | json", case_sensitive=False),
+):
+    """
+    コネクションプールの設定と統計（チェックアウト待ち時間ヒストグラム、使用中/オーバーフロー数、
+    無効化・pre-ping 失敗回数）を表示する。プール設定は環境変数 DB_POOL_* で変更できる。
+    読み取りレプリカ（DATABASE_READ_URL）があれば、SELECT 1 で確認した状態も表示する。
+    例:
+      pa pool-stats --probe 1000 -c 20 --hold-ms 5
+    Python からは partyapp.db.base.get_pool_stats() で同じ値を取得できる。
+    """
+    import json
+    from partyapp.db.base import get_replica_set, pool_monitor
+
+    if probe > 0:
+        elapsed = _probe_pool(probe, concurrency, hold_ms)
+        typer.echo(f"🔎 probe: {probe} 回 / 同時 {concurrency} / {elapsed:.2f}s ({probe / elapsed:,.0f} checkouts/sec)", err=True)
+
+    stats = pool_monitor.snapshot()
+    replicas = get_replica_set()
+    if replicas is not None:
+        for i in range(len(replicas.engines)):
+            replicas.ping(i)
+        stats["replicas"] = replicas.status()
+    if output.lower() == "json":
+        typer.echo(json.dumps(stats, ensure_ascii=False, indent=2))
+        return
+
+    hist = stats.pop("checkout_histogram")
+    replica_status = stats.pop("replicas", None)
+    width = max(len(k) for k in stats)
+    typer.echo("📊 コネクションプール:")
+    for k, v in stats.items():
+        typer.echo(f"  {k.ljust(width)}  {round(v, 3) if isinstance(v, float) else v}")
+    typer.echo("⏱ チェックアウト待ち時間:")
+    peak = max(hist.values()) or 1
+    for label, n in hist.items():
+        typer.echo(f"  {label:>9}  {n:>8}  {'█' * round(n / peak * 40)}")
+    if replica_status is not None:
+        typer.echo("📡 読み取りレプリカ:")
+        for r in replica_status:
+            typer.echo(f"  {'✅' if r['healthy'] else '❌'} {r['url']}  （接続失敗 {r['failures']} 回）")
+
+
+#################################################################
+# 以下は、ベンチマーク用の fixtures 生成
+#################################################################
+@cli.command("gen-fixtures")
+def gen_fixtures(
+    out_dir: Path = typer.Argument(..., help="CSV の出力先ディレクトリ"),
+    laws: int = typer.Option(10_000, "--laws", "-n", help="Law の行数（10k〜10M 程度を想定）"),
+    parties: int = typer.Option(40, "--parties", help="Party の行数"),
+    roles_per_law: float = typer.Option(3.0, "--roles-per-law", help="法令 1 件あたりの関与政党数（平均）"),
+    categories_per_law: float = typer.Option(1.5, "--categories-per-law", help="法令 1 件あたりの分類数（平均）"),
+    seed: int = typer.Option(42, "--seed", help="乱数シード（同じ値なら同じ内容を生成）"),
+):
+    """
+    ベンチマーク用に seed-master 形式の CSV（Party / Category / Law /
+    party_law_roles / law_categories）を生成する。
+    例:
+      pa gen-fixtures /tmp/fx --laws 1000000
+      pa seed-master --seeds-dir /tmp/fx
+    """
+    import time
+    from partyapp.services.fixtures import generate_fixtures
+
+    if laws < 1 or parties < 1:
+        typer.echo("❌ --laws / --parties は 1 以上を指定してください")
+        raise typer.Exit(code=1)
+    started = time.perf_counter()
+    counts = generate_fixtures(
+        out_dir, laws=laws, parties=parties, roles_per_law=roles_per_law,
+        categories_per_law=categories_per_law, seed=seed,
+    )
+    for name, n in counts.items():
+        typer.echo(f"📝 {out_dir / name}: {n:,} 行")
+    typer.echo(f"✅ fixtures 生成完了 ({time.perf_counter() - started:.2f}s)")
+
+
+#################################################################
+# 以下は、政党の投票行動の分析（NumPy）
+#################################################################
+def _echo_matrix(title: str, names: List[str], rows: List[List[Optional[float]]]) -> None:
+    typer.echo(title)
+    short = [n[:6] for n in names]
+    width = max(len(n) for n in names)
+    typer.echo(" " * (width + 2) + " ".join(f"{n:>6}" for n in short))
+    for name, row in zip(names, rows):
+        cells = " ".join("     -" if v is None else f"{v:6.2f}" for v in row)
+        typer.echo(f"{name.ljust(width)}  {cells}")
+
+@cli.command("analyze")
+def analyze(
+    report: List[str] = typer.Option(
+        ["agreement", "timeline"], "--report", "-r",
+        help="agreement | similarity | timeline | category | all（複数指定可）",
+    ),
+    pair: Optional[str] = typer.Option(None, "--pair", help="公布年ごとの一致率を出す 2 党（例: 自由民主党,公明党）"),
+    min_common: int = typer.Option(10, "--min-common", help="一致率を出す最小の共通法令数"),
+    chunk_size: int = typer.Option(50_000, "--chunk-size", help="DB から一度に受け取る行数"),
+    output: str = typer.Option("table", "--output", "-f", help="出力形式: table | json", case_sensitive=False),
+):
+    """
+    T_PARTY_LAW_ROLE を列指向の配列に一括ロードし、政党間の一致率・類似度、
+    公布年ごとの多数派との一致率、分類ごとの賛成率を計算する（NumPy が必要）。
+    例:
+      pa analyze
+      pa analyze -r all -f json > analysis.json
+      pa analyze -r timeline --pair 自由民主党,公明党
+    """
+    import json
+    import time
+    from partyapp.db.base import ReadSessionLocal
+    from partyapp.services import analytics
+
+    valid = ("agreement", "similarity", "timeline", "category")
+    reports = list(valid) if "all" in report else report
+    unknown = [r for r in reports if r not in valid]
+    if unknown:
+        typer.echo(f"❌ --report の値が不正です: {unknown} （候補: {', '.join(valid)}, all）")
+        raise typer.Exit(code=1)
+    try:
+        analytics.require_numpy()
+    except RuntimeError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(code=1)
+
+    started = time.perf_counter()
+    with ReadSessionLocal() as db:
+        frame = analytics.load_role_frame(db, chunk_size=chunk_size)
+    loaded = time.perf_counter()
+
+    pair_idx = None
+    if pair:
+        names = [n.strip() for n in pair.split(",")]
+        missing = [n for n in names if n not in frame.party_names]
+        if len(names) != 2 or missing:
+            typer.echo(f"❌ --pair には存在する政党名を 2 つ指定してください: {pair}")
+            raise typer.Exit(code=1)
+        pair_idx = (frame.party_names.index(names[0]), frame.party_names.index(names[1]))
+        if "timeline" not in reports:
+            reports.append("timeline")
+
+    result = analytics.analyze(frame, reports, min_common=min_common, pair=pair_idx)
+    done = time.perf_counter()
+    typer.echo(
+        f"📥 ロード: {len(frame):,} 役割行 / {frame.n_laws:,} 法令 / {frame.n_parties} 政党 ({loaded - started:.2f}s)"
+        f"  🧮 計算: {done - loaded:.2f}s",
+        err=True,
+    )
+
+    if output.lower() == "json":
+        typer.echo(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+
+    names = result["parties"]
+    if "agreement" in result:
+        _echo_matrix(f"🤝 一致率（共通法令 {min_common} 件以上）:", names, result["agreement"])
+    if "similarity" in result:
+        _echo_matrix("📐 コサイン類似度:", names, result["similarity"])
+    if "timeline" in result:
+        tl = result["timeline"]
+        typer.echo("📈 多数派との一致率（公布年ごと）:")
+        for name, rates in tl["majority_alignment"].items():
+            pts = [f"{y}:{r:.2f}" for y, r in zip(tl["years"], rates) if r is not None]
+            if pts:
+                typer.echo(f"  {name}: {' '.join(pts[-10:])}")
+        if "pair" in tl:
+            pr = tl["pair"]
+            typer.echo(f"📈 {pr['parties'][0]} × {pr['parties'][1]} の一致率（公布年ごと）:")
+            for y, r, n in zip(pr["years"], pr["agreement"], pr["laws"]):
+                typer.echo(f"  {y}  {r:.2f}  ({n} 件)")
+    if "category" in result:
+        typer.echo("🗂 分類ごとの賛成率:")
+        for name, cats in result["category"].items():
+            cells = [f"{c}:{v['support_rate']:.2f}" for c, v in cats.items() if v["support_rate"] is not None]
+            typer.echo(f"  {name}: {' '.join(cells)}")
+
+
+#################################################################
+# 以下は、集計レポート（DB 側の GROUP BY と集計済みテーブル）
+#################################################################
+@cli.command("stats")
+def stats(
+    report: str = typer.Argument("roles", help="roles（政党×役割×分類×公布年）| types（種別×管轄×公布年）"),
+    by: Optional[str] = typer.Option(None, "--by", help="集計軸（カンマ区切り）。roles: party,role,category,year / types: type,jurisdiction,year"),
+    party: Optional[str] = typer.Option(None, "--party", help="政党名で絞り込み"),
+    role: Optional[str] = typer.Option(None, "--role", help="役割で絞り込み（例: submitter）"),
+    category: Optional[str] = typer.Option(None, "--category", help="分類で絞り込み（例: economy）"),
+    law_type: Optional[str] = typer.Option(None, "--type", "-t", help="法令種別で絞り込み（例: statute）"),
+    jurisdiction: Optional[str] = typer.Option(None, "--jurisdiction", "-j", help="管轄で絞り込み（national | local）"),
+    year_from: Optional[int] = typer.Option(None, "--from", help="公布年の下限"),
+    year_to: Optional[int] = typer.Option(None, "--to", help="公布年の上限"),
+    source: str = typer.Option("auto", "--source", help="auto（集計済みテーブルで答えられれば使う）| live | summary", case_sensitive=False),
+    refresh: bool = typer.Option(False, "--refresh", help="集計前に集計済みテーブルを差分更新する"),
+    limit: int = typer.Option(0, "--limit", "-n", help="最大表示行数（0 = 全件）"),
+    output: str = typer.Option("table", "--output", "-f", help="出力形式: table | json", case_sensitive=False),
+):
+    """
+    法令数の集計を DB 側の GROUP BY で行って表示する。
+    pa stats-refresh で集計済みテーブルを作っておくと、そこから読む（--source で切替）。
+    例:
+      pa stats --by party,category,year --role submitter
+      pa stats types --by type,year --from 2000
+    """
+    import json
+    from partyapp.db.base import ReadSessionLocal
+    from partyapp.db.models.enums import CategoryType, JurisdictionLevel, LawType, PartyRole
+    from partyapp.db.replica import use_primary
+    from partyapp.services.stats import REPORTS, refresh_summary, run_stats, summary_enabled
+
+    for val, enum_cls, opt in (
+        (role, PartyRole, "--role"), (category, CategoryType, "--category"),
+        (law_type, LawType, "--type"), (jurisdiction, JurisdictionLevel, "--jurisdiction"),
+    ):
+        if val is not None and val not in enum_cls.__members__:
+            typer.echo(f"❌ {opt} の値が不正です: {val} （候補: {', '.join(enum_cls.__members__)}）")
+            raise typer.Exit(code=1)
+    if source.lower() not in ("auto", "live", "summary"):
+        typer.echo(f"❌ --source の値が不正です: {source} （候補: auto, live, summary）")
+        raise typer.Exit(code=1)
+
+    dims = [d.strip() for d in by.split(",") if d.strip()] if by else list(REPORTS.get(report, ()))
+    filters = {
+        "party": party, "role": role, "category": category, "type": law_type,
+        "jurisdiction": jurisdiction, "year_from": year_from, "year_to": year_to,
+    }
+    with ReadSessionLocal() as db:
+        if refresh and summary_enabled(db):
+            with use_primary(db):
+                refresh_summary(db)
+        try:
+            rows, used = run_stats(db, report, dims, filters, source=source.lower(), limit=limit or None)
+        except ValueError as e:
+            typer.echo(f"❌ {e}")
+            raise typer.Exit(code=1)
+    typer.echo(f"📊 {report}（{'集計済みテーブル' if used == 'summary' else 'ライブ集計'}）: {len(rows)} 行", err=True)
+
+    if output.lower() == "json":
+        typer.echo(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+    if not rows:
+        typer.echo("（該当なし）")
+        return
+    _echo_table(rows, [*dims, "laws"])
+
+@cli.command("stats-refresh")
+def stats_refresh(
+    full: bool = typer.Option(False, "--full", help="差分ではなく全件を作り直す"),
+):
+    """
+    pa stats の集計済みテーブルを Law.updated_at と seed の変更記録の差分で更新する
+    （初回は全件作成。以降は seed-master の後にも自動で差分更新される）。
+    """
+    from partyapp.db.base import SessionLocal
+    from partyapp.services.stats import summary_enabled
+
+    with SessionLocal() as db:
+        first = not summary_enabled(db)
+    _refresh_stats_summary(full=full or first)
+
+
+#################################################################
+# 以下は、対話シェル（1 プロセスで続けてコマンドを実行する）
+#################################################################
+# 行ごとに元へ戻す設定（--local / --primary はその行だけに効かせる）
+_SHELL_CONFIG_KEYS = ("DB_READ_PRIMARY", "DB_READ_LOCAL")
+_in_shell = False
+
+def _shell_warm_up() -> None:
+    """モデルの登録・マッパーの構成・読み取り用の接続の確立を先に済ませる"""
+    from sqlalchemy import text
+    from sqlalchemy.orm import configure_mappers
+    from partyapp.db.base import get_read_sessionmaker
+
+    _load_models()
+    configure_mappers()
+    with get_read_sessionmaker()() as db:
+        db.execute(text("SELECT 1"))
+
+def _shell_run(command, argv: List[str]) -> int:
+    """argv を pa のコマンドとして実行し、終了コードを返す（エラーでもシェルは終わらせない）"""
+    from partyapp import config
+
+    saved = {k: getattr(config, k) for k in _SHELL_CONFIG_KEYS}
+    try:
+        # standalone_mode では使い方の誤りも pa 単体と同じ表示になり、最後は SystemExit で終わる
+        command.main(args=argv, prog_name="pa", standalone_mode=True)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except KeyboardInterrupt:
+        typer.echo("⚠ 中断しました", err=True)
+        return 130
+    except Exception as e:
+        typer.echo(f"❌ {type(e).__name__}: {e}", err=True)
+        return 1
+    finally:
+        for k, v in saved.items():
+            setattr(config, k, v)
+    return 0
+
+@cli.command("shell")
+def shell(
+    timing: bool = typer.Option(False, "--timing", help="コマンドごとの実行時間を表示する"),
+    warm: bool = typer.Option(True, "--warm/--no-warm", help="起動時にマッパーの構成と DB への接続を済ませておく"),
+):
+    """
+    pa のコマンドを 1 プロセスで続けて実行する（Python の起動・import・マッパーの構成・接続の確立は最初の 1 回だけ）。
+    1 行に 1 コマンドを書く（先頭の pa は省略可）。exit / quit / Ctrl-D で終了。
+    標準入力がパイプやファイルなら各行を順に実行し、失敗した行があれば終了コード 1 で終わる。
+    例:
+      pa shell
+      pa --local shell --timing
+      printf 'show Law -n 5\\nstats types\\n' | pa shell
+    """
+    global _in_shell
+    import shlex
+    import sys
+    import time
+    from typer.main import get_command
+
+    if _in_shell:
+        typer.echo("❌ shell の中で shell は実行できません")
+        raise typer.Exit(code=1)
+    interactive = sys.stdin.isatty()
+    if interactive:
+        try:
+            import readline  # noqa: F401  行編集と履歴（↑↓）を有効にする
+        except ImportError:
+            pass
+
+    command = get_command(cli)
+    if warm:
+        started = time.perf_counter()
+        try:
+            _shell_warm_up()
+        except Exception as e:
+            typer.echo(f"⚠ 事前の接続に失敗しました（各コマンドの実行時に接続します）: {e}", err=True)
+        else:
+            if interactive:
+                typer.echo(f"⏱ 準備完了 ({time.perf_counter() - started:.2f}s)。help でコマンド一覧、exit で終了", err=True)
+
+    failed = 0
+    _in_shell = True
+    try:
+        while True:
+            try:
+                line = input("pa> ") if interactive else sys.stdin.readline()
+            except EOFError:
+                break
+            except KeyboardInterrupt:
+                typer.echo("")
+                continue
+            if not interactive and line == "":
+                break
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line in ("exit", "quit"):
+                break
+            try:
+                argv = shlex.split(line)
+            except ValueError as e:
+                typer.echo(f"❌ {e}", err=True)
+                failed += 1
+                continue
+            if argv[0] == "pa":
+                argv = argv[1:]
+            if argv in ([], ["help"]):
+                argv = ["--help"]
+
+            started = time.perf_counter()
+            code = _shell_run(command, argv)
+            if timing:
+                typer.echo(f"⏱ {(time.perf_counter() - started) * 1000:.1f} ms", err=True)
+            if code:
+                failed += 1
+    finally:
+        _in_shell = False
+    if failed and not interactive:
+        raise typer.Exit(code=1)
+
 if __name__ == "__main__":
-    cli()
\ No newline at end of file
+    cli()
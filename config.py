@@ -7,3 +7,38 @@ DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 
 DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# 非同期ドライバ（aiomysql）用。接続先は同期版と同じ
+ASYNC_DATABASE_URL = f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# ---- コネクションプール設定（同期/非同期エンジン共通） ----
+def _env_int(name: str, default: int) -> int:
+    v = os.getenv(name)
+    return int(v) if v not in (None, "") else default
+
+def _env_bool(name: str, default: bool) -> bool:
+    v = os.getenv(name)
+    if v in (None, ""):
+        return default
+    return v.strip().lower() in ("1", "true", "yes", "on")
+
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)              # 常時保持する接続数
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)       # pool_size を超えて一時的に開ける接続数
+DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)       # 空き接続を待つ秒数（超えると TimeoutError）
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 3600)     # MySQL の wait_timeout 対策（秒, -1 で無効）
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)  # チェックアウト時の切断検知
+
+# ---- 読み取りレプリカ（任意） ----
+# DATABASE_READ_URL にレプリカの URL を（複数ならカンマ区切りで）指定すると、
+# 読み取り専用のコマンド（show / search / export / stats / analyze）の SELECT をレプリカへ振り分ける。
+# 未設定ならすべてプライマリ（DATABASE_URL）で読む。
+# 例: DATABASE_READ_URL=mysql+pymysql://user:pw@replica1:3306/partyapp,mysql+pymysql://user:pw@replica2:3306/partyapp
+DATABASE_READ_URLS = [u.strip() for u in (os.getenv("DATABASE_READ_URL") or "").split(",") if u.strip()]
+DB_REPLICA_RETRY = _env_int("DB_REPLICA_RETRY", 30)        # 落ちたレプリカを外す秒数 / 再確認の間隔
+DB_READ_PRIMARY = _env_bool("DB_READ_PRIMARY", False)      # レプリカ設定があってもプライマリで読む（pa --primary）
+
+# ---- ローカルミラー（任意） ----
+# pa sync-local が本番の全テーブルをこの SQLite ファイルへ複製し（2 回目以降は差分）、
+# pa --local（または DB_READ_LOCAL=1）のとき、読み取り専用のコマンドはネットワークを介さずここを読む。
+DB_LOCAL_PATH = os.path.expanduser(os.getenv("DB_LOCAL_PATH") or "~/.partyapp/mirror.sqlite3")
+DB_READ_LOCAL = _env_bool("DB_READ_LOCAL", False)          # 読み取りをローカルミラーで行う（pa --local）
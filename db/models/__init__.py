@@ -3,8 +3,14 @@ from .party import Party
 from .category import Category
 from .law import Law
 from .associations import LawCategoryMap, PartyLawRole
+from .search import LawSearchToken, SearchIndexState
+from .stats import StatsDirtyLaw, StatsLawTypeSummary, StatsLawYear, StatsPartyRoleSummary, StatsState
+from .seed_progress import SeedProgress
 
 __all__ = [
     "LawType", "JurisdictionLevel", "PartyRole", "CategoryType",
     "Party", "Category", "Law", "LawCategoryMap", "PartyLawRole",
+    "LawSearchToken", "SearchIndexState",
+    "StatsPartyRoleSummary", "StatsLawTypeSummary", "StatsLawYear", "StatsDirtyLaw", "StatsState",
+    "SeedProgress",
 ]
\ No newline at end of file
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from sqlalchemy import CHAR, DateTime, ForeignKey, Index, Integer, SmallInteger, String
+from sqlalchemy.dialects.mysql import VARCHAR
+from sqlalchemy.orm import Mapped, mapped_column
+
+from partyapp.db.base import Base
+
+# 全文検索用の n-gram 転置インデックス（pa search / pa search-reindex が保守する）
+# MariaDB の FULLTEXT は日本語の分かち書きに対応しないため、
+# Law.title / Law.summary を文字 bigram に分解してアプリ側で保持する。
+class LawSearchToken(Base):
+    __tablename__ = "T_LAW_SEARCH_TOKEN"
+
+    # 文字単位で厳密に比較したいので MariaDB では utf8mb4_bin（既定照合順序だと大小・かな等を同一視する）
+    token: Mapped[str] = mapped_column(
+        String(8).with_variant(VARCHAR(8, collation="utf8mb4_bin"), "mysql", "mariadb"),
+        primary_key=True,
+    )
+    law_id: Mapped[str] = mapped_column(
+        CHAR(18), ForeignKey("T_LAW.id", ondelete="CASCADE"), primary_key=True
+    )
+    title_tf: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0, doc="title 内の出現回数")
+    summary_tf: Mapped[int] = mapped_column(Integer, nullable=False, default=0, doc="summary 内の出現回数")
+
+    __table_args__ = (
+        Index("ix_lst_law_id", "law_id"),
+    )
+
+# 検索インデックスの差分更新の状態（どの updated_at まで取り込んだか）
+class SearchIndexState(Base):
+    __tablename__ = "T_SEARCH_INDEX_STATE"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    watermark: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), doc="取り込み済みの Law.updated_at")
+    doc_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, doc="インデックス済みの法令数")
+    refreshed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Boolean, CHAR, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from partyapp.db.base import Base
+
+# seed-master --commit-every / --resume のチェックポイント（services/seed_checkpoint.py が読み書きする）
+# 投入したチャンクと同じトランザクションで更新するので、コミット済みのデータと必ず一致する。
+class SeedProgress(Base):
+    __tablename__ = "T_SEED_PROGRESS"
+
+    source: Mapped[str] = mapped_column(String(512), primary_key=True, doc="CSV の絶対パス")
+    content_hash: Mapped[str] = mapped_column(CHAR(64), nullable=False, doc="CSV 全体の SHA-256（内容が変わったら再開しない）")
+    rows_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0, doc="コミット済みの行数（ヘッダを除く）")
+    byte_offset: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, doc="コミット済みの最後の行の直後のバイト位置")
+    done: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, doc="ファイルの最後まで投入済み")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
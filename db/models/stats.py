@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from sqlalchemy import CHAR, DateTime, Index, Integer, SmallInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from partyapp.db.base import Base
+
+# pa stats の集計済みテーブル（services/stats.py が差分更新する）
+# ダッシュボードが T_PARTY_LAW_ROLE を毎回 GROUP BY しなくて済むよう、件数を事前計算して持つ。
+# 公布年（year）単位で作り直すので、year は公布日が無い法令を 0 とする。
+
+# 政党 × 役割 × 分類 × 公布年 ごとの法令数
+class StatsPartyRoleSummary(Base):
+    __tablename__ = "T_STATS_PARTY_ROLE"
+
+    party_id: Mapped[str] = mapped_column(CHAR(18), primary_key=True)
+    role: Mapped[str] = mapped_column(String(32), primary_key=True)
+    category: Mapped[str] = mapped_column(String(32), primary_key=True, doc="分類（未分類は空文字）")
+    year: Mapped[int] = mapped_column(SmallInteger, primary_key=True, doc="公布年（公布日なしは 0）")
+    law_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_spr_year", "year"),
+    )
+
+# 種別 × 管轄 × 公布年 ごとの法令数
+class StatsLawTypeSummary(Base):
+    __tablename__ = "T_STATS_LAW_TYPE"
+
+    type: Mapped[str] = mapped_column(String(32), primary_key=True)
+    jurisdiction: Mapped[str] = mapped_column(String(32), primary_key=True)
+    year: Mapped[int] = mapped_column(SmallInteger, primary_key=True, doc="公布年（公布日なしは 0）")
+    law_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_slt_year", "year"),
+    )
+
+# 集計済みの法令ごとの公布年（公布日が変わった法令の「変更前の年」を知るため）
+class StatsLawYear(Base):
+    __tablename__ = "T_STATS_LAW_YEAR"
+
+    law_id: Mapped[str] = mapped_column(CHAR(18), primary_key=True)
+    year: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+
+# seed が T_PARTY_LAW_ROLE / T_LAW_CATEGORY_MAP を書き換えた法令（Law.updated_at は変わらないため）
+class StatsDirtyLaw(Base):
+    __tablename__ = "T_STATS_DIRTY_LAW"
+
+    law_id: Mapped[str] = mapped_column(CHAR(18), primary_key=True)
+    marked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+# 集計済みテーブルの差分更新の状態（どの updated_at まで取り込んだか）
+class StatsState(Base):
+    __tablename__ = "T_STATS_STATE"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    watermark: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), doc="取り込み済みの Law.updated_at")
+    refreshed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
@@ -0,0 +1,172 @@
+# partyapp/db/pool.py
+# コネクションプールの計測。
+# SQLAlchemy のプールイベント（connect / checkout / checkin / invalidate）と
+# handle_error（pre-ping 失敗の検出）を PoolMonitor に集計する。
+# チェックアウト待ち時間はイベントでは取れないので、Pool.connect() を計時するプールクラスを使う。
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# チェックアウト待ち時間ヒストグラムの上限（ミリ秒）。最後のバケットは上限なし
+CHECKOUT_BUCKETS_MS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+class PoolMonitor:
+    """
+    1 つのエンジン（のプール）の統計。スレッドセーフ。
+    snapshot() で現在値を dict として取り出す。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pool = None  # instrument() が設定（dispose 後は新しいプールに差し替わる）
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.buckets = [0] * (len(CHECKOUT_BUCKETS_MS) + 1)
+            self.checkouts = 0
+            self.checkout_total_s = 0.0
+            self.checkout_max_s = 0.0
+            self.checkout_timeouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.soft_invalidations = 0
+            self.pre_ping_failures = 0
+            self.peak_in_use = 0
+            self.peak_overflow = 0
+
+    # ---- 記録 ----
+    def record_checkout(self, seconds: float) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            self.buckets[bisect.bisect_left(CHECKOUT_BUCKETS_MS, ms)] += 1
+            self.checkouts += 1
+            self.checkout_total_s += seconds
+            self.checkout_max_s = max(self.checkout_max_s, seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.checkout_timeouts += 1
+
+    def _on_connect(self, dbapi_conn, record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_conn, record, proxy) -> None:
+        in_use, overflow = self.in_use(), self.overflow()
+        with self._lock:
+            self.peak_in_use = max(self.peak_in_use, in_use)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def _on_invalidate(self, dbapi_conn, record, exc) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def _on_soft_invalidate(self, dbapi_conn, record, exc) -> None:
+        with self._lock:
+            self.soft_invalidations += 1
+
+    def _on_handle_error(self, ctx) -> None:
+        if getattr(ctx, "is_pre_ping", False):
+            with self._lock:
+                self.pre_ping_failures += 1
+
+    # ---- 現在値 ----
+    def in_use(self) -> int:
+        return self.pool.checkedout() if self.pool is not None else 0
+
+    def overflow(self) -> int:
+        # QueuePool.overflow() は pool_size 未満のとき負値になる
+        if self.pool is None or not hasattr(self.pool, "overflow"):
+            return 0
+        return max(0, self.pool.overflow())
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self.pool
+        with self._lock:
+            avg_ms = self.checkout_total_s / self.checkouts * 1000 if self.checkouts else 0.0
+            labels = [f"<={b:g}ms" for b in CHECKOUT_BUCKETS_MS] + [f">{CHECKOUT_BUCKETS_MS[-1]:g}ms"]
+            return {
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "pool_size": pool.size() if pool is not None and hasattr(pool, "size") else None,
+                "max_overflow": getattr(pool, "_max_overflow", None),
+                "pool_timeout": getattr(pool, "_timeout", None),
+                "recycle": getattr(pool, "_recycle", None),
+                "pre_ping": getattr(pool, "_pre_ping", None),
+                "in_use": self.in_use(),
+                "idle": pool.checkedin() if pool is not None and hasattr(pool, "checkedin") else 0,
+                "overflow": self.overflow(),
+                "peak_in_use": self.peak_in_use,
+                "peak_overflow": self.peak_overflow,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkout_avg_ms": avg_ms,
+                "checkout_max_ms": self.checkout_max_s * 1000,
+                "checkout_timeouts": self.checkout_timeouts,
+                "checkout_histogram": dict(zip(labels, self.buckets)),
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "pre_ping_failures": self.pre_ping_failures,
+            }
+
+class _TimedCheckout:
+    """Pool.connect() の所要時間（空き待ち + pre-ping を含む）を monitor に記録する"""
+
+    monitor: Optional[PoolMonitor] = None
+
+    def connect(self):
+        monitor = self.monitor
+        if monitor is None:
+            return super().connect()
+        t0 = time.perf_counter()
+        try:
+            conn = super().connect()
+        except PoolTimeoutError:
+            monitor.record_timeout()
+            raise
+        monitor.record_checkout(time.perf_counter() - t0)
+        return conn
+
+    def recreate(self):
+        # engine.dispose() でプールが作り直されても計測を引き継ぐ
+        new = super().recreate()
+        new.monitor = self.monitor
+        if self.monitor is not None:
+            self.monitor.pool = new
+        return new
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+_monitors: Dict[int, PoolMonitor] = {}
+
+def instrument(engine: Engine) -> PoolMonitor:
+    """
+    engine（非同期エンジンは .sync_engine）のプールに計測を仕掛けて PoolMonitor を返す。
+    同じエンジンに 2 回呼んでも同じ monitor を返す。
+    """
+    key = id(engine)
+    if key in _monitors:
+        return _monitors[key]
+    monitor = PoolMonitor()
+    monitor.pool = engine.pool
+    if isinstance(engine.pool, _TimedCheckout):
+        engine.pool.monitor = monitor
+    event.listen(engine.pool, "connect", monitor._on_connect)
+    event.listen(engine.pool, "checkout", monitor._on_checkout)
+    event.listen(engine.pool, "invalidate", monitor._on_invalidate)
+    event.listen(engine.pool, "soft_invalidate", monitor._on_soft_invalidate)
+    event.listen(engine, "handle_error", monitor._on_handle_error)
+    _monitors[key] = monitor
+    return monitor
@@ -0,0 +1,153 @@
+# partyapp/db/replica.py
+# 読み取りレプリカへの振り分け（config.DATABASE_READ_URLS が設定されているときだけ使われる）。
+# - ReplicaSet: レプリカのエンジン群。ラウンドロビンで選ぶ。
+#   接続エラー（切断・接続失敗）を起こしたレプリカは DB_REPLICA_RETRY 秒のあいだ外し、
+#   外したレプリカと、前回の確認から DB_REPLICA_RETRY 秒たったレプリカは選ぶ前に SELECT 1 で確認する。
+#   使えるレプリカが無ければ None を返し、呼び出し側はプライマリを使う。
+# - RoutingSession: 読み取り（SELECT。FOR UPDATE を除く）をレプリカへ、書き込みと flush をプライマリへ送る Session。
+#   1 トランザクションの読み取りは同じレプリカに固定する（トランザクション内で読み取り結果が揃うように）。
+#   一度書き込んだセッションは、以後の読み取りもプライマリで行う（read-your-writes）。
+#   明示的にプライマリで読みたいときは use_primary(db) を使う。
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import CompoundSelect, Select
+
+class ReplicaSet:
+    """読み取りレプリカのエンジン群（ラウンドロビン + ヘルスチェック）。スレッドセーフ。"""
+
+    def __init__(self, engines: Sequence[Engine], retry_s: float = 30.0):
+        self.engines: List[Engine] = list(engines)
+        self.retry_s = retry_s
+        self._lock = threading.Lock()
+        self._next = 0
+        self._down_until: Dict[int, float] = {}  # 外しているレプリカ -> 再確認してよい時刻
+        self._checked_at: Dict[int, float] = {}  # 最後に使えることを確認した時刻
+        self.failures = [0] * len(self.engines)
+        for i, eng in enumerate(self.engines):
+            event.listen(eng, "handle_error", self._on_error(i))
+
+    def _on_error(self, i: int):
+        def handler(ctx) -> None:
+            # SQL の誤りなどでは外さない。切断・接続失敗だけ
+            if ctx.is_disconnect or ctx.connection is None:
+                self.mark_down(i)
+        return handler
+
+    def mark_down(self, i: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._down_until.get(i, now) <= now:  # 同じ失敗で handle_error と ping から 2 回呼ばれても 1 回と数える
+                self.failures[i] += 1
+            self._down_until[i] = now + self.retry_s
+            self._checked_at.pop(i, None)
+
+    def ping(self, i: int) -> bool:
+        """SELECT 1 が通れば使える状態に戻す"""
+        try:
+            with self.engines[i].connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+        except SQLAlchemyError:
+            self.mark_down(i)
+            return False
+        with self._lock:
+            self._down_until.pop(i, None)
+            self._checked_at[i] = time.monotonic()
+        return True
+
+    def pick(self) -> Optional[Engine]:
+        """次に使うレプリカ。使えるものが無ければ None"""
+        n = len(self.engines)
+        for _ in range(n):
+            now = time.monotonic()
+            with self._lock:
+                i = self._next % n
+                self._next += 1
+                down = self._down_until.get(i)
+                fresh = now - self._checked_at.get(i, float("-inf")) < self.retry_s
+            if down is not None and now < down:
+                continue
+            if fresh or self.ping(i):
+                return self.engines[i]
+        return None
+
+    def status(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "url": eng.url.render_as_string(hide_password=True),
+                    "healthy": now >= self._down_until.get(i, now),
+                    "failures": self.failures[i],
+                }
+                for i, eng in enumerate(self.engines)
+            ]
+
+def _is_read(clause) -> bool:
+    """レプリカで実行してよい文か（clause=None は db.connection() での取得で、読み取りとして扱う）"""
+    if clause is None:
+        return True
+    if isinstance(clause, Select):
+        return clause._for_update_arg is None
+    return isinstance(clause, CompoundSelect)
+
+class RoutingSession(Session):
+    """
+    読み取りをレプリカ、書き込みをプライマリ（bind）へ送る Session。
+    replicas が None または使えるレプリカが無いときは、すべてプライマリで実行する。
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kw):
+        super().__init__(*args, **kw)
+        self.replicas = replicas
+        self.primary = False   # use_primary() の中
+        self.wrote = False     # 書き込み済み（以後はプライマリで読む）
+        self._replica: Optional[Engine] = None
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        primary = super().get_bind(mapper, clause=clause, **kw)
+        if self._flushing or not _is_read(clause):
+            self.wrote = True
+        if self.replicas is None or self.primary or self.wrote:
+            return primary
+        if self._replica is None:
+            self._replica = self.replicas.pick()
+        return self._replica or primary
+
+    # トランザクションが終わったら、次のトランザクションでレプリカを選び直す
+    def commit(self) -> None:
+        super().commit()
+        self._replica = None
+
+    def rollback(self) -> None:
+        super().rollback()
+        self._replica = None
+
+    def close(self) -> None:
+        super().close()
+        self._replica = None
+
+@contextmanager
+def use_primary(db: Session) -> Iterator[Session]:
+    """
+    with の中の読み取りをプライマリで行う（レプリカの遅延を避けたい読み取りや、
+    db.connection() で書き込むとき）。RoutingSession 以外では何もしない。
+    db.execute(insert(...)) や flush による書き込みは with の外でも以後プライマリで読むが、
+    db.connection() 経由の書き込みは検出できないので、その後の読み取りも with の中で行うこと。
+    """
+    if not isinstance(db, RoutingSession):
+        yield db
+        return
+    prev, db.primary = db.primary, True
+    try:
+        yield db
+    finally:
+        db.primary = prev
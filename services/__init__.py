@@ -0,0 +1,2 @@
+# partyapp/services
+# ビジネスロジック（シード投入、検索、集計など）をまとめるパッケージ
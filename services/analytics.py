@@ -0,0 +1,300 @@
+# partyapp/services/analytics.py
+# pa analyze の実処理（政党の投票行動の分析）。
+#
+# T_PARTY_LAW_ROLE を T_LAW（公布年）・T_LAW_CATEGORY_MAP と合わせて一括で読み込み、
+# 列指向の RoleFrame（政党・法令・分類を連番の整数 id に置き換えた NumPy 配列）にする。
+# その上で、政党 × 法令のスタンス行列（賛成系 +1 / 反対 -1 / 関与なし 0）から
+#   - 政党間の一致率・コサイン類似度（行列積でまとめて計算）
+#   - 公布年ごとの一致率（各党と多数派の一致、指定 2 党の一致）
+#   - 分類ごとの役割件数・賛成率
+# を求める。ORM オブジェクトは作らず、DB からはタプルを chunk 単位で受け取る。
+# NumPy は任意依存（pip install 'partyapp[analytics]'）。
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import String, extract, select, type_coerce
+from sqlalchemy.orm import Session
+
+from partyapp.db.models import Category, Law, LawCategoryMap, PartyLawRole, Party
+from partyapp.db.models.enums import CategoryType, PartyRole
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+ROLES: List[str] = [r.value for r in PartyRole]
+CATEGORIES: List[str] = [c.value for c in CategoryType]
+
+# スタンス: 提出・共同提出・内閣・与党・賛成は +1、反対は -1
+SUPPORT_ROLES = {"submitter", "co_submitter", "cabinet", "coalition", "voted_for"}
+OPPOSE_ROLES = {"voted_against"}
+_ROLE_STANCE = [1 if r in SUPPORT_ROLES else -1 if r in OPPOSE_ROLES else 0 for r in ROLES]
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("pa analyze には NumPy が必要です: pip install 'partyapp[analytics]'")
+    return np
+
+class RoleFrame:
+    """
+    役割行を列ごとの配列で持つ。
+      party[i], law[i], role[i]  … 役割行 i の政党・法令・役割（連番 id）
+      law_year[j]                … 法令 j の公布年（不明は 0）
+      cat_law[k], cat[k]         … 法令 j と分類の対応（T_LAW_CATEGORY_MAP）
+    party_ids / party_names / law_ids で連番 id から元の値に戻せる。
+    """
+
+    def __init__(self, party_ids, party_names, law_ids, law_year, party, law, role, cat_law, cat):
+        self.party_ids: List[str] = party_ids
+        self.party_names: List[str] = party_names
+        self.law_ids: List[str] = law_ids
+        self.law_year = law_year
+        self.party = party
+        self.law = law
+        self.role = role
+        self.cat_law = cat_law
+        self.cat = cat
+
+    @property
+    def n_parties(self) -> int:
+        return len(self.party_ids)
+
+    @property
+    def n_laws(self) -> int:
+        return len(self.law_ids)
+
+    def __len__(self) -> int:
+        return len(self.party)
+
+def load_role_frame(db: Session, chunk_size: int = 50_000) -> RoleFrame:
+    """
+    3 本のクエリ（政党 / 法令と公布年 / 役割行）と分類の対応を chunk_size 行ずつ読み、RoleFrame を作る。
+    Enum 列は文字列のまま受け取り（型変換を省く）、連番 id への変換は chunk 単位で行う。
+    """
+    require_numpy()
+    conn = db.connection()  # ORM の行処理を通さず Core でタプルを受け取る
+
+    def stream(stmt):
+        result = conn.execute(stmt.execution_options(stream_results=True, yield_per=chunk_size))
+        try:
+            yield from result.partitions(chunk_size)
+        finally:
+            result.close()
+
+    party_ids: List[str] = []
+    party_names: List[str] = []
+    for pid, name in conn.execute(select(Party.id, Party.name).order_by(Party.name)):
+        party_ids.append(pid)
+        party_names.append(name)
+    party_idx = {p: i for i, p in enumerate(party_ids)}
+
+    law_ids: List[str] = []
+    years = array("h")
+    for part in stream(select(Law.id, extract("year", Law.promulgated_on)).order_by(Law.id)):
+        ids, ys = zip(*part)
+        law_ids.extend(ids)
+        years.extend(int(y) if y is not None else 0 for y in ys)
+    law_idx = {l: j for j, l in enumerate(law_ids)}
+
+    role_code = {r: k for k, r in enumerate(ROLES)}
+    party = array("i")
+    law = array("i")
+    role = array("b")
+    role_col = type_coerce(PartyLawRole.role, String)
+    for part in stream(select(PartyLawRole.party_id, PartyLawRole.law_id, role_col)):
+        pids, lids, rs = zip(*part)
+        party.extend(map(party_idx.__getitem__, pids))
+        law.extend(map(law_idx.__getitem__, lids))
+        role.extend(map(role_code.__getitem__, rs))
+
+    cat_code = {c: k for k, c in enumerate(CATEGORIES)}
+    cat_law = array("i")
+    cat = array("b")
+    stmt = (
+        select(LawCategoryMap.law_id, type_coerce(Category.name, String))
+        .join(Category, Category.id == LawCategoryMap.category_id)
+    )
+    for part in stream(stmt):
+        lids, names = zip(*part)
+        cat_law.extend(map(law_idx.__getitem__, lids))
+        cat.extend(map(cat_code.__getitem__, names))
+
+    return RoleFrame(
+        party_ids, party_names, law_ids,
+        np.frombuffer(years, dtype=np.int16).copy(),
+        np.frombuffer(party, dtype=np.int32).copy(),
+        np.frombuffer(law, dtype=np.int32).copy(),
+        np.frombuffer(role, dtype=np.int8).copy(),
+        np.frombuffer(cat_law, dtype=np.int32).copy(),
+        np.frombuffer(cat, dtype=np.int8).copy(),
+    )
+
+# ==============================================================
+# スタンス行列と一致率
+# ==============================================================
+
+# 行列積は列をこの幅ずつに区切って float32 に変換する（政党数 × 法令数の float 行列を一度に作らない）
+_BLOCK = 1 << 17
+
+def stance_matrix(frame: RoleFrame, law_mask=None):
+    """
+    政党 × 法令のスタンス行列（int8, +1 / -1 / 0）。
+    同じ法令に賛成系と反対の両方がある政党は合計の符号で決める。
+    law_mask（法令数の bool 配列）を渡すとその列だけを返す。
+    """
+    stance = np.asarray(_ROLE_STANCE, dtype=np.int8)[frame.role]
+    flat = frame.party.astype(np.int64) * frame.n_laws + frame.law
+    # (政党, 法令) ごとにスタンスを合計する（出現したペアだけを数え、密な作業配列を作らない）
+    keys, inv = np.unique(flat, return_inverse=True)
+    m = np.zeros(frame.n_parties * frame.n_laws, dtype=np.int8)
+    if len(keys):
+        m[keys] = np.sign(np.bincount(inv, weights=stance, minlength=len(keys)))
+    m = m.reshape(frame.n_parties, frame.n_laws)
+    return m[:, law_mask] if law_mask is not None else m
+
+def _blocked_gram(m, *transforms):
+    """transforms(m の列ブロック) → float32 行列 X ごとに X @ X.T を列ブロック単位で合計する"""
+    P = m.shape[0]
+    out = [np.zeros((P, P), dtype=np.float64) for _ in transforms]
+    for lo in range(0, m.shape[1], _BLOCK):
+        blk = m[:, lo:lo + _BLOCK]
+        for acc, fn in zip(out, transforms):
+            x = fn(blk).astype(np.float32)
+            acc += x @ x.T
+    return out
+
+def agreement_matrix(m, min_common: int = 1):
+    """一致率（共通して態度を示した法令のうち同じスタンスだった割合）。共通が min_common 未満は NaN"""
+    pos, neg, common = _blocked_gram(m, lambda b: b > 0, lambda b: b < 0, lambda b: b != 0)
+    agree = pos + neg
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate = agree / common
+    rate[common < max(1, min_common)] = np.nan
+    return rate, common
+
+def similarity_matrix(m):
+    """スタンスベクトルのコサイン類似度（関与の有無も効く。-1〜1）"""
+    (dot,) = _blocked_gram(m, lambda b: b)
+    norm = np.sqrt(np.diag(dot))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return dot / np.outer(norm, norm)
+
+def majority_alignment_by_year(frame: RoleFrame, m=None):
+    """
+    公布年ごとに、各政党が「その法令で態度を示した政党の多数派」と同じスタンスだった割合。
+    戻り値は (years, rate[政党, 年], n[政党, 年])。
+    """
+    m = stance_matrix(frame) if m is None else m
+    majority = np.sign(m.sum(axis=0, dtype=np.int32)).astype(np.int8)  # 法令ごとの多数派
+    participated = (m != 0) & (majority != 0)
+    aligned = participated & (m == majority)
+
+    years = np.unique(frame.law_year[frame.law_year > 0])
+    # 年 → 列番号にして、政党 × 年の件数を bincount で数える
+    col = np.searchsorted(years, frame.law_year)
+    valid = frame.law_year > 0
+    P, Y = frame.n_parties, len(years)
+    n = np.zeros((P, Y), dtype=np.int64)
+    hit = np.zeros((P, Y), dtype=np.int64)
+    for p in range(P):
+        sel = participated[p] & valid
+        n[p] = np.bincount(col[sel], minlength=Y)
+        hit[p] = np.bincount(col[aligned[p] & valid], minlength=Y)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate = hit / n
+    return years, rate, n
+
+def pair_alignment_by_year(frame: RoleFrame, a: int, b: int, m=None):
+    """政党 a, b の公布年ごとの一致率。戻り値は (years, rate, n)"""
+    m = stance_matrix(frame) if m is None else m
+    both = (m[a] != 0) & (m[b] != 0) & (frame.law_year > 0)
+    same = both & (m[a] == m[b])
+    years, col = np.unique(frame.law_year[both], return_inverse=True)
+    n = np.bincount(col, minlength=len(years))
+    hit = np.bincount(col, weights=same[both], minlength=len(years))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate = hit / n
+    return years, rate, n
+
+def category_breakdown(frame: RoleFrame):
+    """
+    政党 × 分類 × 役割 の件数（int64 の 3 次元配列）。
+    法令が複数の分類に属する場合はそれぞれに数える。
+    """
+    P, C, R = frame.n_parties, len(CATEGORIES), len(ROLES)
+    # 法令 → 分類 の CSR（cat_law でソートして法令ごとの開始位置を持つ）
+    order = np.argsort(frame.cat_law, kind="stable")
+    cats_sorted = frame.cat[order]
+    per_law = np.bincount(frame.cat_law, minlength=frame.n_laws)
+    start = np.concatenate(([0], np.cumsum(per_law)[:-1]))
+
+    # 役割行を所属分類の数だけ複製し、それぞれの分類を割り当てる
+    reps = per_law[frame.law]
+    row = np.repeat(np.arange(len(frame)), reps)
+    offset = np.arange(reps.sum()) - np.repeat(np.cumsum(reps) - reps, reps)
+    cat = cats_sorted[start[frame.law[row]] + offset]
+
+    flat = (frame.party[row].astype(np.int64) * C + cat) * R + frame.role[row]
+    return np.bincount(flat, minlength=P * C * R).reshape(P, C, R)
+
+def support_rate(counts):
+    """category_breakdown の結果から 賛成系 / (賛成系 + 反対) を求める（政党 × 分類）"""
+    sup = counts[..., [k for k, r in enumerate(ROLES) if r in SUPPORT_ROLES]].sum(axis=-1)
+    opp = counts[..., [k for k, r in enumerate(ROLES) if r in OPPOSE_ROLES]].sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sup / (sup + opp)
+
+# ==============================================================
+# レポート（JSON にできる dict）
+# ==============================================================
+
+def _f(x) -> Optional[float]:
+    x = float(x)
+    return None if x != x else round(x, 4)  # NaN → None
+
+def analyze(
+    frame: RoleFrame,
+    reports: Sequence[str] = ("agreement", "similarity", "timeline", "category"),
+    min_common: int = 10,
+    pair: Optional[tuple[int, int]] = None,
+) -> Dict[str, Any]:
+    names = frame.party_names
+    out: Dict[str, Any] = {"parties": names, "role_rows": len(frame), "laws": frame.n_laws}
+    m = stance_matrix(frame)
+    if "agreement" in reports:
+        rate, common = agreement_matrix(m, min_common=min_common)
+        out["agreement"] = [[_f(v) for v in row] for row in rate]
+        out["common_laws"] = common.astype(np.int64).tolist()
+    if "similarity" in reports:
+        out["similarity"] = [[_f(v) for v in row] for row in similarity_matrix(m)]
+    if "timeline" in reports:
+        years, rate, n = majority_alignment_by_year(frame, m)
+        out["timeline"] = {
+            "years": years.tolist(),
+            "majority_alignment": {names[p]: [_f(v) for v in rate[p]] for p in range(frame.n_parties)},
+            "laws": {names[p]: n[p].tolist() for p in range(frame.n_parties)},
+        }
+        if pair is not None:
+            a, b = pair
+            years, rate, n = pair_alignment_by_year(frame, a, b, m)
+            out["timeline"]["pair"] = {
+                "parties": [names[a], names[b]],
+                "years": years.tolist(),
+                "agreement": [_f(v) for v in rate],
+                "laws": n.tolist(),
+            }
+    if "category" in reports:
+        counts = category_breakdown(frame)
+        sup = support_rate(counts)
+        out["category"] = {
+            names[p]: {
+                CATEGORIES[c]: {
+                    "support_rate": _f(sup[p, c]),
+                    **{ROLES[r]: int(counts[p, c, r]) for r in range(len(ROLES)) if counts[p, c, r]},
+                }
+                for c in range(len(CATEGORIES)) if counts[p, c].any()
+            }
+            for p in range(frame.n_parties)
+        }
+    return out
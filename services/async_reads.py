@@ -0,0 +1,62 @@
+# partyapp/services/async_reads.py
+# 非同期セッション（db.base.AsyncSessionLocal）向けの読み取りクエリ。
+# AsyncSession では属性アクセス時の遅延ロードが使えない（MissingGreenlet になる）ので、
+# 関連は必ず selectinload / joinedload で先に読み込んでおく。
+# 文（select）の組み立ては同期セッションと共用できるよう *_stmt 関数に分けてある。
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+
+from partyapp.db.models import Law, Party, PartyLawRole
+
+# ==============================================================
+# 文の組み立て（同期/非同期共通）
+# ==============================================================
+
+def party_stmt(party_id: str) -> Select:
+    return select(Party).where(Party.id == party_id)
+
+def law_detail_stmt(law_id: str) -> Select:
+    """Law 1 件 + カテゴリ + 関与政党（party_roles.party）"""
+    return (
+        select(Law)
+        .where(Law.id == law_id)
+        .options(
+            selectinload(Law.categories),
+            selectinload(Law.party_roles).joinedload(PartyLawRole.party),
+        )
+    )
+
+def laws_page_stmt(limit: int = 20, after: Optional[str] = None) -> Select:
+    """id 順のキーセットページング"""
+    stmt = select(Law).order_by(Law.id).limit(limit)
+    if after is not None:
+        stmt = stmt.where(Law.id > after)
+    return stmt
+
+def party_law_roles_stmt(party_id: str) -> Select:
+    """政党の関与法令一覧（law を JOIN で同時に読む）"""
+    return (
+        select(PartyLawRole)
+        .where(PartyLawRole.party_id == party_id)
+        .options(joinedload(PartyLawRole.law))
+        .order_by(PartyLawRole.law_id, PartyLawRole.role)
+    )
+
+# ==============================================================
+# 非同期の読み取り
+# ==============================================================
+
+async def get_party(db: AsyncSession, party_id: str) -> Optional[Party]:
+    return (await db.execute(party_stmt(party_id))).scalar_one_or_none()
+
+async def get_law(db: AsyncSession, law_id: str) -> Optional[Law]:
+    return (await db.execute(law_detail_stmt(law_id))).scalar_one_or_none()
+
+async def list_laws(db: AsyncSession, limit: int = 20, after: Optional[str] = None) -> Sequence[Law]:
+    return (await db.execute(laws_page_stmt(limit, after))).scalars().all()
+
+async def list_party_law_roles(db: AsyncSession, party_id: str) -> List[PartyLawRole]:
+    return list((await db.execute(party_law_roles_stmt(party_id))).scalars().all())
@@ -0,0 +1,194 @@
+# partyapp/services/bulk_load.py
+# seed-master --bulk の実処理。
+# 整形済みの CSV を LOAD DATA LOCAL INFILE 用の TSV に書き出して一時ステージング
+# テーブルへ流し込み、本テーブルには INSERT ... SELECT ... ON DUPLICATE KEY UPDATE
+# の 1 文でマージする。既存行の id は変更しない（id=id）。
+#
+# 前提（ローカルの MariaDB コンテナなど）:
+#   - サーバ側で local_infile=ON（例: docker run ... mariadb --local-infile=1）
+#   - クライアント側は専用エンジンで pymysql の local_infile=True を有効化する
+import tempfile
+import time
+from datetime import date, datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import typer
+from sqlalchemy import Column, MetaData, Table, and_, case, create_engine, func, or_, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import NullPool
+
+from partyapp.config import DATABASE_URL
+from partyapp.db.models import Category, Law, Party
+from partyapp.services.change_detect import HASH_COLUMN, ChangeDetector, supports_change_detection, with_hash
+from partyapp.services.row_convert import RowErrors, compile_converter
+from partyapp.services.seed import iter_csv
+from partyapp.utils.ids import make_char18_id
+
+# LOAD DATA の既定エスケープ（FIELDS ESCAPED BY '\\'）に合わせた変換表
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
+_TSV_NULL = "\\N"
+
+def make_bulk_engine(url: str = DATABASE_URL) -> Engine:
+    """LOAD DATA LOCAL INFILE を許可した一時利用のエンジン（通常の engine とは分ける）。"""
+    return create_engine(url, poolclass=NullPool, connect_args={"local_infile": True}, future=True)
+
+def _tsv_field(v: Any) -> str:
+    if v is None:
+        return _TSV_NULL
+    if isinstance(v, Enum):
+        v = v.value
+    elif isinstance(v, (datetime, date)):
+        v = v.isoformat()
+    return str(v).translate(_TSV_ESCAPES)
+
+def write_staging_tsv(model, rows: Iterable[Dict[str, Any]], out, key_col: str) -> tuple[List[str], int]:
+    """
+    CSV 行を列の型に合わせて変換して id（と source_hash）を付与し、TSV として out に書き出す。
+    Enum 列の不正値などはここで弾く（LOAD DATA は SQLAlchemy の検証を通らないため）。
+    source_hash を持つモデルは業務キー（key_col）の空の行も弾く（マージの外部結合で一致せず、毎回新規になるため）。
+    弾いた行は最後にまとめて報告する。戻り値は (列名リスト, 書き出した行数)。
+    """
+    hashed = supports_change_detection(model)
+    detector = ChangeDetector(model, key_col) if hashed else None
+    errors = RowErrors(model.__name__)
+    convert = None
+    cols: Optional[List[str]] = None
+    n = 0
+    for line, raw in enumerate(rows, start=2):
+        if convert is None:
+            convert = compile_converter(model, raw.keys())
+        r = convert(raw, line, errors)
+        if detector is not None:
+            r = detector.require_key(r, line, errors)
+        if r is None:
+            continue
+        if hashed:
+            with_hash(r)
+        if cols is None:
+            cols = ["id", *r.keys()]
+        out.write("\t".join(_tsv_field(v) for v in (make_char18_id(), *(r.get(c) for c in cols[1:]))))
+        out.write("\n")
+        n += 1
+    errors.report()
+    return cols or [], n
+
+def _staging_table(model, cols: List[str]) -> Table:
+    """本テーブルと同じ列型・制約なしの TEMPORARY テーブル定義。"""
+    src = model.__table__
+    return Table(
+        f"stg_{src.name}",
+        MetaData(),
+        *[Column(c, src.c[c].type) for c in cols],
+        prefixes=["TEMPORARY"],
+    )
+
+def _changed_only(model, stg: Table, key_col: str):
+    """
+    ステージングと本テーブルを業務キーで外部結合した FROM 句と、
+    「新規」「source_hash が異なる」行だけを残す条件。
+    """
+    tbl = model.__table__
+    joined = stg.outerjoin(tbl, tbl.c[key_col] == stg.c[key_col])
+    is_new = tbl.c.id.is_(None)
+    same = tbl.c[HASH_COLUMN].is_not_distinct_from(stg.c[HASH_COLUMN])  # MariaDB: <=>
+    return joined, is_new, same
+
+def count_changes(conn: Connection, model, stg: Table, key_col: str) -> tuple[int, int, int]:
+    """ステージング上の (新規, 更新, 変更なし) 件数"""
+    joined, is_new, same = _changed_only(model, stg, key_col)
+    total, new, unchanged = conn.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(case((is_new, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((and_(~is_new, same), 1), else_=0)), 0),
+        ).select_from(joined)
+    ).one()
+    return int(new), int(total - new - unchanged), int(unchanged)
+
+def merge_from_staging(conn: Connection, model, stg: Table, cols: List[str], uniq_cols: List[str]) -> int:
+    """
+    INSERT INTO 本テーブル SELECT ... FROM ステージング ON DUPLICATE KEY UPDATE（set-based）
+    source_hash を持つモデルは、新規行と内容が変わった行だけを SELECT する。
+    """
+    tbl = model.__table__
+    src = select(*[stg.c[c] for c in cols])
+    if HASH_COLUMN in cols:
+        joined, is_new, same = _changed_only(model, stg, uniq_cols[0])
+        src = src.select_from(joined).where(or_(is_new, ~same))
+    ins = mysql_insert(tbl).from_select(cols, src)
+    update_cols = {c: ins.inserted[c] for c in cols if c not in uniq_cols and c != "id"}
+    for c in tbl.c:
+        if c.onupdate is not None and c.name not in update_cols:
+            update_cols[c.name] = c.onupdate.arg  # updated_at = now()
+    update_cols["id"] = tbl.c.id  # id=id（既存行の PK は変更しない）
+    return conn.execute(ins.on_duplicate_key_update(**update_cols)).rowcount
+
+def bulk_load_table(
+    conn: Optional[Connection],
+    model,
+    path: Path,
+    uniq_cols: List[str],
+    dry_run: bool = False,
+) -> int:
+    """
+    1 テーブル分の bulk load。
+    CSV → 一時 TSV → CREATE TEMPORARY TABLE → LOAD DATA LOCAL INFILE → マージ → DROP。
+    TEMPORARY テーブルは接続単位なので、同じ conn 上で完結させる。
+    """
+    started = time.perf_counter()
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="", suffix=".tsv") as tmp:
+        cols, n = write_staging_tsv(model, iter_csv(path), tmp, uniq_cols[0])
+        tmp.flush()
+        if n == 0:
+            return 0
+        typer.echo(f"→ BULK {model.__name__}: {n} 行をステージングへ書き出し ({time.perf_counter() - started:.2f}s)")
+        if dry_run:
+            return n
+
+        stg = _staging_table(model, cols)
+        stg.create(conn)
+        try:
+            quoted = conn.dialect.identifier_preparer
+            file_literal = tmp.name.replace("\\", "\\\\").replace("'", "\\'")
+            conn.exec_driver_sql(
+                f"LOAD DATA LOCAL INFILE '{file_literal}' INTO TABLE {quoted.format_table(stg)} "
+                "CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                "LINES TERMINATED BY '\\n' "
+                f"({', '.join(quoted.quote(c) for c in cols)})"
+            )
+            if HASH_COLUMN in cols:
+                new, changed, unchanged = count_changes(conn, model, stg, uniq_cols[0])
+                typer.echo(
+                    f"📝 {model.__name__}: 新規 {new} / 更新 {changed} / 変更なし {unchanged}"
+                    f"（書き込み {new + changed} 行）"
+                )
+            affected = merge_from_staging(conn, model, stg, cols, uniq_cols)
+        finally:
+            stg.drop(conn)
+
+    elapsed = time.perf_counter() - started
+    rate = n / elapsed if elapsed > 0 else float("inf")
+    # ON DUPLICATE KEY UPDATE の affected rows は 新規=1 / 更新=2 / 変更なし=0 で数えられる
+    typer.echo(f"✅ BULK {model.__name__}: {n} 行 / {elapsed:.2f}s ({rate:,.0f} rows/sec, affected={affected})")
+    return n
+
+def bulk_load_masters(base: Path, dry_run: bool = False, engine: Optional[Engine] = None) -> Dict[str, int]:
+    """M_PARTY / M_CATEGORY / T_LAW を bulk load する（1 トランザクション）。"""
+    targets = [
+        (Party,    base / "Party.csv",    ["name"]),
+        (Category, base / "Category.csv", ["name"]),
+        (Law,      base / "Law.csv",      ["law_number"]),
+    ]
+    if dry_run:
+        return {m.__name__: bulk_load_table(None, m, p, u, dry_run=True) for m, p, u in targets}
+
+    engine = engine or make_bulk_engine()
+    try:
+        with engine.begin() as conn:
+            return {m.__name__: bulk_load_table(conn, m, p, u) for m, p, u in targets}
+    finally:
+        engine.dispose()
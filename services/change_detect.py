@@ -0,0 +1,119 @@
+# partyapp/services/change_detect.py
+# 再投入時の変更検知（Law.source_hash）。
+# 整形済みの行から内容ハッシュを計算し、同じ業務キーの既存行とハッシュが一致すれば
+# 書き込みを省略する。変更のない行は UPDATE されないので updated_at も動かない。
+import hashlib
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+import typer
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from partyapp.services.key_resolver import KeyResolver
+from partyapp.services.query import serialize_value
+from partyapp.services.row_convert import RowErrors
+
+HASH_COLUMN = "source_hash"
+# ハッシュ対象外（DB 側で決まる列とハッシュ自身）
+HASH_EXCLUDE = {"id", HASH_COLUMN, "created_at", "updated_at"}
+
+def supports_change_detection(model) -> bool:
+    return HASH_COLUMN in model.__table__.c
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """列名でソートした正規形 JSON の SHA-256（64 桁の16進数 = source_hash の桁数）"""
+    canonical = json.dumps(
+        [[k, serialize_value(row[k])] for k in sorted(row) if k not in HASH_EXCLUDE],
+        ensure_ascii=False, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def with_hash(row: Dict[str, Any]) -> Dict[str, Any]:
+    row[HASH_COLUMN] = content_hash(row)
+    return row
+
+class ChangeDetector:
+    """
+    バッチ単位で既存行の (業務キー, id, source_hash) をまとめて取得し、
+    新規・変更ありの行だけを返す。件数は inserted / updated / unchanged に集計する。
+    スレッドセーフ（集計はロックで保護）。DB 検索は呼び出し側のセッションで行う。
+    """
+
+    def __init__(self, model, key_col: str, chunk_size: int = 500):
+        self.model = model
+        self.key_col = key_col
+        self.chunk_size = chunk_size
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self._lock = threading.Lock()
+
+    def _existing(self, db: Session, keys: List[Any]) -> Dict[Any, tuple]:
+        key_attr = getattr(self.model, self.key_col)
+        hash_attr = getattr(self.model, HASH_COLUMN)
+        out: Dict[Any, tuple] = {}
+        for i in range(0, len(keys), self.chunk_size):
+            part = keys[i:i + self.chunk_size]
+            stmt = select(key_attr, self.model.id, hash_attr).where(key_attr.in_(part))
+            for k, id_, h in db.execute(stmt):
+                out[k] = (id_, h)
+        return out
+
+    def require_key(self, row: Optional[Dict[str, Any]], line: Optional[int], errors: RowErrors) -> Optional[Dict[str, Any]]:
+        """
+        業務キーが空の行は errors に記録して None を返す（filter に渡す前に通す）。
+        キーの無い行は既存行と突き合わせられず UPSERT でも衝突しないので、再投入のたびに重複して INSERT される。
+        """
+        if row is not None and row.get(self.key_col) is None:
+            errors.add(line, [(self.key_col, f"{self.key_col} が空です（再投入時に既存行と突き合わせる業務キー）")])
+            return None
+        return row
+
+    def filter(
+        self,
+        db: Session,
+        payloads: List[Dict[str, Any]],
+        resolver: Optional[KeyResolver] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        書き込みが必要な行だけを返す。payloads は require_key で業務キーの空の行を落としておくこと。
+        resolver を渡すと、既存行の id と新規行に付与した id をついでに覚えさせる。
+        """
+        keys = [p[self.key_col] for p in payloads]
+        if None in keys:
+            raise ValueError(f"{self.model.__name__}.{self.key_col} が空の行は変更検知できません（require_key で落としてください）")
+        existing = self._existing(db, list(dict.fromkeys(keys)))
+
+        out: List[Dict[str, Any]] = []
+        known_ids: Dict[Any, Any] = {k: v[0] for k, v in existing.items()}
+        ins = upd = same = 0
+        for p, k in zip(payloads, keys):
+            cur = existing.get(k)
+            if cur is None:
+                ins += 1
+                out.append(p)
+                known_ids.setdefault(k, p["id"])
+                # 同一バッチ内で同じキーが再登場したら 2 回目以降は更新扱い
+                existing[k] = (known_ids[k], p[HASH_COLUMN])
+            elif cur[1] == p[HASH_COLUMN]:
+                same += 1
+            else:
+                upd += 1
+                out.append(p)
+                existing[k] = (cur[0], p[HASH_COLUMN])
+
+        with self._lock:
+            self.inserted += ins
+            self.updated += upd
+            self.unchanged += same
+        if resolver is not None:
+            resolver.prime(known_ids)
+        return out
+
+    def report(self) -> None:
+        typer.echo(
+            f"📝 {self.model.__name__}: 新規 {self.inserted} / 更新 {self.updated} / "
+            f"変更なし {self.unchanged}（書き込み {self.inserted + self.updated} 行）"
+        )
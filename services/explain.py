@@ -0,0 +1,92 @@
+# partyapp/services/explain.py
+# pa show --explain の実処理。
+# - モデル定義（__table_args__ の Index / UniqueConstraint / 主キー）から、
+#   条件列・並び替え列がインデックスの先頭列になっているかを静的に診断する
+# - 等価条件 → 範囲条件 → 並び替え列 の順で複合インデックス案を出す
+# - MariaDB の EXPLAIN / ANALYZE を実行して実際の実行計画を表示する
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.orm import Session
+
+from partyapp.services.query import Predicate
+
+def declared_indexes(Model) -> List[tuple[str, List[str]]]:
+    """モデルに宣言されたインデックス（主キー・ユニーク制約を含む）の (名前, 列リスト)。"""
+    tbl = Model.__table__
+    out: List[tuple[str, List[str]]] = [("PRIMARY", [c.name for c in tbl.primary_key.columns])]
+    for ix in tbl.indexes:
+        out.append((ix.name or "(index)", [c.name for c in ix.columns]))
+    for cons in tbl.constraints:
+        if isinstance(cons, UniqueConstraint):
+            out.append((cons.name or "(unique)", [c.name for c in cons.columns]))
+    # 列定義の unique=True は名前なしの UniqueConstraint になる
+    for c in tbl.columns:
+        if c.unique and not any(cols == [c.name] for _, cols in out):
+            out.append((f"(unique {c.name})", [c.name]))
+    return out
+
+def leading_indexed_columns(Model) -> set:
+    """いずれかのインデックスの先頭列になっている列名の集合。"""
+    return {cols[0] for _, cols in declared_indexes(Model) if cols}
+
+def suggest_composite_index(
+    Model, predicates: Sequence[Predicate], order_by: Optional[str]
+) -> Optional[List[str]]:
+    """
+    等価条件の列 → 範囲条件の列（先頭 1 つ）→ 並び替え列 の順で複合インデックス案を作る。
+    2 列未満、または既存インデックスの先頭が同じ並びなら None。
+    """
+    eq = [p.column for p in predicates if p.is_equality]
+    rng = [p.column for p in predicates if not p.is_equality and p.op != "not in"]
+    cols = list(dict.fromkeys(eq))
+    # 範囲条件は複合インデックス内で 1 列しか効かない
+    for c in rng:
+        if c not in cols:
+            cols.append(c)
+            break
+    if order_by and order_by not in cols and not rng:
+        cols.append(order_by)
+    if len(cols) < 2:
+        return None
+    for _, ix_cols in declared_indexes(Model):
+        if ix_cols[:len(cols)] == cols:
+            return None
+    return cols
+
+def diagnose(Model, predicates: Sequence[Predicate], order_by: Optional[str]) -> List[str]:
+    """インデックスに関する警告と提案のメッセージ一覧。"""
+    tbl = Model.__table__
+    leading = leading_indexed_columns(Model)
+    msgs: List[str] = []
+    for p in predicates:
+        if p.column not in leading:
+            msgs.append(f"⚠ 条件列 {tbl.name}.{p.column}（{p.op}）を先頭に持つインデックスがありません")
+        elif p.op in ("!=", "not in"):
+            msgs.append(f"⚠ 条件列 {tbl.name}.{p.column} の {p.op} はインデックス範囲検索になりにくい条件です")
+    if order_by and order_by not in leading:
+        msgs.append(f"⚠ 並び替え列 {tbl.name}.{order_by} を先頭に持つインデックスがありません（filesort になります）")
+
+    cols = suggest_composite_index(Model, predicates, order_by)
+    if cols:
+        short = tbl.name.split("_", 1)[-1].lower()
+        name = f"ix_{short}_" + "_".join(cols)
+        msgs.append(
+            f"💡 複合インデックスの候補: {tbl.name}({', '.join(cols)})\n"
+            f"   __table_args__ に Index(\"{name}\", {', '.join(repr(c) for c in cols)}) を追加"
+        )
+    return msgs
+
+def render_sql(db: Session, stmt) -> str:
+    """バインド値を埋め込んだ SQL 文字列（EXPLAIN に渡すため）。"""
+    return str(stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+
+def explain(db: Session, stmt, analyze: bool = False) -> List[Dict[str, Any]]:
+    """
+    MariaDB の EXPLAIN（analyze=True のときは ANALYZE = 実際に実行して r_rows などを取得）。
+    戻り値は実行計画の行（辞書）のリスト。
+    """
+    sql = render_sql(db, stmt)
+    prefix = "ANALYZE " if analyze else "EXPLAIN "
+    # text() だと値中の ":" がバインド変数と解釈されるため、ドライバに直接渡す
+    return [dict(r._mapping) for r in db.connection().exec_driver_sql(prefix + sql)]
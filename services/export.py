@@ -0,0 +1,276 @@
+# partyapp/services/export.py
+# pa export の実処理（テーブルをファイルへ書き出す）。
+#
+# - サーバサイドカーソルから chunk_size 行ずつ受け取り、受け取った分だけ書き出す
+#   （数百万行の T_LAW / T_PARTY_LAW_ROLE でもメモリは 1 チャンク分で一定）。
+# - ORM オブジェクトは作らず Core でタプルを受け取る。Enum 列は文字列のまま受け取る。
+# - 形式:
+#     csv     … seed-master がそのまま読める形式（ファイル名・列も seed と同じ）
+#     ndjson  … 1 行 1 JSON（全列）
+#     parquet / arrow … 列指向（pyarrow が必要: pip install 'partyapp[export]'）
+# - --since は Law.updated_at 以降の行だけを出す差分エクスポート。
+import csv
+import io
+import json
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from sqlalchemy import Enum as SAEnum, String, select, type_coerce
+from sqlalchemy.orm import Session
+
+from partyapp.db.models import Category, Law, LawCategoryMap, Party, PartyLawRole
+from partyapp.services.change_detect import HASH_EXCLUDE
+from partyapp.services.key_resolver import LAW_JOIN_KEYS
+
+FORMATS = ("csv", "ndjson", "parquet", "arrow")
+EXTENSIONS = {"csv": ".csv", "ndjson": ".ndjson", "parquet": ".parquet", "arrow": ".arrow"}
+# pa export all の書き出し順（seed-master の投入順と同じ）
+EXPORT_MODELS = (Party, Category, Law, PartyLawRole, LawCategoryMap)
+# seed-master が読むファイル名（拡張子なし）
+SEED_FILE_STEMS = {
+    "Party": "Party", "Category": "Category", "Law": "Law",
+    "PartyLawRole": "party_law_roles", "LawCategoryMap": "law_categories",
+}
+# law_id で法令に紐づく中間テーブル（法令の列は T_LAW を JOIN して引き、since もその法令で絞る）
+LAW_ASSOC_MODELS = (PartyLawRole, LawCategoryMap)
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("parquet / arrow 形式には pyarrow が必要です: pip install 'partyapp[export]'")
+    return pyarrow
+
+# ==============================================================
+# 列と SELECT
+# ==============================================================
+
+def law_column(law_key: str) -> str:
+    """party_law_roles.csv で Law を特定する列名（law_key=title なら law_title）"""
+    return LAW_JOIN_KEYS[law_key][0]
+
+def seed_columns(Model, law_key: str = "law_number") -> List[str]:
+    """seed-master の CSV と同じ列（DB 側で決まる id・タイムスタンプ・ハッシュは含めない）"""
+    if Model is PartyLawRole:
+        return ["party_name", law_column(law_key), "role", "note"]
+    if Model is LawCategoryMap:
+        return [law_column(law_key), "category"]
+    return [c for c in Model.__table__.columns.keys() if c not in HASH_EXCLUDE]
+
+def available_columns(Model, law_key: str = "law_number") -> List[str]:
+    cols = list(Model.__table__.columns.keys())
+    if Model is PartyLawRole:
+        cols += ["party_name", law_column(law_key)]
+    elif Model is LawCategoryMap:
+        cols += [law_column(law_key), "category"]
+    return cols
+
+def since_applies(Model) -> bool:
+    """build_export_select の since で絞り込まれるモデルか（それ以外は全件）"""
+    return Model is Law or Model in LAW_ASSOC_MODELS
+
+def _plain(col):
+    """Enum 列は Python の Enum にせず文字列のまま受け取る"""
+    return type_coerce(col, String).label(col.name) if isinstance(col.type, SAEnum) else col
+
+def build_export_select(
+    Model,
+    columns: Sequence[str],
+    since: Optional[datetime] = None,
+    law_key: str = "law_number",
+):
+    """
+    columns を主キー順に読む SELECT。
+    PartyLawRole の party_name / law_number（law_key=title なら law_title）と
+    LawCategoryMap の law_number / category は M_PARTY / T_LAW / M_CATEGORY を JOIN して引く。
+    since は Law.updated_at 以降に絞る（中間テーブルはその法令の行）。
+    """
+    tbl = Model.__table__
+    law_col = law_column(law_key)
+    exprs = []
+    is_assoc = Model in LAW_ASSOC_MODELS
+    join_party = join_law = join_category = False
+    for c in columns:
+        if Model is PartyLawRole and c == "party_name":
+            exprs.append(Party.name.label("party_name"))
+            join_party = True
+        elif Model is LawCategoryMap and c == "category":
+            exprs.append(_plain(Category.__table__.c.name).label("category"))
+            join_category = True
+        elif is_assoc and c == law_col:
+            exprs.append(Law.__table__.c[law_key].label(law_col))
+            join_law = True
+        else:
+            exprs.append(_plain(tbl.c[c]))
+    stmt = select(*exprs).select_from(tbl)
+    if join_party:
+        stmt = stmt.join(Party, Party.id == tbl.c.party_id)
+    if join_category:
+        stmt = stmt.join(Category, Category.id == tbl.c.category_id)
+    if since is not None:
+        if Model is Law:
+            stmt = stmt.where(Law.updated_at >= since)
+        elif is_assoc:
+            join_law = True
+            stmt = stmt.where(Law.updated_at >= since)
+    if join_law:
+        stmt = stmt.join(Law, Law.id == tbl.c.law_id)
+    return stmt.order_by(*tbl.primary_key.columns)
+
+def iter_chunks(db: Session, stmt, chunk_size: int) -> Iterator[List[Tuple[Any, ...]]]:
+    """サーバサイドカーソルで chunk_size 行ずつタプルのリストを返す"""
+    result = db.connection().execute(stmt.execution_options(stream_results=True, yield_per=chunk_size))
+    try:
+        for part in result.partitions(chunk_size):
+            yield [tuple(r) for r in part]
+    finally:
+        result.close()
+
+# ==============================================================
+# 書き出し
+# ==============================================================
+
+def _to_text(v: Any) -> Any:
+    if v is None:
+        return ""
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return v
+
+def _to_json(v: Any) -> Any:
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return v
+
+class CsvSink:
+    def __init__(self, f: TextIO, columns: Sequence[str]):
+        self.w = csv.writer(f, lineterminator="\n")
+        self.w.writerow(columns)
+
+    def write(self, rows: List[Tuple[Any, ...]]) -> None:
+        self.w.writerows([_to_text(v) for v in r] for r in rows)
+
+    def close(self) -> None:
+        pass
+
+class NdjsonSink:
+    def __init__(self, f: TextIO, columns: Sequence[str]):
+        self.f = f
+        self.columns = list(columns)
+
+    def write(self, rows: List[Tuple[Any, ...]]) -> None:
+        cols = self.columns
+        self.f.write("".join(
+            json.dumps({c: _to_json(v) for c, v in zip(cols, r)}, ensure_ascii=False) + "\n" for r in rows
+        ))
+
+    def close(self) -> None:
+        pass
+
+def arrow_schema(Model, columns: Sequence[str]):
+    """列の型から Arrow のスキーマを作る（チャンクごとに型推論させない）"""
+    pa = require_pyarrow()
+    tbl = Model.__table__
+    fields = []
+    for c in columns:
+        col = tbl.c.get(c)
+        try:
+            py = col.type.python_type if col is not None and not isinstance(col.type, SAEnum) else str
+        except NotImplementedError:
+            py = str
+        if py is datetime:
+            t = pa.timestamp("us")
+        elif py is date:
+            t = pa.date32()
+        elif py is bool:
+            t = pa.bool_()
+        elif py is int:
+            t = pa.int64()
+        elif py is float:
+            t = pa.float64()
+        else:
+            t = pa.string()
+        fields.append(pa.field(c, t, nullable=col is None or col.nullable or False))
+    return pa.schema(fields)
+
+class ArrowSink:
+    """チャンクを RecordBatch にして parquet（行グループ）/ arrow（IPC ファイル）へ追記する"""
+
+    def __init__(self, path: Path, schema, fmt: str):
+        pa = require_pyarrow()
+        self.pa = pa
+        self.schema = schema
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(str(path), schema, compression="zstd")
+        else:
+            self.writer = pa.ipc.new_file(str(path), schema)
+
+    def write(self, rows: List[Tuple[Any, ...]]) -> None:
+        cols = list(zip(*rows))
+        arrays = [self.pa.array(vals, type=f.type) for vals, f in zip(cols, self.schema)]
+        self.writer.write_batch(self.pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+@contextmanager
+def open_sink(fmt: str, out: Optional[Path], Model, columns: Sequence[str]):
+    """out が None なら標準出力（csv / ndjson のみ）"""
+    if fmt in ("parquet", "arrow"):
+        if out is None:
+            raise ValueError(f"{fmt} 形式は --out でファイルを指定してください")
+        sink = ArrowSink(out, arrow_schema(Model, columns), fmt)
+        try:
+            yield sink
+        finally:
+            sink.close()
+        return
+    cls = CsvSink if fmt == "csv" else NdjsonSink
+    if out is None:
+        yield cls(sys.stdout, columns)
+        sys.stdout.flush()
+        return
+    with out.open("w", encoding="utf-8", newline="", buffering=io.DEFAULT_BUFFER_SIZE * 16) as f:
+        yield cls(f, columns)
+
+def export_model(
+    db: Session,
+    Model,
+    fmt: str,
+    out: Optional[Path],
+    columns: Optional[Sequence[str]] = None,
+    since: Optional[datetime] = None,
+    chunk_size: int = 10_000,
+    law_key: str = "law_number",
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Model を fmt 形式で out（None なら標準出力）へ書き出し、行数を返す。
+    columns 未指定時は csv が seed-master の列、それ以外は全列（PartyLawRole は名前列も付ける）。
+    progress を渡すとチャンクを書くたびに累計行数で呼ぶ。
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"出力形式が不正です: {fmt} （候補: {', '.join(FORMATS)}）")
+    if columns is None:
+        columns = seed_columns(Model, law_key) if fmt == "csv" else available_columns(Model, law_key)
+    unknown = [c for c in columns if c not in available_columns(Model, law_key)]
+    if unknown:
+        raise ValueError(f"未知の列があります: {unknown} （利用可能: {available_columns(Model, law_key)}）")
+
+    stmt = build_export_select(Model, columns, since=since, law_key=law_key)
+    total = 0
+    with open_sink(fmt, out, Model, columns) as sink:
+        for rows in iter_chunks(db, stmt, chunk_size):
+            sink.write(rows)
+            total += len(rows)
+            if progress is not None:
+                progress(total)
+    return total
+
+def export_path(out_dir: Path, Model, fmt: str) -> Path:
+    """pa export all のファイル名（csv は seed-master と同じ名前）"""
+    return out_dir / (SEED_FILE_STEMS[Model.__name__] + EXTENSIONS[fmt])
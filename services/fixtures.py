@@ -0,0 +1,212 @@
+# partyapp/services/fixtures.py
+# pa gen-fixtures の実処理。
+# 規模を指定してベンチマーク用の CSV（seed-master がそのまま読める形式）を生成する。
+#   Party.csv / Category.csv / Law.csv / party_law_roles.csv / law_categories.csv
+# 乱数のシードを固定すれば同じ内容が再現される。1 行ずつ書き出すのでメモリは規模に依存しない。
+import csv
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from partyapp.db.models.enums import CategoryType, JurisdictionLevel, LawType, PartyRole
+
+CATEGORY_DESCRIPTIONS = {
+    CategoryType.politics: "政治関連法案",
+    CategoryType.economy: "経済・財政関連",
+    CategoryType.international: "国際法関連",
+    CategoryType.environment_science: "環境・科学技術関連",
+    CategoryType.culture: "文化・教育関連",
+    CategoryType.life_medical: "生活・医療関連",
+    CategoryType.society: "社会・労働関連",
+}
+
+_PARTY_STEMS = [
+    "自由民主", "立憲民主", "国民民主", "日本維新", "公明", "共産", "社会民主", "れいわ新選組",
+    "参政", "日本保守", "みんな", "新生", "改革", "未来", "市民", "地域", "緑の", "平和", "大地", "希望",
+]
+_PARTY_SUFFIXES = ["党", "の会", "連合", "クラブ", "フォーラム"]
+
+# (分野, 題材) — 題材から法令名と概要を組み立てる
+_SUBJECTS: List[Tuple[CategoryType, str]] = [
+    (CategoryType.politics, "公職選挙"), (CategoryType.politics, "政治資金規正"),
+    (CategoryType.politics, "国会審議活性化"), (CategoryType.politics, "地方自治"),
+    (CategoryType.economy, "消費税"), (CategoryType.economy, "所得税"), (CategoryType.economy, "中小企業振興"),
+    (CategoryType.economy, "金融商品取引"), (CategoryType.economy, "独占禁止"), (CategoryType.economy, "地方財政"),
+    (CategoryType.international, "国際協力"), (CategoryType.international, "出入国管理"),
+    (CategoryType.international, "経済連携協定"), (CategoryType.international, "海外安全"),
+    (CategoryType.environment_science, "環境影響評価"), (CategoryType.environment_science, "再生可能エネルギー"),
+    (CategoryType.environment_science, "廃棄物処理"), (CategoryType.environment_science, "宇宙開発"),
+    (CategoryType.culture, "文化財保護"), (CategoryType.culture, "著作権"), (CategoryType.culture, "学校教育"),
+    (CategoryType.life_medical, "医療保険"), (CategoryType.life_medical, "介護保険"),
+    (CategoryType.life_medical, "感染症予防"), (CategoryType.life_medical, "食品衛生"),
+    (CategoryType.society, "労働基準"), (CategoryType.society, "個人情報保護"), (CategoryType.society, "子ども・子育て支援"),
+    (CategoryType.society, "住宅確保"), (CategoryType.society, "道路交通"),
+]
+_PREFIXES = ["", "", "", "特定", "新", "総合的な", "持続可能な", "緊急"]
+_MUNICIPALITIES = [
+    "東京都", "大阪府", "北海道", "京都府", "神奈川県", "愛知県", "福岡県", "沖縄県",
+    "札幌市", "横浜市", "名古屋市", "神戸市", "仙台市", "広島市", "那覇市", "金沢市",
+]
+_MINISTRIES = ["総務省", "財務省", "厚生労働省", "経済産業省", "国土交通省", "環境省", "文部科学省"]
+
+# 種別の出現比率（条例・規則が多く、憲法は 1 件だけ）
+_TYPE_WEIGHTS = [
+    (LawType.statute, 25), (LawType.cabinet_order, 20), (LawType.ministerial_order, 20),
+    (LawType.national_rule, 5), (LawType.ordinance, 20), (LawType.local_rule, 10),
+]
+_ROLE_WEIGHTS = [
+    (PartyRole.voted_for, 40), (PartyRole.voted_against, 25), (PartyRole.submitter, 10),
+    (PartyRole.co_submitter, 10), (PartyRole.coalition, 10), (PartyRole.cabinet, 5),
+]
+
+_EPOCH = date(1947, 5, 3)
+_SPAN_DAYS = (date(2025, 12, 31) - _EPOCH).days
+
+def japanese_era(d: date) -> str:
+    """西暦の日付を元号年（例: 令和6年）にする"""
+    if d >= date(2019, 5, 1):
+        return f"令和{d.year - 2018}年"
+    if d >= date(1989, 1, 8):
+        return f"平成{d.year - 1988}年"
+    return f"昭和{d.year - 1925}年"
+
+def iter_party_rows(n: int, rng: random.Random) -> Iterator[Dict[str, str]]:
+    seen = set()
+    i = 0
+    while len(seen) < n:
+        i += 1
+        stem = rng.choice(_PARTY_STEMS)
+        name = stem + rng.choice(_PARTY_SUFFIXES)
+        if name in seen:
+            name = f"{name}{i}"  # 組み合わせが尽きたら連番で一意にする
+        seen.add(name)
+        founded = _EPOCH + timedelta(days=rng.randrange(_SPAN_DAYS))
+        dissolved = ""
+        if rng.random() < 0.3:
+            dissolved = (founded + timedelta(days=rng.randrange(365, 365 * 20))).isoformat()
+        yield {
+            "name": name,
+            "short_name": stem[:2] + ("党" if name.endswith("党") else ""),
+            "founded_on": founded.isoformat(),
+            "dissolved_on": dissolved,
+        }
+
+def iter_law_rows(n: int, rng: random.Random) -> Iterator[Tuple[Dict[str, str], CategoryType]]:
+    """(Law.csv の行, 主分野) を n 件返す。law_number は (元号年, 種別) ごとの連番で一意"""
+    types = [t for t, _ in _TYPE_WEIGHTS]
+    weights = [w for _, w in _TYPE_WEIGHTS]
+    counters: Dict[Tuple[str, str], int] = {}
+    for i in range(n):
+        law_type = LawType.constitution if i == 0 else rng.choices(types, weights)[0]
+        category, subject = rng.choice(_SUBJECTS)
+        promulgated = _EPOCH + timedelta(days=rng.randrange(_SPAN_DAYS))
+        enacted = promulgated + timedelta(days=rng.randrange(0, 540))
+        era = japanese_era(promulgated)
+        title_subject = rng.choice(_PREFIXES) + subject
+
+        if law_type == LawType.constitution:
+            title, number_label, jurisdiction = "日本国憲法", "憲法", JurisdictionLevel.national
+            promulgated, enacted = date(1946, 11, 3), date(1947, 5, 3)
+            era = "昭和21年"
+        elif law_type == LawType.statute:
+            title = title_subject + rng.choice(["法", "に関する法律", "の推進に関する法律", "等の一部を改正する法律"])
+            number_label, jurisdiction = "法律", JurisdictionLevel.national
+        elif law_type == LawType.cabinet_order:
+            title, number_label, jurisdiction = title_subject + "法施行令", "政令", JurisdictionLevel.national
+        elif law_type == LawType.ministerial_order:
+            ministry = rng.choice(_MINISTRIES)
+            title = title_subject + "法施行規則"
+            number_label, jurisdiction = ministry.replace("省", "省令"), JurisdictionLevel.national
+        elif law_type == LawType.national_rule:
+            title, number_label, jurisdiction = title_subject + "に関する規則", "人事院規則", JurisdictionLevel.national
+        else:
+            muni = rng.choice(_MUNICIPALITIES)
+            kind = "条例" if law_type == LawType.ordinance else "規則"
+            title = f"{muni}{title_subject}{kind}"
+            number_label, jurisdiction = f"{muni}{kind}", JurisdictionLevel.local
+
+        key = (era, number_label)
+        counters[key] = counters.get(key, 0) + 1
+        law_number = f"{era}{number_label}第{counters[key]}号"
+        yield {
+            "title": title[:100],
+            "law_number": law_number,
+            "type": law_type.value,
+            "jurisdiction": jurisdiction.value,
+            "promulgated_on": promulgated.isoformat(),
+            "enacted_on": enacted.isoformat(),
+            "summary": f"{subject}に関し、{rng.choice(['必要な事項を定める', '制度の見直しを行う', '基本理念と施策の方向を定める', '手続を簡素化する'])}。",
+            "source_url": f"https://laws.example.jp/{law_type.value}/{i + 1}",
+        }, category
+
+def _writer(path: Path, fieldnames: List[str]):
+    f = path.open("w", encoding="utf-8", newline="")
+    w = csv.DictWriter(f, fieldnames=fieldnames)
+    w.writeheader()
+    return f, w
+
+def generate_fixtures(
+    out_dir: Path,
+    laws: int = 10_000,
+    parties: int = 40,
+    roles_per_law: float = 3.0,
+    categories_per_law: float = 1.5,
+    seed: int = 42,
+) -> Dict[str, int]:
+    """
+    out_dir に seed-master 形式の CSV を書き出し、ファイル名 → 行数を返す。
+    party_law_roles.csv は法令 1 件あたり平均 roles_per_law 行、
+    law_categories.csv は平均 categories_per_law 行（主分野 + ランダムな副分野）。
+    """
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    counts: Dict[str, int] = {}
+
+    f, w = _writer(out_dir / "Category.csv", ["name", "description"])
+    with f:
+        for c in CategoryType:
+            w.writerow({"name": c.value, "description": CATEGORY_DESCRIPTIONS[c]})
+    counts["Category.csv"] = len(CategoryType)
+
+    party_names: List[str] = []
+    f, w = _writer(out_dir / "Party.csv", ["name", "short_name", "founded_on", "dissolved_on"])
+    with f:
+        for row in iter_party_rows(parties, rng):
+            w.writerow(row)
+            party_names.append(row["name"])
+    counts["Party.csv"] = len(party_names)
+
+    roles = [r for r, _ in _ROLE_WEIGHTS]
+    role_weights = [wt for _, wt in _ROLE_WEIGHTS]
+    categories = list(CategoryType)
+    n_law = n_plr = n_lcm = 0
+    law_f, law_w = _writer(out_dir / "Law.csv", [
+        "title", "law_number", "type", "jurisdiction", "promulgated_on", "enacted_on", "summary", "source_url",
+    ])
+    plr_f, plr_w = _writer(out_dir / "party_law_roles.csv", ["party_name", "law_number", "role", "note"])
+    lcm_f, lcm_w = _writer(out_dir / "law_categories.csv", ["law_number", "category"])
+    with law_f, plr_f, lcm_f:
+        for row, main_category in iter_law_rows(laws, rng):
+            law_w.writerow(row)
+            n_law += 1
+
+            # 関与政党: 平均 roles_per_law 件（同じ (政党, 役割) は 1 回まで）
+            k = min(len(party_names), max(1, round(rng.expovariate(1 / roles_per_law))))
+            for party in rng.sample(party_names, k):
+                role = rng.choices(roles, role_weights)[0]
+                note = "修正案に賛成" if role == PartyRole.voted_for and rng.random() < 0.02 else ""
+                plr_w.writerow({"party_name": party, "law_number": row["law_number"], "role": role.value, "note": note})
+                n_plr += 1
+
+            cats = {main_category}
+            while len(cats) < len(categories) and rng.random() < (categories_per_law - 1) / categories_per_law:
+                cats.add(rng.choice(categories))
+            for c in cats:
+                lcm_w.writerow({"law_number": row["law_number"], "category": c.value})
+                n_lcm += 1
+
+    counts["Law.csv"] = n_law
+    counts["party_law_roles.csv"] = n_plr
+    counts["law_categories.csv"] = n_lcm
+    return counts
@@ -0,0 +1,135 @@
+# partyapp/services/key_resolver.py
+# 中間テーブル投入時の外部キー解決（業務キー → id）。
+# テーブル全件を辞書に載せる代わりに、CSV が参照しているキーだけを
+# IN (...) でまとめて引き、結果は上限付き LRU キャッシュに保持する。
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+class KeyResolver:
+    """
+    model.key_col の値 → model.id を解決する。
+    - resolve_many: キャッシュに無いキーだけを chunk_size 件ずつ IN 検索
+    - prime_from_upsert: 親テーブルの UPSERT 直前に呼び、同じ実行内で確定する id を先に覚える
+    - prime_after_upsert: UPSERT の衝突判定キーが key_col と違うとき（Law を title で引く場合）に書き込み後に呼ぶ
+    - 一意でないキー（例: Law.title の重複）は解決不能として扱う
+    スレッドセーフ（キャッシュ操作はロックで保護）。DB 検索は呼び出し側のセッションで行う。
+    """
+
+    def __init__(self, model, key_col: str, cache_size: int = 100_000, chunk_size: int = 500):
+        self.model = model
+        self.key_col = key_col
+        self.cache_size = max(1, cache_size)
+        self.chunk_size = max(1, chunk_size)
+        self._cache: "OrderedDict[Any, Any]" = OrderedDict()
+        self._ambiguous: set = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+
+    def _put(self, key: Any, id_: Any) -> None:
+        self._cache[key] = id_
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _fetch(self, db: Session, keys: List[Any], by: Optional[str] = None) -> Dict[Any, Any]:
+        """
+        keys を chunk_size 件ずつ IN 検索して {key_col の値: id} を返す（キャッシュは見ない）。
+        by を渡すと key_col ではなく列 by の値で引く。
+        """
+        key_attr = getattr(self.model, self.key_col)
+        by_attr = getattr(self.model, by or self.key_col)
+        found: Dict[Any, Any] = {}
+        dup: set = set()
+        for i in range(0, len(keys), self.chunk_size):
+            part = keys[i:i + self.chunk_size]
+            self.queries += 1
+            for k, id_ in db.execute(select(key_attr, self.model.id).where(by_attr.in_(part))):
+                if k in found and found[k] != id_:
+                    dup.add(k)
+                found[k] = id_
+        for k in dup:
+            found.pop(k, None)
+        with self._lock:
+            self._ambiguous.update(dup)
+        return found
+
+    def resolve_many(self, db: Session, keys: Iterable[Any]) -> Dict[Any, Any]:
+        """keys のうち解決できたものだけを {key: id} で返す。"""
+        wanted = {k for k in keys if k is not None and k != ""}
+        out: Dict[Any, Any] = {}
+        missing: List[Any] = []
+        with self._lock:
+            for k in wanted:
+                if k in self._cache:
+                    self._cache.move_to_end(k)
+                    out[k] = self._cache[k]
+                elif k not in self._ambiguous:
+                    missing.append(k)
+            self.hits += len(out)
+            self.misses += len(missing)
+        if missing:
+            found = self._fetch(db, missing)
+            with self._lock:
+                for k, id_ in found.items():
+                    self._put(k, id_)
+            out.update(found)
+        return out
+
+    def prime(self, known: Dict[Any, Any]) -> None:
+        """確定済みの {key: id} をキャッシュに入れる。"""
+        with self._lock:
+            for k, id_ in known.items():
+                self._put(k, id_)
+
+    def prime_from_upsert(self, db: Session, payloads: List[Dict[str, Any]]) -> None:
+        """
+        親テーブルへ UPSERT する直前のバッチを渡す。
+        既存行は DB 上の id（id=id で変わらない）、新規行は payload に付与した id が確定値になる。
+        """
+        keys = [p.get(self.key_col) for p in payloads]
+        known = self._fetch(db, [k for k in dict.fromkeys(keys) if k is not None])
+        for p, k in zip(payloads, keys):
+            # 同一バッチ内の重複キーは最初の行の id で INSERT され、以降は UPDATE になる
+            if k is not None and k not in known:
+                known[k] = p["id"]
+        self.prime(known)
+
+    def prime_after_upsert(self, db: Session, payloads: List[Dict[str, Any]], conflict_col: str) -> None:
+        """
+        UPSERT の衝突判定キー（conflict_col）が key_col と違うときに、書き込んだ直後のバッチを渡す。
+        既存行は id=id で payload の id にならないので、payload の id は使わず、
+        書き込み後の行を conflict_col（一意インデックス）で引いて key_col → id を覚える。
+        """
+        keys = [k for k in dict.fromkeys(p.get(conflict_col) for p in payloads) if k is not None]
+        self.prime(self._fetch(db, keys, by=conflict_col))
+
+    def ambiguous(self, key: Any) -> bool:
+        with self._lock:
+            return key in self._ambiguous
+
+    def summary(self) -> str:
+        return (
+            f"{self.model.__name__}.{self.key_col}: cache {len(self._cache)}/{self.cache_size}, "
+            f"hit {self.hits}, miss {self.misses}, queries {self.queries}"
+        )
+
+# party_law_roles.csv で Law を特定する列（結合キー → CSV 列名の候補）
+LAW_JOIN_KEYS = {
+    "law_number": ("law_number",),
+    "title": ("law_title", "law_name"),
+}
+
+def law_csv_column(fieldnames: Optional[Iterable[str]], law_key: str) -> str:
+    """結合キーに対応する CSV 列名を返す（ヘッダに無ければ最初の候補）。"""
+    candidates = LAW_JOIN_KEYS[law_key]
+    header = set(fieldnames or ())
+    for c in candidates:
+        if c in header:
+            return c
+    return candidates[0]
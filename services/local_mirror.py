@@ -0,0 +1,292 @@
+# partyapp/services/local_mirror.py
+# pa sync-local の実処理（本番 DB → ローカル SQLite ミラー。ミラーは pa --local の読み取り先）。
+# - 対象はデータのテーブル（MIRROR_MODELS）だけ。集計済みテーブル・seed の進捗は複製せず
+#   （pa --local stats はライブ集計になる）、全文検索インデックスは本番に作成済みなら
+#   同期後にローカルで差分更新する（T_LAW_SEARCH_TOKEN を毎回コピーしない）。
+#   ローカルのスキーマはモデルから作り、列構成が変わったテーブル（マイグレーション後）は作り直して全件コピーする。
+# - 初回と --full は全件コピー。2 回目以降はテーブルごとに
+#     updated_at（無ければ created_at）を持つテーブル … その列がウォーターマーク以降の行だけを取り込む。
+#       削除は行数で検出し、行数が合わないときだけキーセット差分で突き合わせる。
+#     それ以外 … キーセット差分。本番の行を主キーでローカルと突き合わせ、無い行・内容の違う行だけを書き、
+#       本番に無い主キーの行を消す（主キーの照合順序は MySQL と SQLite で違うので、並び順には頼らない）。
+# - 本番側は 1 トランザクションで読むので、REPEATABLE READ のスナップショットでテーブル間の時点がそろう。
+# - ローカル側はテーブルごとにコミットし、ウォーターマークも同じトランザクションで T_LOCAL_SYNC_STATE に保存する。
+#   このテーブルはミラー専用で、本番（Base.metadata）には作らない。
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, and_, delete, exists, func, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from partyapp.db.base import Base
+from partyapp.db.models import Category, Law, LawCategoryMap, Party, PartyLawRole
+from partyapp.db.models.search import LawSearchToken, SearchIndexState
+from partyapp.services.export import iter_chunks
+from partyapp.services.search import refresh_index
+
+# 主キーでローカルを引くときの 1 回の件数（SQLite のバインド変数の上限に収める）
+LOOKUP_SIZE = 500
+# 複製するテーブル（本番のデータ）。それ以外（集計済みテーブル・検索インデックス・seed の進捗）は
+# 本番に無いこともあり、データから作り直せるので複製しない
+MIRROR_MODELS = (Party, Category, Law, PartyLawRole, LawCategoryMap)
+# ローカルで作り直す全文検索インデックス
+SEARCH_TABLES = (LawSearchToken.__table__, SearchIndexState.__table__)
+
+_mirror_metadata = MetaData()
+
+SYNC_STATE = Table(
+    "T_LOCAL_SYNC_STATE", _mirror_metadata,
+    Column("table_name", String(64), primary_key=True),
+    Column("watermark", DateTime, doc="取り込み済みの updated_at / created_at（その列が無いテーブルは NULL）"),
+    Column("row_count", Integer, nullable=False, doc="同期後のローカルの行数"),
+    Column("synced_at", DateTime, nullable=False),
+)
+
+def timestamp_column(table: Table) -> Optional[Column]:
+    """差分の取り込みに使う列（updated_at、無ければ created_at）。どちらも無ければ None"""
+    for name in ("updated_at", "created_at"):
+        if name in table.c:
+            return table.c[name]
+    return None
+
+def mirror_tables() -> List[Table]:
+    """同期するテーブル（親テーブルが先）"""
+    names = {M.__tablename__ for M in MIRROR_MODELS}
+    return [t for t in Base.metadata.sorted_tables if t.name in names]
+
+# ==============================================================
+# スキーマと同期状態
+# ==============================================================
+
+def ensure_schema(local: Connection, tables: Sequence[Table], full: bool = False) -> List[str]:
+    """
+    ローカルにテーブルを作る。列構成が本番のモデルと違うテーブル（と full=True なら全テーブル）は作り直し、
+    その同期状態を消す（次の同期で全件コピーになる）。作り直したテーブル名を返す。
+    複製の対象外になったテーブルがローカルに残っていれば消す（検索インデックスはローカルで作り直すので残す）。
+    """
+    _mirror_metadata.create_all(local)
+    insp = inspect(local)
+    # 以前の同期で複製した対象外のテーブル（古い集計済みテーブルなど）は、本番とずれたまま読まれないよう消す
+    keep = {t.name for t in (*tables, *SEARCH_TABLES)}
+    for table in reversed(Base.metadata.sorted_tables):
+        if table.name not in keep and insp.has_table(table.name):
+            table.drop(local)
+            local.execute(delete(SYNC_STATE).where(SYNC_STATE.c.table_name == table.name))
+    copied = set(load_state(local))
+    for table in SEARCH_TABLES:
+        if table.name in copied:
+            # 以前の同期で本番からコピーした検索インデックスはローカルのデータと合わないので消し、作り直させる
+            if insp.has_table(table.name):
+                table.drop(local)
+            local.execute(delete(SYNC_STATE).where(SYNC_STATE.c.table_name == table.name))
+    rebuilt = []
+    for table in tables:
+        if insp.has_table(table.name):
+            if not full and {c["name"] for c in insp.get_columns(table.name)} == set(table.c.keys()):
+                continue
+            table.drop(local)
+        table.create(local)
+        local.execute(delete(SYNC_STATE).where(SYNC_STATE.c.table_name == table.name))
+        rebuilt.append(table.name)
+    return rebuilt
+
+def load_state(local: Connection) -> Dict[str, Any]:
+    """テーブル名 → T_LOCAL_SYNC_STATE の行"""
+    if not inspect(local).has_table(SYNC_STATE.name):
+        return {}
+    return {r.table_name: r for r in local.execute(select(SYNC_STATE))}
+
+def _save_state(local: Connection, table: Table, watermark: Optional[datetime]) -> int:
+    n = local.execute(select(func.count()).select_from(table)).scalar_one()
+    local.execute(delete(SYNC_STATE).where(SYNC_STATE.c.table_name == table.name))
+    local.execute(SYNC_STATE.insert().values(
+        table_name=table.name, watermark=watermark, row_count=n, synced_at=datetime.now(),
+    ))
+    return n
+
+# ==============================================================
+# 行の突き合わせと書き込み
+# ==============================================================
+
+class _TableSync:
+    """
+    1 テーブル分の同期（remote は本番側のセッション、local はローカルの接続）。
+    本番から読んだ行の主キーは一時テーブル（keys）に入れ、ローカルの行とは JOIN で突き合わせる
+    （IN 句に主キーを並べるより速く、キーセット差分では最後にここに無い行を消すのにも使う）。
+    """
+
+    def __init__(self, remote: Session, local: Connection, table: Table, batch_size: int):
+        self.remote = remote
+        self.local = local
+        self.table = table
+        self.batch_size = batch_size
+        self.cols = list(table.c.keys())
+        self.pk = list(table.primary_key.columns)
+        self._pk_idx = [self.cols.index(c.name) for c in self.pk]
+        self.inserted = self.updated = self.deleted = 0
+        self._keys: Optional[Table] = None
+        self._chunk = 0
+
+    def key(self, row: Sequence[Any]) -> Tuple[Any, ...]:
+        return tuple(row[i] for i in self._pk_idx)
+
+    @property
+    def keys(self) -> Table:
+        if self._keys is None:
+            self._keys = Table(
+                f"_keys_{self.table.name}", MetaData(),
+                *[Column(c.name, c.type.copy(), primary_key=True) for c in self.pk],
+                Column("_chunk", Integer, nullable=False, index=True),
+                prefixes=["TEMPORARY"],
+            )
+            self._keys.create(self.local)
+        return self._keys
+
+    def close(self) -> None:
+        if self._keys is not None:
+            self._keys.drop(self.local)
+            self._keys = None
+
+    def _key_match(self):
+        return and_(*[self.keys.c[c.name] == c for c in self.pk])
+
+    def _local_rows(self, rows: List[Tuple[Any, ...]]) -> Dict[Tuple[Any, ...], Tuple[Any, ...]]:
+        """rows の主キーを keys に入れ、同じ主キーのローカルの行を返す"""
+        self._chunk += 1
+        names = [c.name for c in self.pk]
+        self.local.execute(self.keys.insert(), [{**dict(zip(names, self.key(r))), "_chunk": self._chunk} for r in rows])
+        stmt = select(self.table).join(self.keys, self._key_match()).where(self.keys.c._chunk == self._chunk)
+        return {self.key(r): tuple(r) for r in self.local.execute(stmt)}
+
+    def _write(self, rows: List[Tuple[Any, ...]]) -> None:
+        if rows:
+            # 一意制約（law_number など）が別の行とぶつかったときも本番の行で置き換える
+            self.local.execute(self.table.insert().prefix_with("OR REPLACE"), [dict(zip(self.cols, r)) for r in rows])
+
+    def stream(self, stmt) -> Iterable[List[Tuple[Any, ...]]]:
+        return iter_chunks(self.remote, stmt, self.batch_size)
+
+    def copy_all(self) -> None:
+        """ローカルを空にして全件コピーする"""
+        self.local.execute(delete(self.table))
+        for rows in self.stream(select(self.table)):
+            self._write(rows)
+            self.inserted += len(rows)
+
+    def merge(self, rows: List[Tuple[Any, ...]]) -> None:
+        """ローカルに無い行・内容の違う行だけを書く"""
+        existing = self._local_rows(rows)
+        changed = [r for r in rows if existing.get(self.key(r)) != r]
+        self._write(changed)
+        n_new = sum(1 for r in changed if self.key(r) not in existing)
+        self.inserted += n_new
+        self.updated += len(changed) - n_new
+
+    def upsert_since(self, ts: Column, watermark: datetime) -> None:
+        """ts がウォーターマーク以降の行を取り込む（同一時刻の取りこぼしを避けるため >= で取る）"""
+        for rows in self.stream(select(self.table).where(ts >= watermark)):
+            self.merge(rows)
+
+    def keyset_diff(self) -> None:
+        """本番の全行をローカルと突き合わせ、最後に本番に無かった主キーの行を消す（主キーの集合をメモリに持たない）"""
+        self.local.execute(delete(self.keys))
+        for rows in self.stream(select(self.table)):
+            self.merge(rows)
+        self.deleted += self.local.execute(delete(self.table).where(~exists().where(self._key_match()))).rowcount
+
+    def count_mismatch(self) -> bool:
+        count = select(func.count()).select_from(self.table)
+        return self.remote.execute(count).scalar_one() != self.local.execute(count).scalar_one()
+
+# ==============================================================
+# 同期
+# ==============================================================
+
+def sync_local(
+    remote: Session,
+    local_engine: Engine,
+    full: bool = False,
+    batch_size: int = 5000,
+    on_table: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    本番（remote）の全テーブルをローカル（local_engine）へ同期し、テーブルごとの結果を返す。
+    結果は {"table", "mode": full|since|keyset, "inserted", "updated", "deleted", "rows", "elapsed"}。
+    on_table を渡すとテーブルを 1 つ終えるたびにその結果で呼ぶ。
+    """
+    tables = mirror_tables()
+    with local_engine.begin() as local:
+        ensure_schema(local, tables, full=full)
+        state = load_state(local)
+
+    results: List[Dict[str, Any]] = []
+    for table in tables:
+        started = time.perf_counter()
+        ts = timestamp_column(table)
+        st = state.get(table.name)
+        with local_engine.begin() as local:
+            sync = _TableSync(remote, local, table, batch_size)
+            try:
+                if st is None:
+                    mode = "full"
+                    sync.copy_all()
+                elif ts is not None and st.watermark is not None:
+                    mode = "since"
+                    sync.upsert_since(ts, st.watermark)
+                    if sync.count_mismatch():
+                        # 本番で行が消えた（または取りこぼした）ので全行で突き合わせる
+                        mode = "keyset"
+                        sync.keyset_diff()
+                else:
+                    mode = "keyset"
+                    sync.keyset_diff()
+            finally:
+                sync.close()
+            watermark = None
+            if ts is not None:
+                watermark = local.execute(select(func.max(ts))).scalar_one()
+            rows = _save_state(local, table, watermark)
+        result = {
+            "table": table.name, "mode": mode,
+            "inserted": sync.inserted, "updated": sync.updated, "deleted": sync.deleted,
+            "rows": rows, "elapsed": time.perf_counter() - started,
+        }
+        results.append(result)
+        if on_table is not None:
+            on_table(result)
+    has_search = _has_search_index(remote)
+    remote.rollback()  # 読み取りのトランザクション（スナップショット）を閉じる
+    if has_search:
+        law = next(r for r in results if r["table"] == Law.__tablename__)
+        # T_LAW を全件コピーし直したときは、既存のインデックスのウォーターマークが当てにならないので作り直す
+        refresh_local_search_index(
+            local_engine, full=law["mode"] == "full", purge=bool(law["deleted"]),
+            changed=bool(law["inserted"] or law["updated"] or law["deleted"]),
+        )
+    return results
+
+def _has_search_index(db: Session) -> bool:
+    """全文検索インデックスを作成済みか（本番なら pa search-reindex を実行したか）"""
+    if not inspect(db.connection()).has_table(SearchIndexState.__tablename__):
+        return False
+    return db.execute(select(SearchIndexState.refreshed_at).where(SearchIndexState.refreshed_at.is_not(None))).first() is not None
+
+def refresh_local_search_index(
+    local_engine: Engine, full: bool = False, purge: bool = False, changed: bool = True,
+) -> int:
+    """
+    同期したローカルの T_LAW から全文検索インデックスを差分更新し、再インデックスした件数を返す
+    （pa --local search 用。本番の T_LAW_SEARCH_TOKEN はコピーしない）。
+    purge=True なら、同期で消えた法令のトークンも落とす（SQLite は既定で外部キーの CASCADE が効かない）。
+    changed=False（T_LAW に変更が無かった）なら、インデックスが作成済みのときは何もしない。
+    """
+    Base.metadata.create_all(local_engine, tables=list(SEARCH_TABLES))
+    with Session(local_engine) as db:
+        if not (full or changed) and _has_search_index(db):
+            return 0
+        if purge and not full:
+            tok = LawSearchToken.__table__
+            db.execute(delete(tok).where(~exists().where(Law.id == tok.c.law_id)))
+        return refresh_index(db, full=full)
@@ -0,0 +1,223 @@
+# partyapp/services/profiler.py
+# pa --profile の SQL プロファイラ。
+# before/after_cursor_execute で全エンジンの SQL を計時し、リテラルを ? に置き換えた
+# 正規化 SQL ごとに回数・合計・p50/p95/p99・返却行数を集計する
+# （stream_results で流した文の返却行数は取得前に分からないので不明 = None / 表では ? とする）。
+# あわせて ORM の遅延ロード（Law.categories などの relationship 読み込み）を
+# do_orm_execute で数え、同じ relationship がループ内で何度も読まれていれば N+1 として報告する。
+import json
+import re
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# 同じ relationship の遅延ロード / 同じ SELECT がこの回数以上なら N+1 とみなす
+N_PLUS_ONE_THRESHOLD = 5
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w`\"])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_RE = re.compile(r"(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+
+def normalize_sql(sql: str) -> str:
+    """
+    リテラルとバインド変数を ? に、IN (?, ?, ...) を IN (?...) に、
+    複数行 VALUES を 1 行分に畳んで、同じ形の文を 1 つにまとめる。
+    """
+    s = _WS_RE.sub(" ", sql).strip()
+    s = _STRING_RE.sub("?", s)
+    s = _NUMBER_RE.sub("?", s)
+    s = _PLACEHOLDER_RE.sub("?", s)
+    s = _IN_LIST_RE.sub("(?...)", s)
+    s = _VALUES_RE.sub(r"\1 ...", s)
+    return s
+
+def _percentile(sorted_vals: List[float], p: int) -> float:
+    if len(sorted_vals) == 1:
+        return sorted_vals[0]
+    return statistics.quantiles(sorted_vals, n=100, method="inclusive")[p - 1]
+
+def _relationship_name(orm_execute_state) -> Optional[str]:
+    path = orm_execute_state.loader_strategy_path
+    prop = getattr(path, "prop", None) if path is not None else None
+    if prop is None:
+        return None
+    return f"{prop.parent.class_.__name__}.{prop.key}"
+
+class SqlProfiler:
+    """
+    start() でリスナーを登録し、stop() で外す。report() / to_dict() で結果を取り出す。
+    リスナーは Engine / Session クラスに付けるので、bulk_load の専用エンジンなども対象になる。
+    """
+
+    def __init__(self, threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lazy: Dict[str, Dict[str, Any]] = {}
+        self._active = False
+        self.started_at = 0.0
+        self.elapsed = 0.0
+
+    # ---- リスナー ----
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_profile_t0", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_profile_t0")
+        if not stack:
+            return
+        elapsed = time.perf_counter() - stack.pop()
+        opts = context.execution_options if context is not None else {}
+        # stream_results（サーバサイドカーソル）の rowcount は取得前なので当てにならない
+        # （pymysql の SSCursor は 2**64-1 を返す）。その文の返却行数は不明（None）として扱う
+        if opts.get("stream_results"):
+            rows = None
+        else:
+            rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else 0
+        key = normalize_sql(statement)
+        lazy = opts.get("_profile_lazy")
+        with self._lock:
+            st = self._stats.get(key)
+            if st is None:
+                st = self._stats[key] = {"times": [], "rows": 0, "executemany": 0, "lazy": None}
+            st["times"].append(elapsed)
+            st["lazy"] = st["lazy"] or lazy
+            if rows is None or st["rows"] is None:
+                st["rows"] = None
+            else:
+                st["rows"] += rows
+            st["executemany"] += int(bool(executemany))
+
+    def _orm_execute(self, orm_execute_state):
+        if not (orm_execute_state.is_relationship_load and orm_execute_state.lazy_loaded_from is not None):
+            return
+        name = _relationship_name(orm_execute_state) or "(relationship)"
+        # 実際に流れる SQL（after_cursor_execute）側で遅延ロード由来だと分かるよう印を付ける
+        orm_execute_state.update_execution_options(_profile_lazy=name)
+        with self._lock:
+            lz = self._lazy.get(name)
+            if lz is None:
+                lz = self._lazy[name] = {"count": 0, "parents": set()}
+            lz["count"] += 1
+            lz["parents"].add(orm_execute_state.lazy_loaded_from.identity_key)
+
+    def start(self) -> "SqlProfiler":
+        if not self._active:
+            event.listen(Engine, "before_cursor_execute", self._before)
+            event.listen(Engine, "after_cursor_execute", self._after)
+            event.listen(Session, "do_orm_execute", self._orm_execute)
+            self._active = True
+            self.started_at = time.perf_counter()
+        return self
+
+    def stop(self) -> None:
+        if self._active:
+            event.remove(Engine, "before_cursor_execute", self._before)
+            event.remove(Engine, "after_cursor_execute", self._after)
+            event.remove(Session, "do_orm_execute", self._orm_execute)
+            self._active = False
+            self.elapsed = time.perf_counter() - self.started_at
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---- 集計 ----
+    def statements(self) -> List[Dict[str, Any]]:
+        out = []
+        with self._lock:
+            items = [(k, list(v["times"]), v["rows"], v["executemany"], v["lazy"]) for k, v in self._stats.items()]
+        for sql, times, rows, many, lazy in items:
+            ts = sorted(times)
+            out.append({
+                "sql": sql,
+                "count": len(ts),
+                "executemany": many,
+                "total_ms": sum(ts) * 1000,
+                "p50_ms": _percentile(ts, 50) * 1000,
+                "p95_ms": _percentile(ts, 95) * 1000,
+                "p99_ms": _percentile(ts, 99) * 1000,
+                "rows": rows,
+                "lazy_load": lazy,
+            })
+        out.sort(key=lambda r: r["total_ms"], reverse=True)
+        return out
+
+    def n_plus_one(self) -> List[Dict[str, Any]]:
+        """遅延ロードの繰り返しと、同じ SELECT の繰り返しを N+1 候補として返す"""
+        found = []
+        stmts = self.statements()
+        with self._lock:
+            lazy = [(k, v["count"], len(v["parents"])) for k, v in self._lazy.items()]
+        for name, count, parents in sorted(lazy, key=lambda x: -x[1]):
+            if count >= self.threshold:
+                found.append({
+                    "kind": "lazy_load",
+                    "target": name,
+                    "count": count,
+                    "parents": parents,
+                    "sql": next((st["sql"] for st in stmts if st["lazy_load"] == name), None),
+                    "hint": f"selectinload({name}) / joinedload({name}) で事前読み込みする",
+                })
+        for st in stmts:
+            if (
+                st["count"] >= self.threshold
+                and st["executemany"] == 0
+                and st["lazy_load"] is None  # 遅延ロードは上で報告済み
+                and st["sql"].upper().startswith("SELECT")
+                and " WHERE " in st["sql"].upper()
+            ):
+                found.append({
+                    "kind": "repeated_select",
+                    "target": st["sql"],
+                    "count": st["count"],
+                    "hint": "ループ内の 1 件ずつの SELECT を IN (...) のまとめ取得にする",
+                })
+        return found
+
+    def to_dict(self) -> Dict[str, Any]:
+        stmts = self.statements()
+        return {
+            "elapsed_ms": (self.elapsed or (time.perf_counter() - self.started_at)) * 1000,
+            "statements_total": sum(s["count"] for s in stmts),
+            "sql_total_ms": sum(s["total_ms"] for s in stmts),
+            "statements": stmts,
+            "n_plus_one": self.n_plus_one(),
+        }
+
+    def report(self, fmt: str = "table", top: int = 20) -> str:
+        data = self.to_dict()
+        if fmt == "json":
+            return json.dumps(data, ensure_ascii=False, indent=2)
+
+        lines = [
+            f"🧪 SQL プロファイル: {data['statements_total']} 文 / SQL {data['sql_total_ms']:.1f} ms "
+            f"/ 全体 {data['elapsed_ms']:.1f} ms"
+        ]
+        if data["statements"]:
+            lines.append(f"{'count':>7} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'rows':>9}  sql")
+            for s in data["statements"][:top]:
+                sql = s["sql"] if len(s["sql"]) <= 100 else s["sql"][:97] + "..."
+                rows = "?" if s["rows"] is None else s["rows"]
+                lines.append(
+                    f"{s['count']:>7} {s['total_ms']:>10.1f} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} "
+                    f"{s['p99_ms']:>8.2f} {rows:>9}  {sql}"
+                )
+            if len(data["statements"]) > top:
+                lines.append(f"  …ほか {len(data['statements']) - top} 種類")
+        for f in data["n_plus_one"]:
+            target = f["target"] if len(f["target"]) <= 100 else f["target"][:97] + "..."
+            label = "遅延ロード" if f["kind"] == "lazy_load" else "繰り返し SELECT"
+            lines.append(f"⚠ N+1 の疑い（{label} x{f['count']}）: {target}")
+            lines.append(f"   💡 {f['hint']}")
+        return "\n".join(lines)
@@ -0,0 +1,302 @@
+# partyapp/services/query.py
+# pa show などの読み取り系コマンドで使うクエリ組み立てとストリーミング読み出し。
+# - 列指定（--columns）は SELECT 句に反映し、不要な Text 列などを転送しない
+# - ページングは OFFSET ではなくキーセット（並び替え列 + 主キー）で行う
+# - 結果はサーバサイドカーソル（yield_per）で少しずつ受け取り、メモリを一定に保つ
+# - 関連（--include）は多重度に応じて selectinload / joinedload でまとめて読み、入れ子の辞書にする
+import operator
+import re
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import and_, false, inspect, or_, select
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
+from sqlalchemy.sql.elements import ColumnElement
+
+def serialize_value(v: Any) -> Any:
+    """JSON/表出力向けの軽いシリアライザ"""
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    # SQLAlchemy Enum は Python Enum になる想定
+    if isinstance(v, Enum):
+        return v.value
+    return v
+
+def pk_columns(Model) -> List[str]:
+    """主キー列名のリスト（複合主キーは定義順）"""
+    return [c.name for c in Model.__table__.primary_key.columns]
+
+def keyset_columns(Model, order_by: Optional[str]) -> List[str]:
+    """
+    キーセットページングに使う列。並び替え列に主キー列を足して一意な順序にする。
+    order_by が None のときは主キー順。
+    """
+    pks = pk_columns(Model)
+    if not order_by:
+        return pks
+    return [order_by, *[c for c in pks if c != order_by]]
+
+def coerce_value(column, s: str) -> Any:
+    """文字列 s を列の型（int/float/date/datetime/Enum/str）に合わせて変換する。"""
+    s = s.strip()
+    try:
+        py = column.type.python_type
+    except NotImplementedError:
+        return s
+    if py is bool:
+        return s.lower() in ("1", "true", "yes", "on")
+    if issubclass(py, Enum):
+        return py(s) if s in py._value2member_map_ else py[s]
+    if py is datetime:
+        return datetime.fromisoformat(s)
+    if py is date:
+        return date.fromisoformat(s)
+    if py in (int, float):
+        return py(s)
+    return s
+
+def parse_after(Model, key_cols: Sequence[str], after: str) -> List[Any]:
+    """
+    --after の値（key_cols の順にカンマ区切り）を列の型に変換する。
+    先頭の並び替え列の値にはカンマを含められるよう、右側から分割する。
+    NULL 可の列の空の値は NULL（format_cursor が NULL を空で書き出すのと対）。
+    """
+    parts = after.rsplit(",", len(key_cols) - 1) if len(key_cols) > 1 else [after]
+    if len(parts) != len(key_cols):
+        raise ValueError(f"--after には {', '.join(key_cols)} の値をカンマ区切りで指定してください: {after}")
+    values = []
+    for c, v in zip(key_cols, parts):
+        col = Model.__table__.c[c]
+        values.append(None if col.nullable and not v.strip() else coerce_value(col, v))
+    return values
+
+def keyset_condition(Model, key_cols: Sequence[str], values: Sequence[Any], desc: bool = False) -> ColumnElement:
+    """
+    (c1, c2, ...) > (v1, v2, ...) を OR/AND に展開した条件（desc のときは <）。
+    行値比較より展開形のほうが MariaDB で先頭列のインデックス範囲検索になりやすい。
+    NULL は MariaDB / MySQL / SQLite と同じく最小の値として扱う（昇順で先頭、降順で末尾）。
+    """
+    cols = [Model.__table__.c[c] for c in key_cols]
+    terms = []
+    for i, (col, v) in enumerate(zip(cols, values)):
+        eqs = [cols[j].is_(None) if values[j] is None else cols[j] == values[j] for j in range(i)]
+        if v is None:
+            if desc:
+                continue  # NULL より小さい値は無い
+            cmp = col.is_not(None)
+        elif desc and col.nullable:
+            cmp = or_(col < v, col.is_(None))
+        else:
+            cmp = col < v if desc else col > v
+        terms.append(and_(*eqs, cmp) if eqs else cmp)
+    return or_(*terms) if terms else false()
+
+def build_select(
+    Model,
+    columns: Sequence[str],
+    where_clauses: Sequence[ColumnElement] = (),
+    order_by: Optional[str] = None,
+    desc: bool = False,
+    after: Optional[Sequence[Any]] = None,
+    limit: Optional[int] = None,
+    includes: Optional[Dict[str, Dict]] = None,
+):
+    """
+    列を絞った SELECT を組み立てる。
+    キーセット列（並び替え列 + 主キー）が columns に無い場合も SELECT には含める
+    （次ページのカーソル値を作るため）。戻り値は (stmt, key_cols)。
+    includes（parse_includes の結果）を渡すと、列ではなく ORM エンティティを load_only で読み、
+    関連のローダーオプションを付ける（stream_entity_rows で読む）。
+    """
+    tbl = Model.__table__
+    key_cols = keyset_columns(Model, order_by)
+    select_cols = list(dict.fromkeys([*columns, *key_cols]))
+    if includes:
+        stmt = select(Model).options(
+            load_only(*[getattr(Model, c) for c in select_cols]),
+            *include_options(Model, includes),
+        )
+    else:
+        stmt = select(*[tbl.c[c] for c in select_cols])
+    if where_clauses:
+        stmt = stmt.where(*where_clauses)
+    if after is not None:
+        stmt = stmt.where(keyset_condition(Model, key_cols, after, desc))
+    stmt = stmt.order_by(*[tbl.c[c].desc() if desc else tbl.c[c] for c in key_cols])
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt, key_cols
+
+def stream_rows(db: Session, stmt, chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    サーバサイドカーソルで chunk_size 行ずつ受け取り、1 行ずつ辞書で返す。
+    全件をクライアントに溜めないため、巨大なテーブルでもメモリは一定。
+    """
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=chunk_size))
+    try:
+        for row in result:
+            yield dict(row._mapping)
+    finally:
+        result.close()
+
+# ==============================================================
+# 関連の一括読み込み（--include）
+# ==============================================================
+
+def parse_includes(Model, spec: str) -> Dict[str, Dict]:
+    """
+    --include の値（例: party_roles.party,categories）を関連名の木
+    （{"party_roles": {"party": {}}, "categories": {}}）にする。未知の関連名は KeyError。
+    """
+    tree: Dict[str, Dict] = {}
+    for path in (p.strip() for p in spec.split(",")):
+        if not path:
+            continue
+        node, mapper = tree, inspect(Model)
+        for name in path.split("."):
+            rel = mapper.relationships.get(name)
+            if rel is None:
+                raise KeyError(f"{mapper.class_.__name__}.{name}")
+            node = node.setdefault(name, {})
+            mapper = rel.mapper
+    return tree
+
+def include_options(Model, tree: Dict[str, Dict], parent=None) -> List[Any]:
+    """
+    関連の木をローダーオプションにする。多重度で戦略を選ぶ:
+    - コレクション（1 対多・多対多）は selectinload … 親の主キーを IN でまとめて 1 クエリ
+      （JOIN だと親の行が子の数だけ増え、LIMIT やカーソルの件数がずれる）
+    - 多対 1 は joinedload … 親の SELECT に JOIN するのでクエリは増えない
+    親の件数に関係なく、関連 1 段あたり高々 1 クエリ（yield_per のチャンクごと）になる。
+    """
+    opts: List[Any] = []
+    mapper = inspect(Model)
+    for name, sub in tree.items():
+        rel = mapper.relationships[name]
+        attr = getattr(Model, name)
+        if parent is None:
+            loader = selectinload(attr) if rel.uselist else joinedload(attr)
+        else:
+            loader = parent.selectinload(attr) if rel.uselist else parent.joinedload(attr)
+        opts.extend(include_options(rel.mapper.class_, sub, loader) if sub else [loader])
+    return opts
+
+def _related(obj: Any, tree: Dict[str, Dict]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for name, sub in tree.items():
+        val = getattr(obj, name)
+        if isinstance(val, list):
+            out[name] = [entity_to_dict(v, sub) for v in val]
+        else:
+            out[name] = entity_to_dict(val, sub) if val is not None else None
+    return out
+
+def entity_to_dict(obj: Any, tree: Dict[str, Dict]) -> Dict[str, Any]:
+    """エンティティを全列の辞書にし、tree の関連を入れ子（コレクションはリスト）で加える"""
+    d = {c: serialize_value(getattr(obj, c)) for c in obj.__table__.columns.keys()}
+    d.update(_related(obj, tree))
+    return d
+
+def stream_entity_rows(
+    db: Session,
+    stmt,
+    columns: Sequence[str],
+    includes: Dict[str, Dict],
+    chunk_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """
+    build_select(includes=...) の文を yield_per で chunk_size 件ずつ読み、
+    columns の値（未整形）と関連の入れ子辞書を 1 件ずつ返す（stream_rows と同じ形）。
+    selectinload はチャンクごとに IN でまとめて発行される。
+    """
+    result = db.scalars(stmt.execution_options(stream_results=True, yield_per=chunk_size))
+    try:
+        for obj in result:
+            d = {c: getattr(obj, c) for c in columns}
+            d.update(_related(obj, includes))
+            yield d
+    finally:
+        result.close()
+
+def format_cursor(row: Dict[str, Any], key_cols: Sequence[str]) -> str:
+    """行から --after に渡せるカーソル文字列を作る（NULL は空）。"""
+    return ",".join("" if row[c] is None else str(serialize_value(row[c])) for c in key_cols)
+
+# ==============================================================
+# --where の条件式
+# ==============================================================
+#   col=v / col!=v / col>v / col>=v / col<v / col<=v
+#   col in v1,v2,...  / col not in v1,v2,...
+#   col is null / col is not null
+#   col like 前方一致%   （先頭ワイルドカードはインデックスが効かないので不可）
+# 値は列の型（Date, Enum, Integer など）に合わせて変換する。
+
+_PRED_RE = re.compile(
+    r"""^\s*(?P<col>\w+)\s*(?:
+        (?P<op>!=|>=|<=|=|>|<)\s*(?P<val>.*)
+      | \s(?P<inop>not\s+in|in)\s+(?P<list>.*)
+      | \sis\s+(?P<notnull>not\s+)?null\s*
+      | \slike\s+(?P<pat>.*)
+    )$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+_CMP_OPS = {
+    "=": operator.eq, "!=": operator.ne,
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+}
+
+# インデックス設計上の分類: 等価条件（eq）は複合インデックスの前方、範囲条件（range）は後方に置く
+EQ_OPS = {"=", "in", "is null"}
+
+class Predicate:
+    """--where 1 件分（列名・演算子・SQL 条件）"""
+
+    def __init__(self, column: str, op: str, clause: ColumnElement):
+        self.column = column
+        self.op = op
+        self.clause = clause
+
+    @property
+    def is_equality(self) -> bool:
+        return self.op in EQ_OPS
+
+def parse_predicate(Model, expr: str) -> Predicate:
+    """--where の 1 式を Predicate にする。書式・列名・値が不正なら ValueError。"""
+    m = _PRED_RE.match(expr)
+    if not m:
+        raise ValueError(f"条件の書式が不正です: {expr}")
+    name = m.group("col")
+    if name not in Model.__table__.c:
+        raise KeyError(name)
+    col = Model.__table__.c[name]
+
+    def _coerce(v: str) -> Any:
+        try:
+            return coerce_value(col, v)
+        except (LookupError, TypeError, ValueError) as e:
+            # Enum に無い値、日付の書式違いなど
+            raise ValueError(f"{name} の値が不正です: {v!r}") from e
+
+    if m.group("op"):
+        op = m.group("op")
+        v = _coerce(m.group("val"))
+        return Predicate(name, op, _CMP_OPS[op](col, v))
+    if m.group("inop"):
+        values = [_coerce(v) for v in m.group("list").split(",") if v.strip()]
+        if not values:
+            raise ValueError(f"in の値がありません: {expr}")
+        if m.group("inop").lower().startswith("not"):
+            return Predicate(name, "not in", col.not_in(values))
+        return Predicate(name, "in", col.in_(values))
+    if m.group("pat") is not None:
+        pat = m.group("pat").strip()
+        prefix = pat[:-1] if pat.endswith("%") else pat
+        if not prefix or "%" in prefix or "_" in prefix:
+            raise ValueError(f"like は前方一致（例: 令和%）のみ対応しています: {pat}")
+        return Predicate(name, "like", col.startswith(prefix, autoescape=True))
+
+    if m.group("notnull"):
+        return Predicate(name, "is not null", col.is_not(None))
+    return Predicate(name, "is null", col.is_(None))
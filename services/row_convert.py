@@ -0,0 +1,212 @@
+# partyapp/services/row_convert.py
+# CSV の行（文字列の辞書）→ テーブルに書き込める辞書 への変換器を、モデル × CSV ヘッダごとに 1 回だけ組み立てる。
+# - 列の型（Date / DateTime / Enum / Integer / Boolean / String(n)・CHAR(n)）と NULL 可否から
+#   列ごとの変換関数を作る。日付は date.fromisoformat、Enum は「名前・値 → 名前」の辞書を事前に作る。
+# - ヘッダの未知の列（typo など）と必須列の欠落は、同じヘッダにつき 1 回だけ報告する。
+# - 値の誤りは行ごとに表示せず RowErrors に行番号付きで集め、ファイルの最後にまとめて報告する。
+import difflib
+import threading
+from datetime import date, datetime
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import typer
+from sqlalchemy import Boolean, Date, DateTime, Integer, String
+from sqlalchemy.types import Enum as SAEnum
+
+# CSV では受け取らない列（常に自動生成）
+IGNORED_COLUMNS = {"id"}
+# RowErrors.report() で表示する行の数
+ERROR_EXAMPLES = 10
+
+class RowErrors:
+    """
+    不正な値でスキップした行を集計する（スレッドセーフ）。
+    report() で列ごとの件数と、先頭 ERROR_EXAMPLES 行の内容を表示する。
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.rows = 0
+        self.by_column: Dict[str, int] = {}
+        self.examples: List[str] = []
+        self._lock = threading.Lock()
+
+    def add(self, line: Optional[int], problems: Sequence[Tuple[str, str]]) -> None:
+        """problems は (列名, 内容) のリスト。line は CSV 上の行番号（ヘッダが 1 行目）"""
+        with self._lock:
+            self.rows += 1
+            for col, _ in problems:
+                self.by_column[col] = self.by_column.get(col, 0) + 1
+            if len(self.examples) < ERROR_EXAMPLES:
+                where = f"{line} 行目" if line is not None else "?"
+                self.examples.append(f"{where}: " + " / ".join(msg for _, msg in problems))
+
+    def report(self) -> None:
+        if not self.rows:
+            return
+        per_col = ", ".join(f"{c} {n} 件" for c, n in self.by_column.items())
+        typer.echo(f"⚠ {self.label}: 不正な値のある {self.rows} 行をスキップしました（{per_col}）")
+        for ex in self.examples:
+            typer.echo(f"   {ex}")
+        if self.rows > len(self.examples):
+            typer.echo(f"   …ほか {self.rows - len(self.examples)} 行")
+
+# ==============================================================
+# 列ごとの変換関数
+# ==============================================================
+
+def enum_lookup(enum_cls) -> Dict[str, Enum]:
+    """Enum の名前と値の両方から メンバー を引く辞書"""
+    lookup: Dict[str, Enum] = {m.name: m for m in enum_cls}
+    for m in enum_cls:
+        lookup.setdefault(str(m.value), m)
+    return lookup
+
+def _enum_converter(col) -> Callable[[str], Any]:
+    enum_cls = col.type.enum_class
+    if enum_cls is not None:
+        # SAEnum はメンバーの名前を保存するので、名前の文字列にそろえる
+        lookup = {k: m.name for k, m in enum_lookup(enum_cls).items()}
+    else:
+        lookup = {v: v for v in col.type.enums}
+    choices = ", ".join(dict.fromkeys(lookup.values()))
+
+    def convert(s: str) -> Any:
+        v = lookup.get(s)
+        if v is None:
+            raise ValueError(f"{col.name}={s!r} は候補にありません（{choices}）")
+        return v
+    return convert
+
+def _parser(col, parse: Callable[[str], Any], what: str) -> Callable[[str], Any]:
+    def convert(s: str) -> Any:
+        try:
+            return parse(s)
+        except ValueError:
+            raise ValueError(f"{col.name}={s!r} は{what}ではありません") from None
+    return convert
+
+_TRUE = {"1", "true", "yes", "on"}
+_FALSE = {"0", "false", "no", "off"}
+
+def _bool(s: str) -> bool:
+    v = s.strip().lower()
+    if v in _TRUE:
+        return True
+    if v in _FALSE:
+        return False
+    raise ValueError(s)
+
+def _date(s: str) -> date:
+    try:
+        return date.fromisoformat(s)
+    except ValueError:
+        # 月日が 1 桁の "2024-1-5" などは strptime で受ける（従来の形式）
+        return datetime.strptime(s, "%Y-%m-%d").date()
+
+def _length_checker(col, length: int) -> Callable[[str], Any]:
+    def convert(s: str) -> Any:
+        if len(s) > length:
+            raise ValueError(f"{col.name} が {length} 文字を超えています（{len(s)} 文字）")
+        return s
+    return convert
+
+def column_converter(col) -> Optional[Callable[[str], Any]]:
+    """
+    空でない文字列を列の型に変換する関数（変換不要なら None）。不正な値は ValueError（メッセージは表示用）。
+    """
+    t = col.type
+    if isinstance(t, SAEnum):
+        return _enum_converter(col)
+    if isinstance(t, DateTime):
+        return _parser(col, datetime.fromisoformat, "日時（ISO 8601）")
+    if isinstance(t, Date):
+        return _parser(col, _date, "日付（YYYY-MM-DD）")
+    if isinstance(t, Boolean):
+        return _parser(col, _bool, "真偽値（true/false）")
+    if isinstance(t, Integer):
+        return _parser(col, int, "整数")
+    if isinstance(t, String) and t.length:
+        return _length_checker(col, t.length)
+    return None
+
+def _required(col) -> bool:
+    """CSV で値を必ず与える列（NOT NULL で既定値なし）"""
+    return not col.nullable and col.default is None and col.server_default is None and col.name not in IGNORED_COLUMNS
+
+# ==============================================================
+# 行の変換器
+# ==============================================================
+
+class RowConverter:
+    """
+    compile_converter() が作る、1 モデル × 1 ヘッダ用の変換器。
+    columns は出力する列（ヘッダのうちテーブルにある列。どの行でも同じ列集合になる）。
+    """
+
+    def __init__(self, model, header: Sequence[str]):
+        tbl = model.__table__
+        self.model = model
+        self.unknown = [h for h in header if h not in tbl.c and h not in IGNORED_COLUMNS]
+        self.columns = [h for h in dict.fromkeys(header) if h in tbl.c and h not in IGNORED_COLUMNS]
+        self.missing = [c.name for c in tbl.c if _required(c) and c.name not in self.columns]
+        # (列名, 変換関数 or None, 必須か)
+        self._fields = [(c, column_converter(tbl.c[c]), _required(tbl.c[c])) for c in self.columns]
+
+    def report_header(self, label: str) -> None:
+        if self.unknown:
+            hints = []
+            for h in self.unknown:
+                close = difflib.get_close_matches(h, [c.name for c in self.model.__table__.c], n=1)
+                hints.append(f"{h}（{close[0]} の誤り?）" if close else h)
+            typer.echo(f"⚠ {label}: テーブルに無い列を無視します: {', '.join(hints)}")
+        if self.missing:
+            typer.echo(f"⚠ {label}: 必須の列がヘッダにありません: {', '.join(self.missing)}（すべての行がスキップされます）")
+
+    def __call__(self, raw: Dict[str, Any], line: Optional[int] = None, errors: Optional[RowErrors] = None) -> Optional[Dict[str, Any]]:
+        """
+        raw を変換した辞書を返す。不正な値を含む行は errors に記録して None を返す
+        （errors が None なら ValueError を送出する）。空文字は None。
+        """
+        out: Dict[str, Any] = {}
+        problems: List[Tuple[str, str]] = []
+        for name, conv, required in self._fields:
+            v = raw.get(name)
+            if v is None or v == "":
+                if required:
+                    problems.append((name, f"{name} は必須です"))
+                out[name] = None
+                continue
+            if conv is None:
+                out[name] = v
+                continue
+            try:
+                out[name] = conv(v)
+            except ValueError as e:
+                problems.append((name, str(e)))
+        for name in self.missing:
+            problems.append((name, f"{name} は必須です"))
+        if problems:
+            if errors is None:
+                raise ValueError(" / ".join(msg for _, msg in problems))
+            errors.add(line, problems)
+            return None
+        return out
+
+@lru_cache(maxsize=64)
+def _compile(model, header: Tuple[str, ...]) -> RowConverter:
+    return RowConverter(model, header)
+
+def compile_converter(model, header: Sequence[str], report: bool = True) -> RowConverter:
+    """
+    model と CSV ヘッダ（列名の並び）に対する変換器（同じ組み合わせではキャッシュを返す）。
+    report=True ならヘッダの問題（無い列・必須列の欠落）を表示する（ファイルごとに 1 回表示されるよう、
+    同じファイルの続きの区間では report=False で呼ぶ）。
+    """
+    # DictReader はヘッダより値の多い行の余りを None キーに入れるので除く
+    conv = _compile(model, tuple(h for h in header if h is not None))
+    if report:
+        conv.report_header(model.__name__)
+    return conv
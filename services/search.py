@@ -0,0 +1,206 @@
+# partyapp/services/search.py
+# pa search の実処理（Law.title / Law.summary の日本語全文検索）。
+#
+# - 文字列は NFKC 正規化 + 小文字化してから文字 bigram に分解し、T_LAW_SEARCH_TOKEN に
+#   (token, law_id, title_tf, summary_tf) として保持する（各語の末尾 1 文字は unigram でも保持）。
+# - 検索は token IN (...) で候補を絞り、idf 重み付きのスコア（title は 3 倍）で並べる。
+#   bigram の AND だけでは語順が保証されないので、最終的に本文に語が含まれるかを確認する。
+# - インデックスの更新は Law.updated_at をウォーターマークにした差分更新。
+import math
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, case, delete, exists, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from partyapp.db.models import Category, Law, LawCategoryMap, LawSearchToken, SearchIndexState
+
+INDEX_NAME = "law_fulltext"
+TITLE_WEIGHT = 3
+
+_SPLIT_RE = re.compile(r"[\s　、。，．,.・「」『』（）()\[\]【】]+")
+
+def normalize_text(s: Optional[str]) -> str:
+    """全角英数の半角化などの NFKC 正規化 + 小文字化"""
+    return unicodedata.normalize("NFKC", s or "").lower()
+
+def tokenize(s: Optional[str]) -> Counter:
+    """文字 bigram（と各語の末尾 1 文字）の出現回数"""
+    out: Counter = Counter()
+    for seg in _SPLIT_RE.split(normalize_text(s)):
+        if not seg:
+            continue
+        out.update(seg[i:i + 2] for i in range(len(seg) - 1))
+        # 末尾の文字は bigram の先頭に現れないので 1 文字検索用に unigram でも持つ
+        out[seg[-1]] += 1
+    return out
+
+def query_terms(q: str) -> List[str]:
+    return list(dict.fromkeys(t for t in _SPLIT_RE.split(normalize_text(q)) if t))
+
+# ==============================================================
+# インデックス更新
+# ==============================================================
+
+def _state(db: Session) -> SearchIndexState:
+    st = db.get(SearchIndexState, INDEX_NAME)
+    if st is None:
+        st = SearchIndexState(name=INDEX_NAME, doc_count=0)
+        db.add(st)
+    return st
+
+def _token_rows(law_id: str, title: Optional[str], summary: Optional[str]) -> List[Dict[str, Any]]:
+    t, s = tokenize(title), tokenize(summary)
+    return [
+        {"token": tok, "law_id": law_id, "title_tf": t.get(tok, 0), "summary_tf": s.get(tok, 0)}
+        for tok in t.keys() | s.keys()
+    ]
+
+def refresh_index(db: Session, full: bool = False, batch_size: int = 500) -> int:
+    """
+    updated_at がウォーターマーク以降の Law だけを再インデックスし、件数を返す。
+    full=True のときは全件を作り直す。バッチごとにコミットしてウォーターマークを進めるので、
+    途中で止まっても次回はその続きから再開できる。
+    """
+    st = _state(db)
+    if full:
+        db.execute(delete(LawSearchToken))
+        st.watermark = None
+    db.commit()
+
+    tok_tbl = LawSearchToken.__table__
+    total = 0
+    cursor: Optional[tuple] = None
+    watermark = st.watermark
+    while True:
+        stmt = select(Law.id, Law.title, Law.summary, Law.updated_at)
+        if watermark is not None:
+            # 同一時刻の取りこぼしを避けるため >= で取り、同じ行は冪等に作り直す
+            stmt = stmt.where(Law.updated_at >= watermark)
+        if cursor is not None:
+            stmt = stmt.where(or_(
+                Law.updated_at > cursor[0],
+                and_(Law.updated_at == cursor[0], Law.id > cursor[1]),
+            ))
+        rows = db.execute(stmt.order_by(Law.updated_at, Law.id).limit(batch_size)).all()
+        if not rows:
+            break
+
+        ids = [r.id for r in rows]
+        db.execute(delete(LawSearchToken).where(LawSearchToken.law_id.in_(ids)))
+        payloads = [p for r in rows for p in _token_rows(r.id, r.title, r.summary)]
+        if payloads:
+            db.execute(insert(tok_tbl), payloads)
+
+        cursor = (rows[-1].updated_at, rows[-1].id)
+        st = _state(db)
+        st.watermark = rows[-1].updated_at
+        db.commit()
+        total += len(rows)
+
+    st = _state(db)
+    st.doc_count = db.execute(select(func.count(func.distinct(LawSearchToken.law_id)))).scalar_one()
+    st.refreshed_at = datetime.now(timezone.utc)
+    db.commit()
+    return total
+
+# ==============================================================
+# 検索
+# ==============================================================
+
+def _idf(db: Session, tokens: Sequence[str], doc_count: int) -> Dict[str, float]:
+    df = dict(db.execute(
+        select(LawSearchToken.token, func.count())
+        .where(LawSearchToken.token.in_(tokens))
+        .group_by(LawSearchToken.token)
+    ).all())
+    n = max(doc_count, 1)
+    return {t: math.log(1 + n / df[t]) for t in tokens if t in df}
+
+def _snippet(text: str, terms: Sequence[str], width: int = 40) -> str:
+    norm = normalize_text(text)
+    hits = [(norm.find(t), t) for t in terms if t in norm]
+    if not hits:
+        return norm[: width * 2] + ("…" if len(norm) > width * 2 else "")
+    pos, term = min(hits)
+    start, end = max(0, pos - width), min(len(norm), pos + len(term) + width)
+    body = norm[start:pos] + "【" + norm[pos:pos + len(term)] + "】" + norm[pos + len(term):end]
+    return ("…" if start > 0 else "") + body + ("…" if end < len(norm) else "")
+
+def search_laws(
+    db: Session,
+    q: str,
+    limit: int = 20,
+    law_type: Optional[str] = None,
+    jurisdiction: Optional[str] = None,
+    category: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    q を空白区切りの AND 検索として Law を探し、スコア順に返す。
+    戻り値の各要素: id, title, type, jurisdiction, promulgated_on, score, snippet
+    """
+    terms = query_terms(q)
+    if not terms:
+        return []
+    tok = LawSearchToken.__table__
+
+    multi = [t for t in terms if len(t) >= 2]
+    if multi:
+        qtokens = sorted({b for t in multi for b in tokenize(t) if len(b) == 2} or set(multi))
+        st = db.get(SearchIndexState, INDEX_NAME)
+        idf = _idf(db, qtokens, st.doc_count if st else 0)
+        if len(idf) < len(qtokens):
+            return []  # どこにも出現しない bigram がある = AND 条件を満たす法令はない
+        weight = case(idf, value=tok.c.token, else_=0.0)
+        cand = (
+            select(tok.c.law_id, func.sum(weight * (tok.c.title_tf * TITLE_WEIGHT + tok.c.summary_tf)).label("score"))
+            .where(tok.c.token.in_(qtokens))
+            .group_by(tok.c.law_id)
+            .having(func.count() == len(qtokens))
+        )
+    else:
+        # 1 文字だけの検索は、その文字で始まる token（bigram と末尾 unigram）から候補を作る
+        cand = (
+            select(tok.c.law_id, func.sum(tok.c.title_tf * TITLE_WEIGHT + tok.c.summary_tf).label("score"))
+            .where(tok.c.token.startswith(terms[0], autoescape=True))
+            .group_by(tok.c.law_id)
+        )
+    cand = cand.subquery()
+
+    stmt = (
+        select(Law.id, Law.title, Law.summary, Law.type, Law.jurisdiction, Law.promulgated_on, cand.c.score)
+        .join(cand, cand.c.law_id == Law.id)
+    )
+    if law_type:
+        stmt = stmt.where(Law.type == law_type)
+    if jurisdiction:
+        stmt = stmt.where(Law.jurisdiction == jurisdiction)
+    if category:
+        stmt = stmt.where(exists(
+            select(LawCategoryMap.law_id)
+            .join(Category, Category.id == LawCategoryMap.category_id)
+            .where(LawCategoryMap.law_id == Law.id, Category.name == category)
+        ))
+    # 語順の確認で落ちる分を見込んで多めに取る
+    stmt = stmt.order_by(cand.c.score.desc(), Law.id).limit(limit * 5 + 20)
+
+    results: List[Dict[str, Any]] = []
+    for r in db.execute(stmt):
+        title, summary = normalize_text(r.title), normalize_text(r.summary)
+        if not all(t in title or t in summary for t in terms):
+            continue
+        results.append({
+            "id": r.id,
+            "title": r.title,
+            "type": r.type,
+            "jurisdiction": r.jurisdiction,
+            "promulgated_on": r.promulgated_on,
+            "score": round(float(r.score or 0), 3),
+            "snippet": _snippet(r.summary if any(t in summary for t in terms) else r.title, terms),
+        })
+        if len(results) >= limit:
+            break
+    return results
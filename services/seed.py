@@ -0,0 +1,527 @@
+# partyapp/services/seed.py
+# seed-master コマンドの実処理。
+# CSV 読み込み → 列の型に合わせた変換（row_convert）→ id 付与 → バッチ書き込み をジェネレータで
+# つなぎ、ファイルサイズに関係なくメモリ使用量が一定になるようにしている。
+import csv
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import typer
+from sqlalchemy import String, delete, insert, select, tuple_, type_coerce
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from partyapp.db.models import Category, Law, LawCategoryMap, Party, PartyLawRole
+from partyapp.db.models.enums import PartyRole
+from partyapp.services.change_detect import ChangeDetector, supports_change_detection, with_hash
+from partyapp.services.key_resolver import KeyResolver, law_csv_column
+from partyapp.services.row_convert import RowErrors, compile_converter, enum_lookup
+from partyapp.services.stats import dirty_marker, role_change_marker
+from partyapp.utils.ids import make_char18_id
+
+# ==============================================================
+# パイプライン計測
+# ==============================================================
+
+class StageStats:
+    """
+    1 ステージ分の処理件数と所要時間。
+    inclusive=True のときは上流ステージの時間を含む累積値。
+    """
+
+    def __init__(self, name: str, inclusive: bool = True):
+        self.name = name
+        self.inclusive = inclusive
+        self.rows = 0
+        self.seconds = 0.0
+
+class PipelineStats:
+    """
+    ステージごとのスループットを集計する。
+    ジェネレータの next() に掛かった時間は上流の処理時間を含むため、
+    レポートでは直前ステージとの差分を「そのステージ自身の時間」として表示する。
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.stages: List[StageStats] = []
+
+    def stage(self, name: str, it: Iterable[Any]) -> Iterator[Any]:
+        """it を包んで件数と時間を計測するジェネレータを返す。"""
+        st = StageStats(name)
+        self.stages.append(st)
+        return self._timed(st, iter(it))
+
+    def _timed(self, st: StageStats, it: Iterator[Any]) -> Iterator[Any]:
+        clock = time.perf_counter
+        while True:
+            t0 = clock()
+            try:
+                item = next(it)
+            except StopIteration:
+                st.seconds += clock() - t0
+                return
+            st.seconds += clock() - t0
+            st.rows += 1
+            yield item
+
+    def sink(self, name: str) -> StageStats:
+        """書き込みなど終端ステージ用。呼び出し側で rows/seconds を加算する。"""
+        st = StageStats(name, inclusive=False)
+        self.stages.append(st)
+        return st
+
+    def report(self) -> None:
+        if not self.stages or self.stages[0].rows == 0:
+            return
+        parts = []
+        upstream = 0.0
+        for st in self.stages:
+            own = st.seconds
+            if st.inclusive:
+                own = max(st.seconds - upstream, 0.0)
+                upstream = st.seconds
+            rate = st.rows / own if own > 0 else float("inf")
+            parts.append(f"{st.name} {st.rows} 行 {own:.2f}s ({rate:,.0f} rows/sec)")
+        typer.echo(f"📊 {self.label}: " + " | ".join(parts))
+
+# ==============================================================
+# seed utility functions
+# ==============================================================
+
+def iter_csv(path: Path) -> Iterator[Dict[str, Any]]:
+    """CSV を 1 行ずつ辞書で返す（全件をメモリに載せない）。"""
+    if not path.exists():
+        typer.echo(f"⚠ {path} が見つかりません。スキップ")
+        return
+    with path.open("r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+def prepend_row(first: Dict[str, Any], rest: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """先読みした 1 行目を戻してストリームを復元する。"""
+    yield first
+    yield from rest
+
+def build_upsert_stmt(model, insert_cols: List[str], key_cols: List[str], dialect: str = "mysql"):
+    """
+    モデル単位で 1 回だけ組み立てる UPSERT 文のテンプレート。
+    INSERT ... VALUES (...) ON DUPLICATE KEY UPDATE ... を executemany で流すと、
+    pymysql が複数行 VALUES にまとめて 1 往復で送信する。
+    - 更新対象は insert_cols のうち key_cols と id を除いた列
+    - onupdate を持つ列（updated_at）は更新時刻を入れる
+    - id 列を持つモデルは id=id として PK を変更しない
+    dialect="sqlite" のときは INSERT ... ON CONFLICT (key_cols) DO UPDATE を組み立てる
+    （ベンチマークやローカル検証用。id は SET 句に含めないので変わらない）。
+    """
+    tbl = model.__table__
+    if dialect == "sqlite":
+        ins = sqlite_insert(tbl)
+        new_row = ins.excluded
+    else:
+        ins = mysql_insert(tbl)
+        new_row = ins.inserted
+    update_cols = {
+        c: new_row[c]
+        for c in insert_cols
+        if c not in key_cols and c != "id"
+    }
+    # ON DUPLICATE KEY UPDATE では Column(onupdate=...) が働かないので明示する（Law.updated_at など）
+    for c in tbl.c:
+        if c.onupdate is not None and c.name not in update_cols and c.name not in key_cols:
+            update_cols[c.name] = c.onupdate.arg
+    if dialect == "sqlite":
+        if not update_cols:
+            return ins.on_conflict_do_nothing(index_elements=key_cols)
+        return ins.on_conflict_do_update(index_elements=key_cols, set_=update_cols)
+    if "id" in tbl.c:
+        update_cols["id"] = tbl.c.id  # id=id
+    return ins.on_duplicate_key_update(**update_cols)
+
+def iter_chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """rows を size 件ずつのリストに区切って返す。"""
+    buf: List[Dict[str, Any]] = []
+    for r in rows:
+        buf.append(r)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+def iter_chunks_by(rows: Iterable[Dict[str, Any]], size: int, key: Callable[[Dict[str, Any]], Any]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    iter_chunks と同じだが、key が同じ連続行は同じチャンクに入れる
+    （size に達しても key が変わるまで区切らない）。
+    """
+    buf: List[Dict[str, Any]] = []
+    for r in rows:
+        if len(buf) >= size and key(r) != key(buf[-1]):
+            yield buf
+            buf = []
+        buf.append(r)
+    if buf:
+        yield buf
+
+def execute_upsert_batches(
+    db: Session,
+    model,
+    payloads: Iterable[Dict[str, Any]],
+    key_cols: List[str],
+    batch_size: int = 1000,
+    dry_run: bool = False,
+    stats: Optional[PipelineStats] = None,
+    resolver: Optional[KeyResolver] = None,
+    detector: Optional[ChangeDetector] = None,
+    before_write: Optional[Callable[[Session, List[Dict[str, Any]]], None]] = None,
+) -> int:
+    """
+    payloads（列集合がそろった辞書のストリーム）を batch_size 件ずつ複数行UPSERTする。
+    メモリに載るのは常に 1 バッチ分だけ。
+    ログは行単位ではなくバッチ単位で出し、最後に rows/sec を表示する。
+    resolver を渡すと、バッチの業務キー → 確定 id を覚えさせる（後続の中間テーブル投入で同じキーを
+    DB に問い合わせずに済む）。リゾルバのキーが key_cols[0] と違うときは書き込み後に key_cols[0] で引き直す。
+    detector を渡すと、既存行と source_hash が一致する行は書き込まない。
+    before_write を渡すと、バッチを書き込む直前に同じトランザクションで (db, バッチ) で呼ぶ（書き込み前の行との比較・集計済みテーブルへの変更記録など）。
+    戻り値は処理した（読み込んだ）行数。
+    """
+    sink = stats.sink("write") if stats else None
+    stmt = None
+    total = 0
+    started = time.perf_counter()
+    for i, chunk in enumerate(iter_chunks(payloads, max(1, batch_size)), start=1):
+        if stmt is None:
+            stmt = build_upsert_stmt(model, list(chunk[0].keys()), key_cols, dialect=db.get_bind().dialect.name)
+        t0 = time.perf_counter()
+        n_read = len(chunk)
+        # リゾルバのキーが UPSERT の衝突判定キーと同じなら、書き込み前に確定する id が分かる
+        same_key = resolver is not None and resolver.key_col == key_cols[0]
+        if detector is not None:
+            # 既存行の id もまとめて取れるので、キーが同じならリゾルバへの登録も兼ねる
+            chunk = detector.filter(db, chunk, resolver=resolver if same_key else None)
+        elif same_key and not dry_run:
+            resolver.prime_from_upsert(db, chunk)
+        if chunk and not dry_run:
+            if before_write is not None:
+                before_write(db, chunk)
+            db.execute(stmt, chunk)
+            if resolver is not None and not same_key:
+                # 既存行の id は変わらない（id=id）ので、書き込み後の行を衝突判定キーで引いて覚える
+                resolver.prime_after_upsert(db, chunk, key_cols[0])
+        if sink:
+            sink.seconds += time.perf_counter() - t0
+            sink.rows += len(chunk)
+        total += n_read
+        skipped = f", 変更なし {n_read - len(chunk)} 行" if detector is not None else ""
+        typer.echo(f"→ UPSERT {model.__name__}: batch {i} ({len(chunk)} 行{skipped}, 累計 {total} 行)")
+
+    if total == 0:
+        return 0
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else float("inf")
+    typer.echo(f"✅ {model.__name__}: {total} 行 / {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    if detector is not None:
+        detector.report()
+    if stats:
+        stats.report()
+    return total
+
+def upsert_simple_table(
+    db: Session,
+    model,
+    rows: Iterable[Dict[str, Any]],
+    uniq_cols: List[str],
+    dry_run: bool = False,
+    batch_size: int = 1000,
+    resolver: Optional[KeyResolver] = None,
+    first_line: int = 2,
+    report_header: bool = True,
+) -> int:
+    """
+    id は CSV からは受け取らず常に自動生成（CHAR(18)）。
+    業務キー（uniq_cols）にユニーク制約がある前提で、
+    INSERT ... ON DUPLICATE KEY UPDATE を使用した冪等UPSERT。
+    既存衝突時は id=id として PK を変更しない。
+    rows はジェネレータでよく、read → normalize → id 付与 → write の各段を
+    1 行ずつ流しながら batch_size 件ずつ書き込む。
+    normalize は 1 行目のヘッダから組み立てた変換器で行い、不正な値の行は
+    スキップして最後にまとめて報告する（first_line は rows の 1 行目の CSV 上の行番号）。
+    ヘッダの問題は report_header=True のときだけ表示する（同じファイルを区間に分けて呼ぶときは先頭の区間だけ）。
+    source_hash 列を持つモデル（Law）は内容ハッシュを計算し、変更のない行は書き込まない。
+    """
+    stats = PipelineStats(model.__name__)
+
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    convert = compile_converter(model, first.keys(), report=report_header)
+    errors = RowErrors(model.__name__)
+    rows = stats.stage("read", prepend_row(first, rows))
+    # source_hash を持つモデル（Law）は変更検知する
+    detector = ChangeDetector(model, uniq_cols[0]) if supports_change_detection(model) else None
+
+    def normalize(line: int, raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # 列の型に合わせた変換（空文字→None、日付・Enum など）。ヘッダに無い列は落とす
+        r = convert(raw, line, errors)
+        if detector is not None:
+            # 業務キーの空の行は突き合わせられない（再投入のたびに重複する）ので不正な行として落とす
+            r = detector.require_key(r, line, errors)
+        return r
+
+    converted = (normalize(line, raw) for line, raw in enumerate(rows, start=first_line))
+    normalized = stats.stage("normalize", (r for r in converted if r is not None))
+    if detector is not None:
+        normalized = stats.stage("hash", (with_hash(r) for r in normalized))
+    # 先に新規用 id を生成（既存に当たった場合はUPDATE側で id は変更しない）
+    with_ids = stats.stage("assign_id", ({"id": make_char18_id(), **r} for r in normalized))
+
+    n = execute_upsert_batches(
+        db, model, with_ids, uniq_cols, batch_size=batch_size, dry_run=dry_run, stats=stats,
+        resolver=resolver, detector=detector,
+    )
+    errors.report()
+    return n
+
+def iter_party_law_role_payloads(
+    rows: Iterable[Dict[str, Any]],
+    resolve_party: Callable[[str], Any],
+    resolve_law: Callable[[str], Any],
+    role_enum,
+    law_col: str = "law_number",
+    first_line: int = 2,
+    errors: Optional[RowErrors] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    party_law_roles.csv の行を T_PARTY_LAW_ROLE の payload に変換する。
+    law_col は Law を特定する CSV 列（law_number / law_title など）。
+    参照先が見つからない行・role が不正な行はスキップし、errors に行番号（first_line から数える）付きで記録する。
+    errors を渡さなければ、最後にまとめて表示する。
+    """
+    report = errors is None
+    if errors is None:
+        errors = RowErrors(PartyLawRole.__name__)
+    roles = enum_lookup(role_enum)
+    for line, r in enumerate(rows, start=first_line):
+        problems = []
+        party_id = law_id = None
+        try:
+            party_id = resolve_party(r.get("party_name"))
+        except KeyError:
+            problems.append(("party_name", f"政党 {r.get('party_name')!r} が見つかりません"))
+        try:
+            law_id = resolve_law(r.get(law_col))
+        except KeyError:
+            problems.append((law_col, f"法令 {r.get(law_col)!r} が見つかりません"))
+        role_val = r.get("role")
+        role_obj = roles.get(role_val) if role_val else None
+        if role_obj is None:
+            problems.append(("role", f"role={role_val!r} は候補にありません（{', '.join(m.name for m in role_enum)}）"
+                             if role_val else "role は必須です"))
+        if problems:
+            errors.add(line, problems)
+            continue
+
+        yield {
+            "party_id": party_id,
+            "law_id":   law_id,
+            "role":     role_obj,
+            "note":     r.get("note") or None,
+        }
+    if report:
+        errors.report()
+
+def make_party_law_resolvers(law_key: str = "law_number", cache_size: int = 100_000) -> tuple[KeyResolver, KeyResolver]:
+    """party_law_roles.csv 用の (Party.name, Law.<law_key>) リゾルバを作る。"""
+    return (
+        KeyResolver(Party, "name", cache_size=cache_size),
+        KeyResolver(Law, law_key, cache_size=cache_size),
+    )
+
+def resolve_party_law_role_chunk(
+    db: Session,
+    raws: List[Dict[str, Any]],
+    party_resolver: KeyResolver,
+    law_resolver: KeyResolver,
+    law_col: str,
+    first_line: int = 2,
+    errors: Optional[RowErrors] = None,
+) -> List[Dict[str, Any]]:
+    """
+    CSV 行のチャンクが参照するキーだけをまとめて解決し、payload のリストにする。
+    1 チャンクあたりの問い合わせはキャッシュミス分の IN 検索のみ。
+    """
+    parties = party_resolver.resolve_many(db, (r.get("party_name") for r in raws))
+    laws    = law_resolver.resolve_many(db, (r.get(law_col) for r in raws))
+    return list(iter_party_law_role_payloads(
+        raws, parties.__getitem__, laws.__getitem__, PartyRole, law_col=law_col,
+        first_line=first_line, errors=errors,
+    ))
+
+def seed_party_law_roles(
+    db: Session,
+    path: Path,
+    batch_size: int = 1000,
+    dry_run: bool = False,
+    party_resolver: Optional[KeyResolver] = None,
+    law_resolver: Optional[KeyResolver] = None,
+    law_key: str = "law_number",
+    rows: Optional[Iterable[Dict[str, Any]]] = None,
+    first_line: int = 2,
+) -> int:
+    """
+    party_law_roles.csv（party_name,law_number|law_title,role,note）を T_PARTY_LAW_ROLE に UPSERT する。
+    親テーブル（M_PARTY, T_LAW）の投入後に呼ぶこと。
+    親の投入時に使ったリゾルバを渡すと、その実行で確定した id を再利用する。
+    rows を渡すと path の代わりにその行を読む（チェックポイント付き投入で区間ごとに呼ぶとき）。
+    """
+    if rows is None:
+        if not path.exists():
+            return 0
+        rows = iter_csv(path)
+    if party_resolver is None or law_resolver is None:
+        party_resolver, law_resolver = make_party_law_resolvers(law_key)
+
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    law_col = law_csv_column(first.keys(), law_resolver.key_col)
+
+    stats = PipelineStats(PartyLawRole.__name__)
+    errors = RowErrors(PartyLawRole.__name__)
+    size = max(1, batch_size)
+    rows = stats.stage("read", prepend_row(first, rows))
+    payloads = stats.stage("resolve", (
+        p
+        for k, chunk in enumerate(iter_chunks(rows, size))
+        for p in resolve_party_law_role_chunk(
+            db, chunk, party_resolver, law_resolver, law_col, first_line=first_line + k * size, errors=errors,
+        )
+    ))
+    # 複合主キー (party_id, law_id, role) 前提：IDは存在しないので除外でOK
+    # 役割の変更では Law.updated_at が変わらないので、集計済みテーブル用に法令を記録する
+    n = execute_upsert_batches(
+        db, PartyLawRole, payloads, ["party_id", "law_id", "role"],
+        batch_size=batch_size, dry_run=dry_run, stats=stats,
+        before_write=None if dry_run else role_change_marker(db),
+    )
+    errors.report()
+    typer.echo(f"🔑 {party_resolver.summary()} / {law_resolver.summary()}")
+    return n
+
+# ==============================================================
+# 法令 × 分類（T_LAW_CATEGORY_MAP）
+# ==============================================================
+
+# law_categories.csv の反映方法
+#   add  … CSV の組のうち未登録のものだけを追加する
+#   sync … さらに、CSV に現れた法令について CSV に無い組を削除する（CSV に無い法令は変更しない）
+CATEGORY_SYNC_MODES = ("add", "sync")
+
+def seed_law_categories(
+    db: Session,
+    path: Path,
+    batch_size: int = 1000,
+    dry_run: bool = False,
+    law_resolver: Optional[KeyResolver] = None,
+    law_key: str = "law_number",
+    mode: str = "add",
+    rows: Optional[Iterable[Dict[str, Any]]] = None,
+    first_line: int = 2,
+) -> Dict[str, int]:
+    """
+    law_categories.csv（law_number|law_title,category）を T_LAW_CATEGORY_MAP に反映する。
+    親テーブル（T_LAW, M_CATEGORY）の投入後に呼ぶこと。
+    batch_size 行ずつ、対象法令の既存の組を IN でまとめて取得して差分を計算し、
+    差分だけを複数行 INSERT / 1 文の DELETE ... WHERE (law_id, category_id) IN (...) で書き込む。
+    sync の DELETE は CSV を読み終えてから行う。CSV 上で離れた行にある同じ法令の組を
+    途中のバッチで消して後で入れ直さないよう、削除候補（既存にあって CSV に無い組）を
+    実行の間だけ覚えておき、後のバッチで CSV に現れた組は候補から外す。
+    rows を渡すと path の代わりにその行を読む（sync は渡した行の範囲で CSV に無い組を削除する）。
+    戻り値は {"rows", "added", "deleted", "unchanged", "skipped"}。
+    """
+    if mode not in CATEGORY_SYNC_MODES:
+        raise ValueError(f"mode が不正です: {mode} （候補: {', '.join(CATEGORY_SYNC_MODES)}）")
+    counts = {"rows": 0, "added": 0, "deleted": 0, "unchanged": 0, "skipped": 0}
+    if rows is None:
+        if not path.exists():
+            return counts
+        rows = iter_csv(path)
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return counts
+    if law_resolver is None:
+        law_resolver = KeyResolver(Law, law_key)
+    law_col = law_csv_column(first.keys(), law_resolver.key_col)
+    # 分類は固定の数件なので全件を引いておく
+    categories = dict(db.execute(select(type_coerce(Category.name, String), Category.id)).all())
+
+    tbl = LawCategoryMap.__table__
+    marker = None if dry_run else dirty_marker(db)
+    errors = RowErrors(LawCategoryMap.__name__)
+    seen: set = set()
+    pending_delete: set = set()
+    started = time.perf_counter()
+    # 同じ法令の行が続く CSV（gen-fixtures や pa export の出力）では、法令の途中でバッチを区切らない
+    chunks = iter_chunks_by(prepend_row(first, rows), max(1, batch_size), key=lambda r: r.get(law_col))
+    for i, chunk in enumerate(chunks, start=1):
+        laws = law_resolver.resolve_many(db, (r.get(law_col) for r in chunk))
+        desired: set = set()
+        for line, r in enumerate(chunk, start=first_line + counts["rows"]):
+            law_id = laws.get(r.get(law_col))
+            cat_id = categories.get((r.get("category") or "").strip())
+            if law_id is None or cat_id is None:
+                errors.add(line, [
+                    *([(law_col, f"法令 {r.get(law_col)!r} が見つかりません")] if law_id is None else []),
+                    *([("category", f"分類 {r.get('category')!r} が見つかりません")] if cat_id is None else []),
+                ])
+                counts["skipped"] += 1
+                continue
+            desired.add((law_id, cat_id))
+
+        law_ids = list({law_id for law_id, _ in desired})
+        existing: set = set()
+        for j in range(0, len(law_ids), 500):
+            existing.update(db.execute(
+                select(tbl.c.law_id, tbl.c.category_id).where(tbl.c.law_id.in_(law_ids[j:j + 500]))
+            ).tuples())
+        to_add = desired - existing
+        if mode == "sync":
+            pending_delete -= desired
+            pending_delete |= {p for p in existing - desired if p[0] not in seen}
+            seen.update(law_ids)
+        if not dry_run and to_add:
+            db.execute(insert(tbl), [{"law_id": l, "category_id": c} for l, c in sorted(to_add)])
+            if marker is not None:
+                marker(db, [{"law_id": l} for l in {l for l, _ in to_add}])
+
+        counts["rows"] += len(chunk)
+        counts["added"] += len(to_add)
+        counts["unchanged"] += len(desired & existing)
+        typer.echo(
+            f"→ {mode.upper()} LawCategoryMap: batch {i} "
+            f"(追加 {len(to_add)} / 変更なし {len(desired & existing)}, 累計 {counts['rows']} 行)"
+        )
+
+    if pending_delete:
+        doomed = sorted(pending_delete)
+        if not dry_run:
+            for j in range(0, len(doomed), max(1, batch_size)):
+                part = doomed[j:j + max(1, batch_size)]
+                db.execute(delete(tbl).where(tuple_(tbl.c.law_id, tbl.c.category_id).in_(part)))
+                if marker is not None:
+                    marker(db, [{"law_id": l} for l in {l for l, _ in part}])
+        counts["deleted"] = len(doomed)
+        typer.echo(f"→ SYNC LawCategoryMap: CSV に無い組を削除 {len(doomed)} 件")
+
+    errors.report()
+    elapsed = time.perf_counter() - started
+    rate = counts["rows"] / elapsed if elapsed > 0 else float("inf")
+    typer.echo(
+        f"✅ LawCategoryMap: {counts['rows']} 行 / {elapsed:.2f}s ({rate:,.0f} rows/sec) "
+        f"追加 {counts['added']} / 削除 {counts['deleted']} / 変更なし {counts['unchanged']} / スキップ {counts['skipped']}"
+    )
+    return counts
@@ -0,0 +1,215 @@
+# partyapp/services/seed_checkpoint.py
+# seed-master --commit-every N / --resume のチェックポイント付き投入。
+# - CSV を N 行ずつの区間に分け、区間ごとに既存の投入処理（upsert_simple_table など）を呼んでコミットする。
+#   区間の処理が終わった時点でその区間の行はすべて読み終わっているので、
+#   読み取り位置（行数・バイト位置）がそのまま「コミット済みの位置」になる。
+# - チェックポイント（T_SEED_PROGRESS）は区間のデータと同じトランザクションで更新する。
+#   途中で落ちても、コミット済みのデータとチェックポイントは食い違わない。
+# - --resume では、CSV の内容（SHA-256）が前回と同じなら、投入済みのファイルは飛ばし、
+#   途中のファイルはヘッダを読んだあと記録したバイト位置へ seek して続きから読む。
+import csv
+import hashlib
+import itertools
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+import typer
+from sqlalchemy import delete, inspect
+from sqlalchemy.orm import Session
+
+from partyapp.db.base import get_sessionmaker
+from partyapp.db.models import Category, Law, Party, SeedProgress
+from partyapp.services.seed import (
+    make_party_law_resolvers,
+    seed_law_categories,
+    seed_party_law_roles,
+    upsert_simple_table,
+)
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class CsvCursor:
+    """
+    CSV を 1 行ずつ辞書で返しながら、返した行数（rows）と最後に返した行の直後のバイト位置（offset）を数える。
+    offset / rows を指定すると、ヘッダを読んだあとその位置から読み始める（再開）。
+    csv モジュールは 1 レコードに必要な物理行だけを読むので、offset は常にレコードの境界になる。
+    """
+
+    def __init__(self, path: Path, offset: int = 0, rows: int = 0):
+        self.path = path
+        self.offset = offset
+        self.rows = rows
+        self._pos = 0
+
+    def _lines(self, f) -> Iterator[str]:
+        for raw in f:
+            self._pos += len(raw)
+            yield raw.decode("utf-8")
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with self.path.open("rb") as f:
+            reader = csv.DictReader(self._lines(f))
+            if reader.fieldnames is None:  # 空ファイル
+                return
+            if self.offset > self._pos:
+                f.seek(self.offset)
+                self._pos = self.offset
+            for row in reader:
+                self.offset = self._pos
+                self.rows += 1
+                yield row
+
+def iter_segments(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[Iterator[Dict[str, Any]]]:
+    """
+    rows を size 行ずつの区間（イテレータ）に分ける。size <= 0 なら全体で 1 区間。
+    区間は次の区間を取り出す前に読み切ること（先読みはしない）。
+    """
+    it = iter(rows)
+    while True:
+        first = next(it, None)
+        if first is None:
+            return
+        yield itertools.chain([first], itertools.islice(it, size - 1) if size > 0 else it)
+
+# ==============================================================
+# T_SEED_PROGRESS
+# ==============================================================
+
+def _source(path: Path) -> str:
+    return str(path.resolve())
+
+def require_progress_table(db: Session) -> None:
+    if not inspect(db.connection()).has_table(SeedProgress.__tablename__):
+        raise RuntimeError(
+            f"{SeedProgress.__tablename__} がありません。pa init-db でテーブルを作成してください"
+        )
+
+def reset_progress(db: Session, paths: Iterable[Path]) -> None:
+    """paths のチェックポイントを消す（--resume なしの実行は最初から投入し直す）"""
+    db.execute(delete(SeedProgress).where(SeedProgress.source.in_([_source(p) for p in paths])))
+    db.commit()
+
+class CheckpointedSeeder:
+    """
+    ファイルごとに seed_file() を呼ぶ。commit_every 行ごと（0 ならファイルごと）にコミットし、
+    チェックポイントを同じトランザクションで更新する。dry_run のときは書き込まない。
+    """
+
+    def __init__(self, db: Session, commit_every: int = 0, resume: bool = False, dry_run: bool = False):
+        self.db = db
+        self.commit_every = commit_every
+        self.resume = resume
+        self.dry_run = dry_run
+
+    def _save(self, progress: SeedProgress, cursor: CsvCursor, done: bool) -> None:
+        progress.rows_done = cursor.rows
+        progress.byte_offset = cursor.offset
+        progress.done = done
+        self.db.commit()
+
+    def seed_file(
+        self,
+        path: Path,
+        process: Callable[[Session, Iterator[Dict[str, Any]], int, bool], Any],
+        segmented: bool = True,
+    ) -> int:
+        """
+        path の CSV を区間ごとに process(db, rows, first_line, first) へ渡す
+        （first_line は区間の先頭行の CSV 上の行番号、first はこの実行での最初の区間か。ヘッダの警告を 1 回だけ出すのに使う）。
+        segmented=False ならファイル全体で 1 区間
+        （途中のコミットで結果が変わる処理用。再開はファイル単位）。戻り値はこの実行で読んだ行数。
+        """
+        if not path.exists():
+            typer.echo(f"⚠ {path} が見つかりません。スキップ")
+            return 0
+        db = self.db
+        digest = file_sha256(path)
+        progress = db.get(SeedProgress, _source(path))
+        cursor = CsvCursor(path)
+        if progress is not None and self.resume:
+            if progress.content_hash != digest:
+                typer.echo(f"⚠ {path.name} は前回の実行から内容が変わっています。先頭から投入し直します")
+            elif progress.done:
+                typer.echo(f"⏭ {path.name}: 前回の実行で投入済み（{progress.rows_done:,} 行）。スキップ")
+                return 0
+            elif progress.rows_done:
+                cursor = CsvCursor(path, offset=progress.byte_offset, rows=progress.rows_done)
+                typer.echo(f"↪ {path.name}: {progress.rows_done:,} 行目の続きから再開します")
+        if progress is None:
+            progress = SeedProgress(source=_source(path))
+            if not self.dry_run:
+                db.add(progress)
+        progress.content_hash = digest
+
+        start_rows = cursor.rows
+        for i, segment in enumerate(iter_segments(cursor, self.commit_every if segmented else 0)):
+            # ヘッダが 1 行目。iter_segments は区間の先頭行を読んでから返すので、cursor.rows はその行まで数えている
+            process(db, segment, cursor.rows + 1, i == 0)
+            if not self.dry_run:
+                self._save(progress, cursor, done=False)
+                typer.echo(f"💾 checkpoint: {path.name} {cursor.rows:,} 行（{cursor.offset:,} bytes）をコミット")
+        if not self.dry_run:
+            self._save(progress, cursor, done=True)
+        return cursor.rows - start_rows
+
+def seed_master_checkpointed(
+    base: Path,
+    batch_size: int,
+    dry_run: bool,
+    commit_every: int = 0,
+    resume: bool = False,
+    law_key: str = "law_number",
+    fk_cache_size: int = 100_000,
+    category_mode: str = "add",
+) -> Dict[str, int]:
+    """
+    seed-master の逐次投入を、commit_every 行ごとのコミットとチェックポイント付きで行う。
+    投入順・処理内容は通常の逐次投入と同じ。resume=True なら前回コミット済みの位置から続ける。
+    law_categories.csv の sync は途中でコミットすると削除対象が変わるため、ファイル単位でコミットする。
+    戻り値は {ファイル名: この実行で読んだ行数}。
+    """
+    party_resolver, law_resolver = make_party_law_resolvers(law_key, cache_size=fk_cache_size)
+    steps: List[tuple] = [
+        # 想定: name,short_name,founded_on,dissolved_on
+        (base / "Party.csv", lambda db, rows, line, first: upsert_simple_table(
+            db, Party, rows, uniq_cols=["name"], dry_run=dry_run, batch_size=batch_size, resolver=party_resolver,
+            first_line=line, report_header=first,
+        ), True),
+        # 想定: name,description,...
+        (base / "Category.csv", lambda db, rows, line, first: upsert_simple_table(
+            db, Category, rows, uniq_cols=["name"], dry_run=dry_run, batch_size=batch_size, first_line=line,
+            report_header=first,
+        ), True),
+        # 想定: law_number,title,type,jurisdiction,...
+        (base / "Law.csv", lambda db, rows, line, first: upsert_simple_table(
+            db, Law, rows, uniq_cols=["law_number"], dry_run=dry_run, batch_size=batch_size, resolver=law_resolver,
+            first_line=line, report_header=first,
+        ), True),
+        # 想定: party_name,law_number|law_title,role,note
+        (base / "party_law_roles.csv", lambda db, rows, line, first: seed_party_law_roles(
+            db, base / "party_law_roles.csv", batch_size=batch_size, dry_run=dry_run,
+            party_resolver=party_resolver, law_resolver=law_resolver, law_key=law_key, rows=rows, first_line=line,
+        ), True),
+        # 想定: law_number|law_title,category
+        (base / "law_categories.csv", lambda db, rows, line, first: seed_law_categories(
+            db, base / "law_categories.csv", batch_size=batch_size, dry_run=dry_run,
+            law_resolver=law_resolver, law_key=law_key, mode=category_mode, rows=rows, first_line=line,
+        ), category_mode != "sync"),
+    ]
+    result: Dict[str, int] = {}
+    with get_sessionmaker()() as db:
+        require_progress_table(db)
+        if not resume and not dry_run:
+            reset_progress(db, [path for path, _, _ in steps])
+        seeder = CheckpointedSeeder(db, commit_every=commit_every, resume=resume, dry_run=dry_run)
+        for path, process, segmented in steps:
+            # 中間テーブルの CSV は任意（無ければ何もしない）
+            if not path.exists() and path.name in ("party_law_roles.csv", "law_categories.csv"):
+                continue
+            result[path.name] = seeder.seed_file(path, process, segmented=segmented)
+    return result
@@ -0,0 +1,305 @@
+# partyapp/services/seed_parallel.py
+# seed-master --workers N の並列投入。
+# CSV を batch_size 行ごとのパーティションに区切り、スレッドプールの各ワーカーが
+# 自分のセッション（= プールから借りた専用コネクション）で整形と UPSERT を行う。
+# テーブル間の依存（親 → 中間テーブル）は run_dependency_schedule が保証する。
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import typer
+from sqlalchemy.exc import DBAPIError
+
+from partyapp.db.base import get_sessionmaker
+from partyapp.db.models import Category, Law, Party, PartyLawRole
+from partyapp.services.seed import (
+    build_upsert_stmt,
+    iter_chunks,
+    iter_csv,
+    make_party_law_resolvers,
+    prepend_row,
+    resolve_party_law_role_chunk,
+    seed_law_categories,
+)
+from partyapp.services.change_detect import HASH_COLUMN, ChangeDetector, supports_change_detection, with_hash
+from partyapp.services.key_resolver import KeyResolver, law_csv_column
+from partyapp.services.row_convert import RowErrors, compile_converter
+from partyapp.services.stats import role_change_marker
+from partyapp.utils.ids import make_ids
+
+# InnoDB のデッドロック(1213) / ロック待ちタイムアウト(1205) はリトライで回復できる
+_RETRYABLE_ERRORS = {1205, 1213}
+
+def _is_retryable(exc: DBAPIError) -> bool:
+    orig = getattr(exc, "orig", None)
+    args = getattr(orig, "args", ())
+    return bool(args) and args[0] in _RETRYABLE_ERRORS
+
+# ==============================================================
+# 依存関係スケジューラ
+# ==============================================================
+
+class SeedTask:
+    """
+    スケジューラに渡す 1 テーブル分の投入タスク。
+    deps に挙げたタスクがすべて完了してから run が呼ばれる。
+    """
+
+    def __init__(self, name: str, run: Callable[[], int], deps: Sequence[str] = ()):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+
+def run_dependency_schedule(tasks: List[SeedTask], max_parallel: int) -> Dict[str, int]:
+    """
+    依存関係を満たしたタスクから順に最大 max_parallel 本並行で実行する。
+    いずれかのタスクが失敗したら未着手のタスクは実行せずに例外を送出する。
+    戻り値はタスク名 → 投入行数。
+    """
+    by_name = {t.name: t for t in tasks}
+    for t in tasks:
+        unknown = [d for d in t.deps if d not in by_name]
+        if unknown:
+            raise ValueError(f"タスク {t.name} の依存先が未定義です: {unknown}")
+
+    done: Dict[str, int] = {}
+    pending = list(tasks)
+    running: Dict[Future, SeedTask] = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_parallel), thread_name_prefix="seed-task") as ex:
+        while pending or running:
+            ready = [t for t in pending if all(d in done for d in t.deps)]
+            for t in ready:
+                pending.remove(t)
+                running[ex.submit(t.run)] = t
+            if not running:
+                # 実行中がなく、実行可能なタスクもない = 循環依存
+                raise ValueError(f"依存関係が循環しています: {[t.name for t in pending]}")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                t = running.pop(fut)
+                done[t.name] = fut.result()  # 失敗時はここで例外が伝播する
+    return done
+
+# ==============================================================
+# パーティション単位の並列 UPSERT
+# ==============================================================
+
+class ParallelUpserter:
+    """
+    パーティション（raw 行のリスト）をスレッドプールに投げ、
+    各ワーカーが prepare → executemany → commit を自前のセッションで行う。
+    同時に保持するパーティションは workers * 2 個までに制限し、メモリを一定に保つ。
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        workers: int,
+        batch_size: int = 1000,
+        dry_run: bool = False,
+        max_retries: int = 3,
+    ):
+        self.session_factory = session_factory
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.dry_run = dry_run
+        self.max_retries = max_retries
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="seed-worker")
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run_partition(
+        self,
+        stmt,
+        raws: List[Dict[str, Any]],
+        prepare: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+        detector: Optional[ChangeDetector] = None,
+        before_write: Optional[Callable[[Any, List[Dict[str, Any]]], None]] = None,
+    ) -> int:
+        payloads = prepare(raws)
+        n = len(payloads)
+        if not payloads or (self.dry_run and detector is None):
+            return n
+        for attempt in range(1, self.max_retries + 1):
+            with self.session_factory() as db:
+                try:
+                    if detector is not None and attempt == 1:
+                        # 変更のない行はここで落とす（リトライ時は絞り込み済みの payloads を使う）
+                        payloads = detector.filter(db, payloads)
+                    if payloads and not self.dry_run:
+                        if before_write is not None:
+                            before_write(db, payloads)
+                        db.execute(stmt, payloads)
+                        db.commit()
+                    return n
+                except DBAPIError as e:
+                    db.rollback()
+                    if not _is_retryable(e) or attempt == self.max_retries:
+                        raise
+            time.sleep(0.05 * attempt)
+        return 0  # pragma: no cover
+
+    def upsert(
+        self,
+        model,
+        raw_rows: Iterable[Dict[str, Any]],
+        stmt,
+        prepare: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+        detector: Optional[ChangeDetector] = None,
+        before_write: Optional[Callable[[Any, List[Dict[str, Any]]], None]] = None,
+    ) -> int:
+        """
+        raw_rows を batch_size 行ずつ並列に UPSERT し、処理行数を返す。
+        before_write は各パーティションの書き込み直前にワーカーのセッション（同じトランザクション）で呼ぶ。
+        """
+        total = 0
+        partitions = 0
+        started = time.perf_counter()
+        inflight: set[Future] = set()
+
+        def _drain(block_until: int) -> None:
+            nonlocal total
+            while len(inflight) > block_until:
+                finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    inflight.discard(fut)
+                    total += fut.result()
+
+        try:
+            for raws in iter_chunks(raw_rows, self.batch_size):
+                _drain(self.workers * 2 - 1)
+                inflight.add(self.pool.submit(self._run_partition, stmt, raws, prepare, detector, before_write))
+                partitions += 1
+            _drain(0)
+        except BaseException:
+            for fut in inflight:
+                fut.cancel()
+            raise
+
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed > 0 else float("inf")
+        with self._lock:
+            typer.echo(
+                f"✅ {model.__name__}: {total} 行 / {partitions} パーティション / "
+                f"{elapsed:.2f}s ({rate:,.0f} rows/sec, workers={self.workers})"
+            )
+            if detector is not None:
+                detector.report()
+        return total
+
+    def upsert_simple_table(self, model, path: Path, uniq_cols: List[str]) -> int:
+        """upsert_simple_table の並列版。CSV の読み込みは呼び出しスレッドで行う。"""
+        rows = iter_csv(path)
+        first = next(rows, None)
+        if first is None:
+            return 0
+        # source_hash を持つモデルは変更のない行を書き込まない
+        detector = ChangeDetector(model, uniq_cols[0]) if supports_change_detection(model) else None
+        convert = compile_converter(model, first.keys())
+        errors = RowErrors(model.__name__)
+
+        # 列集合はヘッダで決まるので、文テンプレートはここで 1 回だけ作る
+        insert_cols = list(dict.fromkeys(["id", *convert.columns, *([HASH_COLUMN] if detector is not None else [])]))
+        stmt = build_upsert_stmt(model, insert_cols, uniq_cols)
+
+        def prepare(items: List[tuple]) -> List[Dict[str, Any]]:
+            # items は (CSV の行番号, 行)。不正な値の行は errors に集めて落とす
+            rows = [convert(raw, line, errors) for line, raw in items]
+            if detector is not None:
+                # 業務キーの空の行は突き合わせられない（再投入のたびに重複する）ので不正な行として落とす
+                rows = [detector.require_key(r, line, errors) for (line, _), r in zip(items, rows)]
+            rows = [r for r in rows if r is not None]
+            if detector is not None:
+                rows = [with_hash(r) for r in rows]
+            # パーティション分の id はまとめて発行する
+            return [{"id": i, **r} for i, r in zip(make_ids(len(rows)), rows)]
+
+        n = self.upsert(model, enumerate(prepend_row(first, rows), start=2), stmt, prepare, detector=detector)
+        errors.report()
+        return n
+
+# ==============================================================
+# seed-master --workers N
+# ==============================================================
+
+def seed_master_parallel(
+    base: Path,
+    workers: int,
+    batch_size: int,
+    dry_run: bool,
+    law_key: str = "law_number",
+    fk_cache_size: int = 100_000,
+    category_mode: str = "add",
+) -> Dict[str, int]:
+    """
+    親テーブル（M_PARTY, M_CATEGORY, T_LAW）を並行投入し、
+    M_PARTY と T_LAW の完了後に T_PARTY_LAW_ROLE を、
+    M_CATEGORY と T_LAW の完了後に T_LAW_CATEGORY_MAP を投入する。
+    T_LAW_CATEGORY_MAP は差分だけを書くので、パーティションに分けず 1 タスク（1 トランザクション）で反映する
+    （sync で同じ法令の組が別ワーカーに分かれると、互いの追加分を消してしまうため）。
+    パーティションごとにコミットするため、途中で失敗した場合は投入済みの分が残る
+    （UPSERT なので再実行すれば冪等に追いつく）。
+    """
+    SessionLocal = get_sessionmaker()
+    with ParallelUpserter(SessionLocal, workers, batch_size=batch_size, dry_run=dry_run) as up:
+
+        def seed_party_law_roles() -> int:
+            plr_path = base / "party_law_roles.csv"  # 想定: party_name,law_number|law_title,role,note
+            rows = iter_csv(plr_path)
+            first = next(rows, None)
+            if first is None:
+                return 0
+            # リゾルバのキャッシュは全ワーカーで共有し、DB 検索は各ワーカーのセッションで行う
+            party_resolver, law_resolver = make_party_law_resolvers(law_key, cache_size=fk_cache_size)
+            law_col = law_csv_column(first.keys(), law_key)
+            errors = RowErrors(PartyLawRole.__name__)
+
+            def prepare(items: List[tuple]) -> List[Dict[str, Any]]:
+                # items は (CSV の行番号, 行) で、パーティション内の行番号は連続している
+                with SessionLocal() as db:
+                    return resolve_party_law_role_chunk(
+                        db, [r for _, r in items], party_resolver, law_resolver, law_col,
+                        first_line=items[0][0], errors=errors,
+                    )
+
+            # 複合主キー (party_id, law_id, role) 前提：IDは存在しないので除外でOK
+            stmt = build_upsert_stmt(
+                PartyLawRole, ["party_id", "law_id", "role", "note"], ["party_id", "law_id", "role"]
+            )
+            with SessionLocal() as db:
+                marker = role_change_marker(db)  # 集計済みテーブルが有効なら役割の変わった法令を記録する
+            n = up.upsert(PartyLawRole, enumerate(prepend_row(first, rows), start=2), stmt, prepare, before_write=marker)
+            errors.report()
+            typer.echo(f"🔑 {party_resolver.summary()} / {law_resolver.summary()}")
+            return n
+
+        def seed_law_categories_task() -> int:
+            resolver = KeyResolver(Law, law_key, cache_size=fk_cache_size)
+            with SessionLocal() as db:
+                counts = seed_law_categories(
+                    db, base / "law_categories.csv", batch_size=batch_size, dry_run=dry_run,
+                    law_resolver=resolver, mode=category_mode,
+                )
+                if not dry_run:
+                    db.commit()
+            return counts["rows"]
+
+        tasks = [
+            SeedTask("M_PARTY",    lambda: up.upsert_simple_table(Party,    base / "Party.csv",    ["name"])),
+            SeedTask("M_CATEGORY", lambda: up.upsert_simple_table(Category, base / "Category.csv", ["name"])),
+            SeedTask("T_LAW",      lambda: up.upsert_simple_table(Law,      base / "Law.csv",      ["law_number"])),
+            SeedTask("T_PARTY_LAW_ROLE", seed_party_law_roles, deps=("M_PARTY", "T_LAW")),
+            SeedTask("T_LAW_CATEGORY_MAP", seed_law_categories_task, deps=("M_CATEGORY", "T_LAW")),
+        ]
+        return run_dependency_schedule(tasks, max_parallel=len(tasks))
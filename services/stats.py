@@ -0,0 +1,350 @@
+# partyapp/services/stats.py
+# pa stats / pa stats-refresh の実処理。
+#
+# - 集計はすべて DB 側の GROUP BY で行い、アプリには集計結果の行だけを返す。
+#     roles: 政党 × 役割 × 分類 × 公布年 ごとの法令数（T_PARTY_LAW_ROLE ⋈ T_LAW ⋈ T_LAW_CATEGORY_MAP）
+#     types: 種別 × 管轄 × 公布年 ごとの法令数（T_LAW）
+# - 集計済みテーブル（T_STATS_PARTY_ROLE / T_STATS_LAW_TYPE）があれば、そこから SUM するだけで答える。
+# - 集計済みテーブルは公布年単位で差分更新する。変更のあった法令は
+#     Law.updated_at がウォーターマーク以降のもの ＋ seed が T_STATS_DIRTY_LAW に記録したもの
+#   で、それらの公布年（変更前の年は T_STATS_LAW_YEAR から引く）だけを作り直す。
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import String, and_, bindparam, delete, distinct, exists, extract, func, inspect, insert, or_, select, text, type_coerce
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from partyapp.db.models import (
+    Category,
+    Law,
+    LawCategoryMap,
+    Party,
+    PartyLawRole,
+    StatsDirtyLaw,
+    StatsLawTypeSummary,
+    StatsLawYear,
+    StatsPartyRoleSummary,
+    StatsState,
+)
+
+SUMMARY_NAME = "summary"
+
+REPORTS = {
+    "roles": ("party", "role", "category", "year"),
+    "types": ("type", "jurisdiction", "year"),
+}
+# roles の集計済みテーブルから正しく答えられる最小の集計軸
+# （政党・役割・分類のどれかを畳むと、同じ法令が複数行に数えられて SUM が過大になる）
+_ROLE_SUMMARY_DIMS = {"party", "role", "category"}
+
+def _year_expr():
+    return func.coalesce(extract("year", Law.promulgated_on), 0)
+
+def _year_filter(years: Iterable[int]):
+    """公布年の集合を promulgated_on の範囲条件にする（インデックスが効く形）"""
+    conds = []
+    for y in sorted(set(years)):
+        if y == 0:
+            conds.append(Law.promulgated_on.is_(None))
+        else:
+            conds.append(and_(Law.promulgated_on >= date(y, 1, 1), Law.promulgated_on < date(y + 1, 1, 1)))
+    return or_(*conds)
+
+def _year_range(col, year_from: Optional[int], year_to: Optional[int], is_date: bool):
+    conds = []
+    if year_from is not None:
+        conds.append(col >= (date(year_from, 1, 1) if is_date else year_from))
+    if year_to is not None:
+        conds.append(col < date(year_to + 1, 1, 1) if is_date else col <= year_to)
+    return conds
+
+# ==============================================================
+# 集計クエリ
+# ==============================================================
+
+def _roles_group_select():
+    """集計済みテーブルと同じ粒度（party_id, role, category, year）の GROUP BY"""
+    role = type_coerce(PartyLawRole.role, String)
+    category = func.coalesce(type_coerce(Category.name, String), "")
+    year = _year_expr()
+    return (
+        # (政党, 法令, 役割, 分類) は一意なので、この粒度では count(*) が法令数になる
+        select(PartyLawRole.party_id, role, category, year, func.count())
+        .select_from(PartyLawRole)
+        .join(Law, Law.id == PartyLawRole.law_id)
+        .outerjoin(LawCategoryMap, LawCategoryMap.law_id == PartyLawRole.law_id)
+        .outerjoin(Category, Category.id == LawCategoryMap.category_id)
+        .group_by(PartyLawRole.party_id, role, category, year)
+    )
+
+def _types_group_select():
+    year = _year_expr()
+    return (
+        select(type_coerce(Law.type, String), type_coerce(Law.jurisdiction, String), year, func.count())
+        .group_by(Law.type, Law.jurisdiction, year)
+    )
+
+def _roles_live(dims: Sequence[str], f: Dict[str, Any]):
+    cols = {
+        "party": Party.name,
+        "role": type_coerce(PartyLawRole.role, String),
+        "category": func.coalesce(type_coerce(Category.name, String), ""),
+        "year": _year_expr(),
+    }
+    stmt = (
+        select(*(cols[d].label(d) for d in dims), func.count(distinct(PartyLawRole.law_id)).label("laws"))
+        .select_from(PartyLawRole)
+        .join(Law, Law.id == PartyLawRole.law_id)
+    )
+    if "party" in dims or f.get("party"):
+        stmt = stmt.join(Party, Party.id == PartyLawRole.party_id)
+    if "category" in dims or f.get("category"):
+        stmt = (
+            stmt.outerjoin(LawCategoryMap, LawCategoryMap.law_id == PartyLawRole.law_id)
+            .outerjoin(Category, Category.id == LawCategoryMap.category_id)
+        )
+    conds = _year_range(Law.promulgated_on, f.get("year_from"), f.get("year_to"), is_date=True)
+    if f.get("party"):
+        conds.append(Party.name == f["party"])
+    if f.get("role"):
+        conds.append(PartyLawRole.role == f["role"])
+    if f.get("category"):
+        conds.append(Category.name == f["category"])
+    if f.get("type"):
+        conds.append(Law.type == f["type"])
+    if f.get("jurisdiction"):
+        conds.append(Law.jurisdiction == f["jurisdiction"])
+    return stmt.where(*conds)
+
+def _roles_summary(dims: Sequence[str], f: Dict[str, Any]):
+    S = StatsPartyRoleSummary
+    cols = {"party": Party.name, "role": S.role, "category": S.category, "year": S.year}
+    stmt = (
+        select(*(cols[d].label(d) for d in dims), func.sum(S.law_count).label("laws"))
+        .join(Party, Party.id == S.party_id)
+    )
+    conds = _year_range(S.year, f.get("year_from"), f.get("year_to"), is_date=False)
+    if f.get("year_from") is not None or f.get("year_to") is not None:
+        conds.append(S.year != 0)
+    if f.get("party"):
+        conds.append(Party.name == f["party"])
+    if f.get("role"):
+        conds.append(S.role == f["role"])
+    if f.get("category"):
+        conds.append(S.category == f["category"])
+    return stmt.where(*conds)
+
+def _types_live(dims: Sequence[str], f: Dict[str, Any]):
+    cols = {
+        "type": type_coerce(Law.type, String),
+        "jurisdiction": type_coerce(Law.jurisdiction, String),
+        "year": _year_expr(),
+    }
+    conds = _year_range(Law.promulgated_on, f.get("year_from"), f.get("year_to"), is_date=True)
+    if f.get("type"):
+        conds.append(Law.type == f["type"])
+    if f.get("jurisdiction"):
+        conds.append(Law.jurisdiction == f["jurisdiction"])
+    return select(*(cols[d].label(d) for d in dims), func.count().label("laws")).where(*conds)
+
+def _types_summary(dims: Sequence[str], f: Dict[str, Any]):
+    T = StatsLawTypeSummary
+    cols = {"type": T.type, "jurisdiction": T.jurisdiction, "year": T.year}
+    conds = _year_range(T.year, f.get("year_from"), f.get("year_to"), is_date=False)
+    if f.get("year_from") is not None or f.get("year_to") is not None:
+        conds.append(T.year != 0)
+    if f.get("type"):
+        conds.append(T.type == f["type"])
+    if f.get("jurisdiction"):
+        conds.append(T.jurisdiction == f["jurisdiction"])
+    return select(*(cols[d].label(d) for d in dims), func.sum(T.law_count).label("laws")).where(*conds)
+
+def summary_usable(report: str, dims: Sequence[str], filters: Dict[str, Any]) -> bool:
+    """集計済みテーブルから正しく答えられる集計軸・絞り込みか"""
+    if report == "roles":
+        return _ROLE_SUMMARY_DIMS <= set(dims) and not filters.get("type") and not filters.get("jurisdiction")
+    return not any(filters.get(k) for k in ("party", "role", "category"))
+
+def run_stats(
+    db: Session,
+    report: str,
+    dims: Optional[Sequence[str]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    source: str = "auto",
+    limit: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    report（roles | types）を dims で GROUP BY し、(行のリスト, 使ったソース) を返す。
+    各行は dims の列と laws（法令数）。source は auto | live | summary。
+    auto は集計済みテーブルが有効でその粒度で答えられるときだけ集計済みテーブルを使う。
+    """
+    if report not in REPORTS:
+        raise ValueError(f"未知のレポートです: {report} （候補: {', '.join(REPORTS)}）")
+    dims = list(dims or REPORTS[report])
+    unknown = [d for d in dims if d not in REPORTS[report]]
+    if unknown or not dims:
+        raise ValueError(f"{report} の集計軸が不正です: {unknown or dims} （候補: {', '.join(REPORTS[report])}）")
+    filters = filters or {}
+    if report == "types" and any(filters.get(k) for k in ("party", "role", "category")):
+        raise ValueError("types レポートでは --party / --role / --category は使えません")
+
+    usable = summary_usable(report, dims, filters)
+    if source == "summary" and not usable:
+        raise ValueError("この集計軸・絞り込みは集計済みテーブルの粒度では答えられません（--source live を使う）")
+    if source == "summary" and not summary_enabled(db):
+        raise ValueError("集計済みテーブルがありません（pa stats-refresh で作成する）")
+    if source == "auto":
+        source = "summary" if usable and summary_enabled(db) else "live"
+
+    if report == "roles":
+        stmt = _roles_summary(dims, filters) if source == "summary" else _roles_live(dims, filters)
+    else:
+        stmt = _types_summary(dims, filters) if source == "summary" else _types_live(dims, filters)
+    labels = [stmt.selected_columns[d] for d in dims]
+    stmt = stmt.group_by(*labels).order_by(*labels)
+    if limit:
+        stmt = stmt.limit(limit)
+    rows = [{**r._mapping, "laws": int(r.laws)} for r in db.execute(stmt)]
+    return rows, source
+
+# ==============================================================
+# 集計済みテーブルの差分更新
+# ==============================================================
+
+def summary_enabled(db: Session) -> bool:
+    """集計済みテーブルが作成済みか（一度でも pa stats-refresh を実行したか）"""
+    if not inspect(db.connection()).has_table(StatsState.__tablename__):
+        return False
+    st = db.get(StatsState, SUMMARY_NAME)
+    return st is not None and st.refreshed_at is not None
+
+def mark_dirty(db: Session, law_ids: Iterable[str]) -> None:
+    """law_ids を次回の差分更新の対象として記録する（Law.updated_at が変わらない書き込み用）"""
+    rows = [{"law_id": i} for i in dict.fromkeys(law_ids)]
+    if not rows:
+        return
+    tbl = StatsDirtyLaw.__table__
+    # 記録し直すときは marked_at を必ず進める（同じ秒でも 1 秒先にする）。
+    # 差分更新は読んだ (law_id, marked_at) の行だけを消すので、実行中に記録し直された法令は残り、次回作り直される
+    if db.get_bind().dialect.name == "sqlite":
+        bumped = func.max(func.datetime(tbl.c.marked_at, "+1 second"), func.current_timestamp())
+        stmt = sqlite_insert(tbl).on_conflict_do_update(index_elements=["law_id"], set_={"marked_at": bumped})
+    else:
+        bumped = func.greatest(func.timestampadd(text("SECOND"), 1, tbl.c.marked_at), func.now())
+        stmt = mysql_insert(tbl).on_duplicate_key_update(marked_at=bumped)
+    db.execute(stmt, rows)
+
+def changed_role_law_ids(db: Session, payloads: List[Dict[str, Any]]) -> List[str]:
+    """
+    PartyLawRole の payloads を UPSERT したとき (party_id, role) の組が増える法令の law_id。
+    UPSERT は行を消さず、note は集計に使わないので、既存に無い組を含む法令だけが集計に影響する。
+    """
+    law_ids = list(dict.fromkeys(p["law_id"] for p in payloads))
+    if not law_ids:
+        return []
+    R = PartyLawRole
+    existing = set(db.execute(select(R.law_id, R.party_id, R.role).where(R.law_id.in_(law_ids))).tuples())
+    return list(dict.fromkeys(
+        p["law_id"] for p in payloads if (p["law_id"], p["party_id"], p["role"]) not in existing
+    ))
+
+def dirty_marker(db: Session) -> Optional[Callable[[Session, List[Dict[str, Any]]], None]]:
+    """
+    集計済みテーブルが有効なら、法令の law_id を記録するコールバックを返す
+    （payloads は law_id を持つ辞書のリスト）。無効なら None。
+    """
+    if not summary_enabled(db):
+        return None
+    return lambda session, payloads: mark_dirty(session, (p["law_id"] for p in payloads))
+
+def role_change_marker(db: Session) -> Optional[Callable[[Session, List[Dict[str, Any]]], None]]:
+    """
+    集計済みテーブルが有効なら、PartyLawRole の payloads のうち役割の組が変わる法令だけを記録するコールバックを返す
+    （seed の execute_upsert_batches(before_write=...) に渡す。書き込む前の既存行と比べるため書き込みの直前に呼ぶ）。
+    無効なら None。
+    """
+    if not summary_enabled(db):
+        return None
+    return lambda session, payloads: mark_dirty(session, changed_role_law_ids(session, payloads))
+
+def _chunks(ids: List[str], size: int = 1000) -> Iterable[List[str]]:
+    """IN 句のバインド変数が多くなりすぎないように分ける"""
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+def _state(db: Session) -> StatsState:
+    st = db.get(StatsState, SUMMARY_NAME)
+    if st is None:
+        st = StatsState(name=SUMMARY_NAME)
+        db.add(st)
+    return st
+
+def _rebuild_years(db: Session, years: Optional[Set[int]]) -> None:
+    """years の公布年の集計行を作り直す（None なら全件）"""
+    S, T = StatsPartyRoleSummary, StatsLawTypeSummary
+    roles, types = _roles_group_select(), _types_group_select()
+    if years is None:
+        db.execute(delete(S))
+        db.execute(delete(T))
+    else:
+        db.execute(delete(S).where(S.year.in_(years)))
+        db.execute(delete(T).where(T.year.in_(years)))
+        roles = roles.where(_year_filter(years))
+        types = types.where(_year_filter(years))
+    db.execute(insert(S).from_select(["party_id", "role", "category", "year", "law_count"], roles))
+    db.execute(insert(T).from_select(["type", "jurisdiction", "year", "law_count"], types))
+
+def refresh_summary(db: Session, full: bool = False) -> Dict[str, Any]:
+    """
+    集計済みテーブルを差分更新し、{"laws": 変更のあった法令数, "years": 作り直した公布年の数, "full": bool} を返す。
+    初回と full=True のときは全件を作り直す。
+    1 トランザクションで行うので、途中で失敗しても集計済みテーブルは前回の状態のまま。
+    """
+    Y, D = StatsLawYear, StatsDirtyLaw
+    st = _state(db)
+    new_watermark = db.execute(select(func.max(Law.updated_at))).scalar_one()
+    # 変更記録は最初に 1 回だけ読み、作り直した法令の記録だけを最後に消す
+    # （時刻で区切ると、同じ秒に記録された法令を作り直さずに消してしまう）
+    dirty = db.execute(select(D.law_id, D.marked_at)).all()
+
+    if full or st.refreshed_at is None:
+        _rebuild_years(db, None)
+        db.execute(delete(Y))
+        db.execute(insert(Y).from_select(["law_id", "year"], select(Law.id, _year_expr())))
+        n_laws = db.execute(select(func.count()).select_from(Law)).scalar_one()
+        result = {"laws": n_laws, "years": None, "full": True}
+    else:
+        updated = select(Law.id)
+        if st.watermark is not None:
+            # 同一時刻の取りこぼしを避けるため >= で取る（作り直しは冪等）
+            updated = updated.where(Law.updated_at >= st.watermark)
+        touched = list(dict.fromkeys([*db.scalars(updated), *(r.law_id for r in dirty)]))
+        deleted = ~exists().where(Law.id == Y.law_id)
+        # 変更後の公布年と、集計時点の公布年（公布日の変更・法令の削除に対応）の両方を作り直す
+        years = set(db.scalars(select(Y.year).where(deleted).distinct()))
+        for part in _chunks(touched):
+            years |= set(db.scalars(select(_year_expr()).where(Law.id.in_(part)).distinct()))
+            years |= set(db.scalars(select(Y.year).where(Y.law_id.in_(part)).distinct()))
+        if years:
+            _rebuild_years(db, {int(y) for y in years})
+            db.execute(delete(Y).where(deleted))
+            for part in _chunks(touched):
+                db.execute(delete(Y).where(Y.law_id.in_(part)))
+                db.execute(insert(Y).from_select(
+                    ["law_id", "year"], select(Law.id, _year_expr()).where(Law.id.in_(part))
+                ))
+        result = {"laws": len(touched), "years": len(years), "full": False}
+
+    if dirty:
+        # 読んだ後に記録し直された法令は marked_at が進んでいるので消えずに残る
+        d = D.__table__
+        db.execute(
+            delete(d).where(d.c.law_id == bindparam("b_law_id"), d.c.marked_at <= bindparam("b_marked_at")),
+            [{"b_law_id": r.law_id, "b_marked_at": r.marked_at} for r in dirty],
+        )
+    st.watermark = new_watermark or st.watermark
+    st.refreshed_at = datetime.now(timezone.utc)
+    db.commit()
+    return result
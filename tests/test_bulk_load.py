@@ -0,0 +1,26 @@
+# seed-master --bulk のステージング TSV 書き出し（DB には接続しない）
+import io
+
+from partyapp.db.models import Law
+from partyapp.services.bulk_load import write_staging_tsv
+
+def _law(title, law_number):
+    return {
+        "title": title, "law_number": law_number, "type": "statute", "jurisdiction": "national",
+        "promulgated_on": "1950-01-01", "enacted_on": "", "summary": "", "source_url": "",
+    }
+
+def test_write_staging_tsv_rejects_rows_without_law_number(capsys):
+    rows = [_law("番号あり", "昭和25年法律第1号"), _law("番号なし", ""), _law("番号あり2", "昭和25年法律第2号"), _law("番号なし2", "")]
+    out = io.StringIO()
+
+    cols, n = write_staging_tsv(Law, rows, out, "law_number")
+
+    # 業務キーの空の行はステージングに載せない（毎回新規として INSERT されるため）
+    assert n == 2
+    lines = out.getvalue().splitlines()
+    assert [ln.split("\t")[cols.index("law_number")] for ln in lines] == ["昭和25年法律第1号", "昭和25年法律第2号"]
+    report = capsys.readouterr().out
+    assert "law_number 2 件" in report
+    assert "3 行目: law_number が空です" in report
+    assert "5 行目: law_number が空です" in report
@@ -0,0 +1,53 @@
+# キーセットページング（build_select / format_cursor / parse_after）を SQLite で確かめる
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from partyapp.db.models import Party
+from partyapp.services.query import build_select, format_cursor, parse_after
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Party.__table__.create(engine)
+    with Session(engine) as session:
+        # dissolved_on が NULL の行をページの境目にまたがるように混ぜる
+        dissolved = [None, date(2001, 1, 1), None, None, date(1999, 5, 1), None, date(2001, 1, 1)]
+        session.add_all(
+            Party(id=f"P{i:017d}", name=f"党{i}", dissolved_on=d) for i, d in enumerate(dissolved)
+        )
+        session.commit()
+        yield session
+
+def _page_all(db, desc, limit=2):
+    """--after のカーソル文字列を往復させて最後までページングし、読んだ id を返す"""
+    ids, after = [], None
+    while True:
+        stmt, key_cols = build_select(
+            Party, ["id"], order_by="dissolved_on", desc=desc,
+            after=None if after is None else parse_after(Party, key_cols, after), limit=limit,
+        )
+        rows = [dict(r._mapping) for r in db.execute(stmt)]
+        ids += [r["id"] for r in rows]
+        if len(rows) < limit:
+            return ids
+        after = format_cursor(rows[-1], key_cols)
+
+@pytest.mark.parametrize("desc", [False, True])
+def test_keyset_paging_over_nulls(db, desc):
+    stmt, _ = build_select(Party, ["id"], order_by="dissolved_on", desc=desc)
+    expected = list(db.scalars(stmt))
+
+    assert _page_all(db, desc) == expected
+    # NULL は最小として並ぶ（昇順で先頭、降順で末尾）
+    nulls = {"P00000000000000000", "P00000000000000002", "P00000000000000003", "P00000000000000005"}
+    assert set(expected[-4:] if desc else expected[:4]) == nulls
+
+def test_cursor_round_trips_null():
+    _, key_cols = build_select(Party, ["id"], order_by="dissolved_on")
+    cursor = format_cursor({"dissolved_on": None, "id": "P00000000000000003"}, key_cols)
+
+    assert cursor == ",P00000000000000003"
+    assert parse_after(Party, key_cols, cursor) == [None, "P00000000000000003"]
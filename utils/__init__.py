@@ -0,0 +1,2 @@
+# partyapp/utils
+# 共通関数やヘルパー
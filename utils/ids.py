@@ -0,0 +1,126 @@
+# partyapp/utils/ids.py
+# CHAR(18) の主キー id を生成するユーティリティ。
+#
+# 18文字の Crockford Base32（0-9 A-Z ただし I L O U を除く）= 90bit を次の3つに分ける。
+#
+#   [ 時刻(ミリ秒) 9文字 | ノード 5文字 | 連番 4文字 ]
+#        45bit              25bit          20bit
+#
+# - 時刻: UNIX エポックからのミリ秒。固定幅なので文字列の大小 = 生成時刻順。
+#         時計が巻き戻っても直前のミリ秒を使い続けるので、プロセス内では必ず単調増加。
+# - ノード: プロセスごとに os.urandom で 1 回だけ決める乱数（fork 後は子プロセスで再生成）。
+#         並列ローダ（別プロセス）同士はノードが異なるため、同じミリ秒でも衝突しない。
+# - 連番: ミリ秒が変わるたびに乱数で初期化し（下位 19bit の範囲）、以降は +1 する。
+#         1ミリ秒あたり最低 524,288 件まで発行でき、使い切ったら時刻部分を 1 ミリ秒先に進める（壁時計は待たない）。
+#
+# 時刻部分の Base32 文字列はミリ秒が変わったときだけ計算し、ノード部分は固定文字列を使い回す。
+import os
+import threading
+import time
+from typing import List
+
+# Crockford Base32（0-9 A-Z ただし I L O U を除く）
+_B32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+ID_LENGTH = 18
+_TS_CHARS = 9
+_NODE_CHARS = 5
+_SEQ_CHARS = 4
+_SEQ_MAX = 32 ** _SEQ_CHARS          # 1,048,576
+_SEQ_START_MAX = _SEQ_MAX // 2        # 初期値の上限（以降の増分の余地を確保）
+
+# 10bit → 2文字 の変換表（連番 20bit を 2 回の参照で文字列化する）
+_PAIR = [_B32[i >> 5] + _B32[i & 31] for i in range(1024)]
+
+def _encode(n: int, width: int) -> str:
+    """n を width 文字の固定幅 Base32 にする（上位桁は 0 埋め）。"""
+    s = []
+    for _ in range(width):
+        n, r = divmod(n, 32)
+        s.append(_B32[r])
+    return "".join(reversed(s))
+
+class IdGenerator:
+    """
+    単調増加・プロセス間で衝突しない CHAR(18) id の発行器。
+    スレッドセーフ。通常はモジュールレベルの make_id / make_ids を使う。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset_node()
+
+    def _reset_node(self) -> None:
+        self._node = _encode(int.from_bytes(os.urandom(4), "big") >> 7, _NODE_CHARS)  # 25bit
+        self._last_ms = -1
+        self._prefix = ""
+        self._seq = 0
+
+    def _after_fork(self) -> None:
+        # fork 時に他スレッドが握っていたロックは子プロセスでは解放されないので作り直す
+        self._lock = threading.Lock()
+        self._reset_node()
+
+    def _set_ms(self, ms: int) -> None:
+        self._last_ms = ms
+        self._prefix = _encode(ms, _TS_CHARS) + self._node
+        self._seq = int.from_bytes(os.urandom(3), "big") % _SEQ_START_MAX
+
+    def _advance_ms(self) -> None:
+        """現在ミリ秒に合わせて時刻プレフィックスと連番を更新する（ロック内で呼ぶ）。"""
+        now = time.time_ns() // 1_000_000
+        if now > self._last_ms:
+            self._set_ms(now)
+
+    def _next_ms(self) -> None:
+        """
+        連番を使い切ったので時刻プレフィックスを 1 ミリ秒進める（ロック内で呼ぶ）。
+        壁時計は待たないので、時計が戻った直後でも止まらず、昇順も保たれる。
+        """
+        self._set_ms(self._last_ms + 1)
+
+    def make_ids(self, n: int) -> List[str]:
+        """n 個の id を昇順で返す。同じミリ秒内では時刻プレフィックスを使い回す。"""
+        out: List[str] = []
+        pair = _PAIR
+        with self._lock:
+            self._advance_ms()
+            while len(out) < n:
+                if self._seq >= _SEQ_MAX:
+                    self._next_ms()
+                take = min(n - len(out), _SEQ_MAX - self._seq)
+                prefix = self._prefix
+                seq = self._seq
+                out.extend(prefix + pair[s >> 10] + pair[s & 1023] for s in range(seq, seq + take))
+                self._seq = seq + take
+        return out
+
+    def make_id(self) -> str:
+        with self._lock:
+            self._advance_ms()
+            if self._seq >= _SEQ_MAX:
+                self._next_ms()
+            s = self._seq
+            self._seq = s + 1
+            return self._prefix + _PAIR[s >> 10] + _PAIR[s & 1023]
+
+_default = IdGenerator()
+
+# fork した子プロセスが親と同じノード・連番を引き継がないようにする
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_default._after_fork)
+
+def make_id() -> str:
+    """CHAR(18) の id を 1 つ返す。"""
+    return _default.make_id()
+
+def make_ids(n: int) -> List[str]:
+    """CHAR(18) の id を n 個まとめて返す（昇順）。"""
+    return _default.make_ids(n)
+
+def make_char18_id() -> str:
+    """
+    時刻(ミリ秒)をBase32化した先頭に、ノードと連番を続けた18文字。
+    既存行に対しては ON DUPLICATE KEY UPDATE で id=id とし、id は変更しない。
+    """
+    return _default.make_id()